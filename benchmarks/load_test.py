@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""Load test of the music pipeline, with guilds using their player concurrently, offline.
+
+Usage: python -m benchmarks.load_test [guilds] [tracks] [speed]
+
+Each guild queues `tracks` songs with !play from several members, then skips some of them and clicks on the pause
+and play buttons while fake voice clients play the tracks `speed` times faster than real time (see
+tests.simulator). The throughput of the pipeline, the gaps between two tracks, the event loop lag and the memory
+per guild are reported.
+"""
+
+# Built-in modules
+import asyncio
+import random
+import resource
+import sys
+import time
+
+# Internal modules
+from rbot.bot.commands.music import Music
+from rbot.utils.watchdog import LoopWatchdog
+from rbot.utils.yt_player import FRAME_DURATION, extractor_pool
+from tests.simulator import FakeBot, FakeContext, FakeGuild, FakeInteraction, offline
+
+# Probability of a skip, and of a pause, at each click on the player
+SKIP_RATE = 0.03
+PAUSE_RATE = 0.05
+CLICK_INTERVAL = 0.1
+
+
+async def simulate_guild(bot: FakeBot, cog: Music, guild: FakeGuild, tracks: int, rng: random.Random) -> None:
+    """Queue `tracks` songs in the player of `guild`, clicking on its buttons until they are all played."""
+    members = [guild.member(f"member-{i}") for i in range(3)]
+    await guild.voice_channel.connect()
+    for i in range(tracks):
+        ctx = FakeContext(bot, guild, rng.choice(members), cog)
+        await cog.play_music.callback(cog, ctx, f"https://www.youtube.com/watch?v={guild.id}-{i}")
+        await asyncio.sleep(rng.random() * CLICK_INTERVAL)
+    player = cog.players[guild.id]
+    while player.current_song or not player.queue.empty():
+        interaction = FakeInteraction(guild, rng.choice(members))
+        click = rng.random()
+        if click < SKIP_RATE:
+            await cog.player_next(interaction, None)
+        elif click < SKIP_RATE + PAUSE_RATE:
+            await cog.player_pause(interaction, None)
+            await asyncio.sleep(CLICK_INTERVAL)
+            await cog.player_play(interaction, None)
+        await asyncio.sleep(CLICK_INTERVAL)
+
+
+async def run(guilds: int = 10, tracks: int = 5, speed: float = 10, latency: float = 0.05, seed: int = 0) -> dict:
+    """Run the load test, returning its report."""
+    rng = random.Random(seed)  # nosec
+    bot = FakeBot(asyncio.get_running_loop())
+    cog = Music(bot=bot)
+    bot.add_cog(cog)
+    bot.guilds = [FakeGuild(bot, f"guild-{i}", speed=speed) for i in range(guilds)]
+    watchdog = LoopWatchdog(interval=0.01, threshold=0.1, report_interval=3600)
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    started_at = time.perf_counter()
+    watchdog.start()
+    try:
+        with offline(latency=latency):
+            await asyncio.gather(*(simulate_guild(bot, cog, guild, tracks, rng) for guild in bot.guilds))
+            wall = time.perf_counter() - started_at
+            voice_clients = [guild.voice_client for guild in bot.guilds]
+            await cog.cleanup_all()
+    finally:
+        watchdog.stop()
+        extractor_pool.shutdown()
+    gaps = sorted(gap for voice_client in voice_clients for gap in voice_client.gaps)
+    played = sum(voice_client.tracks for voice_client in voice_clients)
+    frames = sum(voice_client.frames for voice_client in voice_clients)
+    lag = watchdog.stats()
+    return {
+        "guilds": guilds,
+        "tracks": played,
+        "wall_sec": wall,
+        "tracks_per_sec": played / wall,
+        "audio_sec_per_sec": frames * FRAME_DURATION / wall,
+        "gap_p50_sec": gaps[len(gaps) // 2] if gaps else 0.0,
+        "gap_p95_sec": gaps[min(len(gaps) - 1, len(gaps) * 95 // 100)] if gaps else 0.0,
+        "gap_max_sec": gaps[-1] if gaps else 0.0,
+        "loop_lag_p99_sec": lag["p99"],
+        "loop_lag_max_sec": lag["max"],
+        "loop_stalls": lag["stalls"],
+        # Peak RSS growth during the run, ru_maxrss is in KiB on Linux
+        "rss_per_guild_kib": (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss) / guilds,
+    }
+
+
+def main(guilds: int = 10, tracks: int = 5, speed: float = 10) -> None:
+    report = asyncio.run(run(guilds, tracks, speed))
+    for name, value in report.items():
+        print(f"{name:>18}: {value:.3f}" if isinstance(value, float) else f"{name:>18}: {value}")
+
+
+if __name__ == "__main__":
+    main(*(cast(arg) for cast, arg in zip((int, int, float), sys.argv[1:])))
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""Compare the memory and startup cost of the member cache policies.
+
+Usage: python -m benchmarks.member_cache [members]
+
+A guild of `members` members is created from a GUILD_CREATE payload holding all of them, like after chunking a
+guild at startup with the members intent (`all` policy, the previous default). The time to parse the payload and
+the memory kept by the client are measured for each policy.
+
+The `voice` policy caches no member here: discord.py only caches the members of voice states received in
+VOICE_STATE_UPDATE events, not the ones of the GUILD_CREATE payload, so its members are cached once they join a
+voice channel after startup.
+"""
+
+# Built-in modules
+import asyncio
+import gc
+import sys
+import time
+import tracemalloc
+
+# External modules
+import discord
+
+# Internal modules
+from rbot.utils.members import MEMBER_CACHE_POLICIES, member_cache_flags
+
+
+def guild_payload(members: int) -> dict:
+    """Return a GUILD_CREATE payload of a guild with `members` members, one of them in a voice channel."""
+    return {
+        "id": "1",
+        "name": "guild",
+        "owner_id": "10",
+        "large": True,
+        "member_count": members,
+        "roles": [{"id": "1", "name": "@everyone", "permissions": "0", "position": 0}],
+        "channels": [{"id": "2", "name": "General", "type": 2, "position": 0}],
+        "emojis": [],
+        "features": [],
+        "presences": [],
+        "voice_states": [{"user_id": "10", "channel_id": "2", "session_id": "", "deaf": False, "mute": False}],
+        "members": [
+            {
+                "user": {"id": str(10 + i), "username": f"user{i}", "discriminator": "0001", "avatar": None},
+                "roles": [],
+                "joined_at": "2021-01-01T00:00:00+00:00",
+                "deaf": False,
+                "mute": False,
+            }
+            for i in range(members)
+        ],
+    }
+
+
+async def bench(policy: str, members: int) -> None:
+    """Print the time to parse a guild and the memory it keeps, with a member cache policy."""
+    intents = discord.Intents.default()
+    intents.members = policy == "all"
+    client = discord.Client(
+        intents=intents,
+        member_cache_flags=member_cache_flags(policy, intents),
+        chunk_guilds_at_startup=False,
+    )
+    payload = guild_payload(members)
+    gc.collect()
+    started_at = time.perf_counter()
+    client._connection.parse_guild_create(payload)
+    elapsed = time.perf_counter() - started_at
+    client._connection.clear()
+    gc.collect()
+    tracemalloc.start()
+    client._connection.parse_guild_create(payload)
+    del payload
+    gc.collect()
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    guild = client.get_guild(1)
+    print(
+        f"{policy:>5}: {len(guild.members)} members cached, "
+        f"parsed in {elapsed:.3f}s, {memory / 1024**2:.1f} MiB kept"
+    )
+
+
+def main(members: int = 50_000) -> None:
+    """Run the benchmark of each policy with a guild of `members` members."""
+    for policy in MEMBER_CACHE_POLICIES:
+        asyncio.run(bench(policy, members))
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
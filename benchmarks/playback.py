@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""Compare the CPU cost per stream of the PCM and Opus passthrough playback paths.
+
+Usage: python -m benchmarks.playback [duration_sec]
+
+A test track is encoded in Opus with FFmpeg, then each path reads all of its 20ms frames as fast as possible, doing
+what the voice client does with them: the PCM path scales the volume in Python and encodes every frame in Opus, the
+Opus path sends the packets as they are. FFmpeg CPU time is included.
+"""
+
+# Built-in modules
+import resource
+import subprocess  # nosec
+import sys
+import tempfile
+import time
+
+# External modules
+import discord
+
+FRAME_SEC = 0.02
+
+
+def _cpu_time() -> float:
+    usage = [resource.getrusage(who) for who in (resource.RUSAGE_SELF, resource.RUSAGE_CHILDREN)]
+    return sum(u.ru_utime + u.ru_stime for u in usage)
+
+
+def _read_all(source: discord.AudioSource, encoder=None) -> int:
+    frames = 0
+    while frame := source.read():
+        if encoder and not source.is_opus():
+            encoder.encode(frame, encoder.SAMPLES_PER_FRAME)
+        frames += 1
+    source.cleanup()
+    return frames
+
+
+def bench(name: str, create_source, encoder=None) -> None:
+    """Print the CPU time spent per minute of audio by a playback path."""
+    cpu, wall = _cpu_time(), time.perf_counter()
+    frames = _read_all(create_source(), encoder)
+    cpu, wall = _cpu_time() - cpu, time.perf_counter() - wall
+    audio_min = frames * FRAME_SEC / 60
+    print(f"{name:>6}: {frames} frames, {cpu / audio_min:.3f} CPU s per audio minute ({wall:.2f}s wall)")
+
+
+def main(duration: int = 120) -> None:
+    with tempfile.NamedTemporaryFile(suffix=".opus") as track:
+        subprocess.run(  # nosec
+            ["ffmpeg", "-loglevel", "error", "-y", "-f", "lavfi", "-i", f"sine=frequency=440:duration={duration}"]
+            + ["-ac", "2", "-ar", "48000", "-c:a", "libopus", "-f", "ogg", track.name],
+            check=True,
+        )
+        encoder = None
+        if not discord.opus.is_loaded():
+            discord.opus._load_default()
+        if discord.opus.is_loaded():
+            encoder = discord.opus.Encoder()
+        else:
+            print("libopus not found, the PCM path is measured without the Opus encoding")
+        bench("pcm", lambda: discord.PCMVolumeTransformer(discord.FFmpegPCMAudio(track.name), volume=1.0), encoder)
+        bench("opus", lambda: discord.FFmpegOpusAudio(track.name, codec="opus"))
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
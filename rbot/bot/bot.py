@@ -1,22 +1,39 @@
 # Built-in modules
+import importlib
 import logging
 from contextlib import suppress
+from typing import Optional
 
 # External modules
 import discord
 from discord.ext import commands
 
-from rbot.bot.commands.clear import Clear
-from rbot.bot.commands.history import History
-from rbot.bot.commands.music import Music, MusicPlayer
-from rbot.bot.commands.roll import Roll
-
 # Internal modules
+from rbot.utils.members import MemberCache, member_cache_flags
+from rbot.utils.metrics import start_http_server
+from rbot.utils.name_index import AmbiguousNameError, NameIndex
+from rbot.utils.profiling import instrument_http
 from rbot.utils.settings import get_settings
+from rbot.utils.watchdog import LoopWatchdog
 
 LOGGER = logging.getLogger("rich")
-INTENTS = discord.Intents.default()
-INTENTS.members = True
+# Cogs by setting enabling them: module, class name and if the cog takes the bot
+COGS = {
+    "roll_enabled": ("rbot.bot.commands.roll", "Roll", False),
+    "clear_enabled": ("rbot.bot.commands.clear", "Clear", False),
+    "music_enabled": ("rbot.bot.commands.music", "Music", True),
+    "history_enabled": ("rbot.bot.commands.history", "History", True),
+    "stats_enabled": ("rbot.bot.commands.stats", "Stats", True),
+}
+
+
+def get_intents() -> discord.Intents:
+    """Return the gateway intents from settings, the privileged ones being disabled by default."""
+    settings = get_settings()
+    intents = discord.Intents.default()
+    intents.members = settings.intents_members
+    intents.presences = settings.intents_presences
+    return intents
 
 
 class Rbot(commands.Bot):
@@ -24,28 +41,67 @@ class Rbot(commands.Bot):
 
     def __init__(
         self,
-        intents=INTENTS,
+        intents: Optional[discord.Intents] = None,
+        serve_metrics: bool = True,
+        **options,
     ):  # noqa:D107
-        super().__init__(self, intents=intents)
-        self.settings = get_settings()
+        settings = get_settings()
+        intents = intents or get_intents()
+        super().__init__(
+            self,
+            intents=intents,
+            member_cache_flags=member_cache_flags(settings.member_cache, intents),
+            chunk_guilds_at_startup=settings.member_cache == "all" and intents.members,
+            **options,
+        )
+        self.settings = settings
+        # Members missing from the gateway cache are fetched on demand
+        self.member_cache = MemberCache(settings.member_cache_size)
+        # Channels and roles looked up by name, updated from the gateway events
+        self.names = NameIndex()
         self.command_prefix = self.settings.command_prefix
         self.guild = None
         self.status_chan = None
+        self.serve_metrics = serve_metrics
+        self.metrics_server = None
+        self.watchdog = None
+        # Attribute REST calls and rate limit waits to the running command
+        instrument_http(self.http)
 
     def setup(self):
-        """Register commands to the bot."""
-        self.add_cog(Roll())
-        self.add_cog(Clear())
-        self.add_cog(Music(bot=self))
-        self.add_cog(History(bot=self))
+        """Register the enabled commands to the bot, only importing their modules."""
+        for setting, (module, name, takes_bot) in COGS.items():
+            if not getattr(self.settings, setting):
+                LOGGER.debug("%s command disabled", name)
+                continue
+            cog = getattr(importlib.import_module(module), name)
+            self.add_cog(cog(bot=self) if takes_bot else cog())
 
     async def on_ready(self):
         """Events once bot is in ready state."""
+        if self.serve_metrics and self.settings.metrics_port and not self.metrics_server:
+            self.metrics_server = await start_http_server(self.settings.metrics_host, self.settings.metrics_port)
+            LOGGER.info(f"Metrics served on http://{self.settings.metrics_host}:{self.settings.metrics_port}/metrics")
+        if self.settings.loop_lag_threshold and not self.watchdog:
+            self.watchdog = LoopWatchdog(
+                interval=self.settings.loop_lag_interval,
+                threshold=self.settings.loop_lag_threshold,
+                report_interval=self.settings.loop_lag_report_interval,
+                report=self.send_status,
+                logger=LOGGER,
+            )
+            self.watchdog.start()
         self.guild = discord.utils.get(iterable=self.guilds, name=self.settings.discord_server)
-        self.status_chan = discord.utils.find(
-            lambda chan: chan.name == self.settings.status_chan,
-            self.guild.text_channels,
-        )
+        if self.guild is None:
+            # With several workers, the guild is in the shards of only one of them
+            LOGGER.info(
+                f"Connected to discord, guild '{self.settings.discord_server}' is not in the shards of this bot"
+            )
+            return await self.change_presence(status=discord.Status.idle)
+        try:
+            self.status_chan = self.names.get_channel(self.guild, self.settings.status_chan)
+        except AmbiguousNameError as error:
+            LOGGER.error(f"No status channel: {error}")
         LOGGER.info(
             f"[bold green]Connected to discord ![/bold green]\r\n\r\n"
             f"---\r\n"
@@ -55,19 +111,73 @@ class Rbot(commands.Bot):
             f"---\r\n\r\n",
             extra={"markup": True},
         )
-        await self.status_chan.send("Rbot activated.. 🚀\r\nHello !")
+        await self.send_status("Rbot activated.. 🚀\r\nHello !")
         await self.change_presence(status=discord.Status.idle)
 
+    async def on_guild_available(self, guild: discord.Guild):
+        """Index the channels and roles of a guild, once received from the gateway."""
+        self.names.add_guild(guild)
+
+    async def on_guild_join(self, guild: discord.Guild):
+        """Index the channels and roles of a joined guild."""
+        self.names.add_guild(guild)
+
+    async def on_guild_remove(self, guild: discord.Guild):
+        """Forget the channels and roles of a left guild."""
+        self.names.remove_guild(guild.id)
+
+    async def on_guild_channel_create(self, channel: discord.abc.GuildChannel):
+        """Index a created channel."""
+        self.names.add(channel)
+
+    async def on_guild_channel_update(self, before: discord.abc.GuildChannel, after: discord.abc.GuildChannel):
+        """Index the new name of a channel."""
+        self.names.add(after)
+
+    async def on_guild_channel_delete(self, channel: discord.abc.GuildChannel):
+        """Forget a deleted channel."""
+        self.names.remove(channel)
+
+    async def on_guild_role_create(self, role: discord.Role):
+        """Index a created role."""
+        self.names.add(role)
+
+    async def on_guild_role_update(self, before: discord.Role, after: discord.Role):
+        """Index the new name of a role."""
+        self.names.add(after)
+
+    async def on_guild_role_delete(self, role: discord.Role):
+        """Forget a deleted role."""
+        self.names.remove(role)
+
+    async def get_or_fetch_member(self, guild: discord.Guild, member_id: int) -> Optional[discord.Member]:
+        """Return a member of `guild`, fetching it when missing from the cache and the policy is `fetch`."""
+        if self.settings.member_cache == "fetch":
+            return await self.member_cache.get(guild, member_id)
+        return guild.get_member(member_id)
+
+    async def send_status(self, message: str) -> None:
+        """Send a message in the status channel."""
+        if self.status_chan:
+            await self.status_chan.send(message)
+
     async def async_cleanup(self):
         """Cleanup things when bot is stopping."""
         LOGGER.warning("Shutdown in progress..")
-        if self.cogs["Music"] and isinstance(self.cogs["Music"].player, MusicPlayer):
-            if isinstance(self.cogs["Music"].player.np, discord.Message):
-                with suppress(discord.HTTPException, discord.NotFound):
-                    # We are no longer playing this song...
-                    await self.cogs["Music"].player.np.delete()
-            await self.cogs["Music"].player.destroy(self.guild)
-        await self.status_chan.send("Bye bye.. 💔")
+        music = self.cogs.get("Music")
+        if music:
+            await music.cleanup_all()
+            # Only imported along the music command
+            from rbot.utils.yt_player import extractor_pool
+
+            extractor_pool.shutdown()
+        if self.watchdog:
+            self.watchdog.stop()
+        if self.metrics_server:
+            self.metrics_server.close()
+        if self.status_chan:
+            with suppress(discord.HTTPException, discord.NotFound):
+                await self.status_chan.send("Bye bye.. 💔")
 
     async def close(self):
         """Events if Rbot.run is over."""
@@ -75,10 +185,17 @@ class Rbot(commands.Bot):
         await super().close()
 
 
+class ShardedRbot(Rbot, commands.AutoShardedBot):
+    """Discord Bot running a subset of the shards, given by `shard_ids` and `shard_count`."""
+
+
 def start_bot() -> None:
     """Start a Discord Bot with settings from env (or .config)."""
+    settings = get_settings()
+    if not settings.discord_token:
+        LOGGER.error("Failed to run bot: No token, set RBOT_DISCORD_TOKEN")
+        return
     try:
-        settings = get_settings()
         bot = Rbot()
         bot.setup()
         bot.run(settings.discord_token)
@@ -1,21 +1,108 @@
 # Built-in modules
+import functools
 import logging
+import time
 
 # External modules
 from discord.ext import commands
 
+# Internal modules
+from rbot.utils.name_index import AmbiguousNameError
+from rbot.utils.profiling import command_profiler
+
+
+def _checks_done(ctx: commands.Context) -> bool:
+    """Last check of each command, marking the end of the checks phase."""
+    profile = getattr(ctx, "profile", None)
+    if profile:
+        profile.checked_at = time.perf_counter()
+    return True
+
+
+def _starts_body(hook):
+    """Wrap the before invoke hook of a command, run before the one of the cog, to start the body phase first."""
+
+    @functools.wraps(hook)
+    async def wrapper(*args):
+        profile = getattr(args[-1], "profile", None)
+        if profile:
+            command_profiler.start_body(profile)
+        return await hook(*args)
+
+    return wrapper
+
+
+def has_role(name: str):
+    """Check that the author has the role `name`, resolved by id through the name index of the bot."""
+
+    def predicate(ctx: commands.Context) -> bool:
+        if ctx.guild is None:
+            raise commands.NoPrivateMessage()
+        try:
+            role = ctx.bot.names.get_role(ctx.guild, name)
+        except AmbiguousNameError as error:
+            raise commands.CheckFailure(str(error)) from error
+        if role is None or not any(author_role.id == role.id for author_role in ctx.author.roles):
+            raise commands.MissingRole(name)
+        return True
+
+    return commands.check(predicate)
+
 
 class Base(commands.Cog):
-    """Rbot Base command."""
+    """Rbot Base command.
+
+    Each command invocation is profiled: `cog_check` starts the profile, the last check of the command ends the checks
+    phase, the before invoke hooks (of the command, then of the cog) end the arguments conversion and
+    `cog_after_invoke` ends the body. Work done by the before invoke hook of a command (like joining a voice channel)
+    is part of the body.
+    """
 
     def __init__(self, logger: logging.Logger = None):  # noqa:D107
         if logger:
             self.logger = logger
         else:
             self.logger = logging.getLogger("rich")
+        for command in self.walk_commands():
+            # The list of checks is shared with the callback and the other copies of the command
+            command.checks = [*command.checks, _checks_done]
+            if command._before_invoke is not None:
+                command.before_invoke(_starts_body(command._before_invoke))
         self.logger.debug("%s command registered", self.__class__.__name__)
 
+    async def cog_check(self, ctx: commands.Context) -> bool:
+        """Check run before the checks of each command."""
+        profile = getattr(ctx, "profile", None)
+        if profile is None:
+            ctx.profile = command_profiler.start(ctx.command.qualified_name)
+        else:
+            # Subcommands of a group are checked after the group itself
+            profile.command = ctx.command.qualified_name
+        return True
+
+    async def cog_before_invoke(self, ctx: commands.Context) -> None:
+        """Action run before each cog invoke, once its arguments are converted."""
+        profile = getattr(ctx, "profile", None)
+        if profile:
+            command_profiler.start_body(profile)
+
     async def cog_after_invoke(self, ctx: commands.Context) -> None:
         """Action run after each cog invoke."""
         params = ctx.args[2:]
         self.logger.info(f"Command '{ctx.invoked_with}' has been executed by '{ctx.author.name}' with {params=}")
+        profile = getattr(ctx, "profile", None)
+        if not profile:
+            return
+        command_profiler.finish(profile, self.logger)
+        phases = profile.phases
+        self.logger.debug(
+            "Command '%s' took %.3fs (checks %.3fs, conversion %.3fs, body %.3fs, %s REST calls %.3fs, %s waits)",
+            profile.command,
+            phases["total"],
+            phases["checks"],
+            phases["conversion"],
+            phases["body"],
+            profile.rest_calls,
+            phases["rest"],
+            profile.rate_limit_waits,
+        )
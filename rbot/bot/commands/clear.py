@@ -1,6 +1,11 @@
 # Built-in modules
+import asyncio
+import re
+import time
 import traceback
 from contextlib import suppress
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Optional, Union
 
 # External modules
 import discord
@@ -8,31 +13,202 @@ from discord.ext import commands
 
 # Internal modules
 from rbot.bot.commands.base import Base
+from rbot.utils.profiling import background_task
+from rbot.utils.rate_limit import RateLimiter
+
+# Discord refuses to bulk delete messages older than 14 days, keep a margin
+BULK_MAX_AGE = timedelta(days=14, minutes=-5)
+BULK_MAX_SIZE = 100
+PROGRESS_INTERVAL = 2
+
+
+def parse_filters(filters: tuple) -> tuple[Callable[[discord.Message], bool], Optional[object], Optional[object]]:
+    """Parse `key=value` filters of the clear command.
+
+    Supported keys are `author` (name, id or mention), `regex` (searched in the content), `before` and `after`
+    (message id or ISO date, in UTC).
+
+    Returns:
+        The check to apply on each message, and the `before` and `after` bounds of the channel history.
+    """
+    authors: set = set()
+    pattern: Optional[re.Pattern] = None
+    bounds: dict = {"before": None, "after": None}
+    for _filter in filters:
+        key, sep, value = _filter.partition("=")
+        if not sep or not value:
+            raise commands.BadArgument(f"Invalid filter '{_filter}', expected key=value")
+        if key == "author":
+            authors.add(value.strip("<@!>"))
+        elif key == "regex":
+            try:
+                pattern = re.compile(value)
+            except re.error as err:
+                raise commands.BadArgument(f"Invalid regex '{value}': {err}") from err
+        elif key in bounds:
+            bounds[key] = _parse_bound(value)
+        else:
+            raise commands.BadArgument(f"Unknown filter '{key}', use author, regex, before or after")
+
+    def check(msg: discord.Message) -> bool:
+        if authors and not authors.intersection({msg.author.name, msg.author.display_name, str(msg.author.id)}):
+            return False
+        return not pattern or bool(pattern.search(msg.content))
+
+    return check, bounds["before"], bounds["after"]
+
+
+def _parse_bound(value: str) -> Union[discord.Object, datetime]:
+    if value.isdigit():
+        return discord.Object(id=int(value))
+    try:
+        date = datetime.fromisoformat(value)
+    except ValueError as err:
+        raise commands.BadArgument(f"Invalid date or message id '{value}'") from err
+    if date.tzinfo is not None:
+        # discord.py compares history bounds with naive UTC datetimes
+        date = date.astimezone(timezone.utc).replace(tzinfo=None)
+    return date
+
+
+class ClearJob:
+    """Delete messages of a channel, by batches when possible.
+
+    Messages younger than 14 days are bulk deleted by batches of 100, older ones are deleted one by one. Both
+    strategies use different rate limit buckets, so they run concurrently, each one paced by its own limiter.
+    """
+
+    def __init__(self, channel: discord.TextChannel, progress: discord.Message, logger):
+        self.channel = channel
+        self.progress = progress
+        self.logger = logger
+        self.found = 0
+        self.deleted = 0
+        self._bulk_limiter = RateLimiter(rate=1, per=1)
+        self._single_limiter = RateLimiter(rate=5, per=5)
+        self._progress_at = 0.0
+
+    async def run(self, limit: int, check: Callable, before=None, after=None) -> None:
+        """Delete up to `limit` messages of the channel matching `check`."""
+        recent, old = [], []
+        bulk_limit = datetime.utcnow() - BULK_MAX_AGE
+        async for msg in self.channel.history(limit=limit, before=before, after=after):
+            if msg.id == self.progress.id or not check(msg):
+                continue
+            (recent if msg.created_at > bulk_limit else old).append(msg)
+        self.found = len(recent) + len(old)
+        await self.update_progress(force=True)
+        tasks = [asyncio.ensure_future(self._bulk_delete(recent)), asyncio.ensure_future(self._single_delete(old))]
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            # Stop deleting before reporting the failure (or the cancellation)
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+        await self.report(f"Cleared {self.deleted} messages.", delete_after=10)
+
+    async def _bulk_delete(self, messages: list) -> None:
+        for i in range(0, len(messages), BULK_MAX_SIZE):
+            batch = messages[i : i + BULK_MAX_SIZE]  # noqa: E203
+            if len(batch) == 1:
+                await self._single_delete(batch)
+                continue
+            await self._bulk_limiter.acquire()
+            try:
+                await self.channel.delete_messages(batch)
+            except discord.NotFound:
+                continue
+            self.deleted += len(batch)
+            await self.update_progress()
+
+    async def _single_delete(self, messages: list) -> None:
+        for msg in messages:
+            await self._single_limiter.acquire()
+            try:
+                await msg.delete()
+            except discord.NotFound:
+                continue
+            self.deleted += 1
+            await self.update_progress()
+
+    async def update_progress(self, force: bool = False) -> None:
+        """Edit the progress message, at most once every PROGRESS_INTERVAL seconds."""
+        now = time.monotonic()
+        if not force and now - self._progress_at < PROGRESS_INTERVAL:
+            return
+        self._progress_at = now
+        await self.report(f"Clearing.. {self.deleted}/{self.found} messages deleted")
+
+    async def report(self, content: str, delete_after: Optional[float] = None) -> None:
+        """Edit the progress message, unless it has been deleted."""
+        with suppress(discord.HTTPException, discord.NotFound):
+            await self.progress.edit(content=content, delete_after=delete_after)
 
 
 class Clear(Base):
     """Rbot Clear command, you can get delete messages in a chan."""
 
-    @commands.command(name="clear", help="Clear x messages from the current channel")
+    def __init__(self):  # noqa:D107
+        super().__init__()
+        self.jobs: dict[int, asyncio.Task] = {}
+
+    @commands.group(
+        name="clear",
+        invoke_without_command=True,
+        help="Clear x messages from the current channel, with optional author=, regex=, before= and after= filters",
+    )
     @commands.has_permissions(manage_messages=True, read_message_history=True)
     @commands.guild_only()
-    async def clear(self, ctx: commands.Context, number: int = 10) -> None:
+    async def clear(self, ctx: commands.Context, number: int = 10, *filters: str) -> None:
         """Clear command."""
+        check, before, after = parse_filters(filters)
+        with suppress(discord.HTTPException, discord.NotFound):
+            await ctx.message.delete()
+        if ctx.channel.id in self.jobs:
+            await ctx.send("ERROR: A clear is already running in this channel, use !clear cancel to stop it")
+            return
+        progress = await ctx.send("Clearing..")
+        job = ClearJob(ctx.channel, progress, self.logger)
+        task = background_task(job.run(number, check, before=before, after=after))
+        self.jobs[ctx.channel.id] = task
+        task.add_done_callback(lambda _task: self._on_job_done(_task, job))
+
+    def _on_job_done(self, task: asyncio.Task, job: ClearJob) -> None:
+        self.jobs.pop(job.channel.id, None)
+        if task.cancelled():
+            self.logger.info("Clear of channel '%s' cancelled after %s messages", job.channel.name, job.deleted)
+            asyncio.create_task(job.report(f"Clear cancelled, {job.deleted} messages deleted."))
+        elif task.exception():
+            error = task.exception()
+            self.logger.error("Exception in clear job: %s", "".join(traceback.format_exception(error)))
+            asyncio.create_task(job.report(f"ERROR: Clear failed after {job.deleted} messages deleted ({error})"))
+
+    @clear.command(name="cancel", help="Cancel the clear running in the current channel")
+    @commands.has_permissions(manage_messages=True)
+    @commands.guild_only()
+    async def clear_cancel(self, ctx: commands.Context) -> None:
+        """Cancel the running clear of the channel."""
         with suppress(discord.HTTPException, discord.NotFound):
             await ctx.message.delete()
-        await ctx.channel.purge(limit=number)
+        task = self.jobs.get(ctx.channel.id)
+        if task:
+            task.cancel()
 
     @clear.error
     async def clear_error(self, ctx: commands.Context, error: Exception) -> discord.Message:
         """Errors related to command."""
         self.logger.error("Exception in clear: %s", traceback.format_exc())
+        if isinstance(error, commands.CommandInvokeError):
+            error = error.original
         if isinstance(error, commands.NoPrivateMessage):
             with suppress(discord.HTTPException):
                 return await ctx.send("This command can not be used in Private Messages.")
         if isinstance(error, commands.MissingRequiredArgument):
             return await ctx.send("ERROR: It misses the number of messages to delete, eg: !clear 23")
         if isinstance(error, commands.BadArgument):
-            return await ctx.send("ERROR: Bad argument, eg: !clear messages_to_delete")
+            return await ctx.send(f"ERROR: Bad argument, eg: !clear messages_to_delete author=name ({error})")
         if isinstance(error, commands.MissingPermissions):
             return await ctx.send("ERROR: You don't have the right permissions to do that")
         return await ctx.send(f"ERROR: {error}")
@@ -1,7 +1,9 @@
 # Built-in modules
-import json
+import os
 import traceback
 from contextlib import suppress
+from datetime import datetime, timezone
+from functools import partial
 
 # External modules
 import discord
@@ -9,6 +11,8 @@ from discord.ext import commands
 
 # Internal modules
 from rbot.bot.commands.base import Base
+from rbot.utils.history_export import DATE_FMT, ExportCursor, get_exporter
+from rbot.utils.name_index import AmbiguousNameError
 
 
 class History(Base):
@@ -17,36 +21,59 @@ class History(Base):
     def __init__(self, bot):
         super().__init__()
         self.bot: commands.Bot = bot
+        # Fails at startup on an unknown format, rather than on each command
+        self.exporter_cls = get_exporter(bot.settings.history_format)
 
-    @commands.command(name="history", help="Save x lines of a channel")
+    @commands.command(name="history", help="Save x lines of a channel, use resume to only save new messages")
     @commands.has_permissions(administrator=True)
     @commands.guild_only()
-    async def history(self, ctx: commands.Context, channel: str, limit: int = 10000) -> discord.Message:
+    async def history(
+        self,
+        ctx: commands.Context,
+        channel: str,
+        limit: int = 10000,
+        resume: bool = False,
+    ) -> discord.Message:
         """History command."""
-        history: list = []
         with suppress(discord.HTTPException, discord.NotFound):
             await ctx.message.delete()
-        chan = discord.utils.find(lambda c: c.name == channel, self.bot.guild.text_channels)
-        async for msg in chan.history(limit=limit):
-            if msg.author == ctx.author or msg.author.name == self.bot.user.name:
+        try:
+            chan = self.bot.names.get_channel(ctx.guild, channel)
+        except AmbiguousNameError as error:
+            return await ctx.send(f"ERROR: {error}")
+        if not chan:
+            return await ctx.send(f"ERROR: Channel `{channel}` not found")
+        directory = self.bot.settings.history_dir
+        await self.bot.loop.run_in_executor(None, partial(os.makedirs, directory, exist_ok=True))
+        prefix = os.path.join(directory, f"{ctx.guild.id}-{chan.name}")
+        cursor = ExportCursor(f"{prefix}.cursor", self.bot.loop)
+        after = await cursor.load() if resume else None
+        timestamp = datetime.now(tz=timezone.utc).strftime("%Y%m%dT%H%M%S")
+        exporter = self.exporter_cls(f"{prefix}-{timestamp}.{self.exporter_cls.extension}", self.bot.loop)
+        last_id = None
+        history = chan.history(limit=limit, after=discord.Object(id=after) if after else None)
+        async for msg in history:
+            last_id = msg.id if last_id is None else max(last_id, msg.id)
+            if msg.author == ctx.author or msg.author.id == self.bot.user.id:
                 continue
-            if len(history) == limit:
-                break
-            history.append(
+            await exporter.write(
                 {
+                    "id": msg.id,
                     "content": msg.content,
-                    "created_at": msg.created_at.strftime("%Y-%m-%dT%H:%M:%S"),
+                    "created_at": msg.created_at.strftime(DATE_FMT),
                     "author_name": msg.author.name,
                 },
             )
-        if not history:
+        await exporter.close()
+        if last_id:
+            await cursor.save(last_id)
+        if not exporter.count:
             return await ctx.send(
-                f"In the {limit} message of `{channel}`, no messages",
+                f"In the {limit} message of `{channel}`, no messages "
                 f"to save of other users (not @{ctx.author.name} or the bot)",
             )
-        await History._to_json(history)
         return await ctx.send(
-            f"{len(history)} messages of channel `{channel}` have been saved.",
+            f"{exporter.count} messages of channel `{channel}` have been saved.",
         )
 
     @history.error
@@ -61,10 +88,5 @@ class History(Base):
                 "ERROR: It misses the channel and/or the number of messages to save, eg: !history général 2",
             )
         if isinstance(error, commands.BadArgument):
-            return await ctx.send("ERROR: Bad argument, eg: !history <channel> <number_of_messages>")
+            return await ctx.send("ERROR: Bad argument, eg: !history <channel> <number_of_messages> <resume>")
         return await ctx.send(f"ERROR: {error}")
-
-    @staticmethod
-    async def _to_json(data: list, path: str = "./history.json") -> None:
-        with open(path, "w+", encoding="utf-8") as _file:
-            json.dump(data, _file, ensure_ascii=False, indent=4)
@@ -5,26 +5,59 @@ import logging
 import re
 import traceback
 from contextlib import suppress
-from typing import Optional
+from datetime import timedelta
+from typing import Optional, Union
 
 # External modules
 import discord
 import pytz
 from async_timeout import timeout
 from discord.ext import commands
-from youtubesearchpython import VideosSearch
 
 # Internal modules
-from rbot.bot.commands.base import Base
+from rbot.bot.commands.base import Base, has_role
+from rbot.utils.name_index import AmbiguousNameError
+from rbot.utils.player_state import PlayerStateStore
+from rbot.utils.playlist import Playlist
+from rbot.utils.profiling import background_task
+from rbot.utils.resilience import CircuitOpenError
 from rbot.utils.settings import get_settings
-from rbot.utils.yt_player import YTDLSource
+from rbot.utils.yt_player import (
+    InstrumentedSource,
+    YTDLOpusSource,
+    YTDLSource,
+    extract_info,
+    to_song,
+    yt_search,
+    ytdl_cache,
+)
 
 MUSIC_ROLE = get_settings().music_role
 YT_URL_RE = re.compile("^http(|s)://(www|m|).youtu(.be|be.com)/watch.+$")
+YT_PLAYLIST_RE = re.compile(r"^https?://(www\.|m\.)?youtube\.com/playlist\?.*list=.+$")
 TZ = pytz.timezone("Europe/Paris")
 EMOJI_NUMBERS = ["1️⃣", "2️⃣", "3️⃣", "4️⃣", "5️⃣", "6️⃣", "7️⃣", "8️⃣", "9️⃣", "🔟"]
 DISK_ICON = "https://www.pngplay.com/wp-content/uploads/3/Disque-Vinyle-Transparentes-Fond-PNG.png"
 EMOJI_PLAY_PAUSE = ["▶️", "⏸️"]
+PREFETCH_INTERVAL = 5
+# Number of upcoming songs displayed in the player, and per page of the queue command
+PLAYER_QUEUE_SIZE = 9
+QUEUE_PAGE_SIZE = 10
+# Changes of the player within this delay (in seconds) are rendered at once
+RENDER_DELAY = 0.5
+# Interval (in seconds) between two saves of the playback position
+STATE_SAVE_INTERVAL = 5
+player_states = PlayerStateStore.from_settings()
+
+
+def _dump_song(song: dict) -> dict:
+    requester = song.get("requester")
+    return {**song, "requester": getattr(requester, "id", requester)}
+
+
+def _load_song(song: dict, members: dict) -> dict:
+    requester = song.get("requester")
+    return {**song, "requester": members.get(requester) or requester}
 
 
 class MusicPlayer(commands.Cog):
@@ -35,21 +68,34 @@ class MusicPlayer(commands.Cog):
     When the bot disconnects from the Voice it's instance will be destroyed.
     """
 
-    def __init__(self, ctx: commands.Context, logger: logging.Logger):
+    def __init__(
+        self,
+        bot: commands.Bot,
+        guild: discord.Guild,
+        channel: discord.TextChannel,
+        cog: commands.Cog,
+        logger: logging.Logger,
+    ):
         self.logger = logger
-        self.bot: commands.Bot = ctx.bot
-        self._guild: discord.Guild = ctx.guild
-        self._channel: discord.TextChannel = ctx.channel
-        self._cog: commands.Cog = ctx.cog
-        self.queue: asyncio.Queue = asyncio.Queue(maxsize=10)
+        self.bot: commands.Bot = bot
+        self._guild: discord.Guild = guild
+        self._channel: discord.TextChannel = channel
+        self._cog: commands.Cog = cog
+        self.queue: Playlist = Playlist()
+        self.queue.on_change = self.save_state
         self.next: asyncio.Event = asyncio.Event()
         self.np: Optional[discord.Message] = None  # Now playing message
         self.volume: int = 1
-        self.current: Optional[YTDLSource] = None
-        ctx.bot.loop.create_task(self.player_loop())
-
-    # def get_total_musics_duration_sec(self) -> int:
-    #     return sum([music.get("duration_sec", 0) for music in ])
+        self.current: Optional[Union[YTDLSource, YTDLOpusSource]] = None
+        self.current_song: Optional[dict] = None  # Song of the queue being played
+        self.playing: Optional[InstrumentedSource] = None
+        self.idle_timeout: int = bot.settings.music_idle_timeout
+        self.prefetch_size: int = bot.settings.music_prefetch_size
+        self._render_task: Optional[asyncio.Task] = None
+        self._render_pending: bool = False
+        self._rendered: Optional[tuple] = None  # Content of the now playing message
+        self._resolvers: set = set()
+        self._task: asyncio.Task = background_task(self.player_loop(), bot.loop)
 
     def player_embed(self) -> discord.Embed:
         """Return a player embed, to be send in a discord.TextChannel."""
@@ -74,7 +120,7 @@ class MusicPlayer(commands.Cog):
         if upcoming:
             embed.add_field(
                 name="─────────────",
-                value="Next songs",
+                value=f"Next songs ({len(self.queue)} - {timedelta(seconds=self.queue.duration_sec)})",
                 inline=False,
             )
             for i, music in enumerate(upcoming):
@@ -115,30 +161,152 @@ class MusicPlayer(commands.Cog):
         ]
 
     async def now_playing(self) -> None:
+        """Update the bot presence and the now playing message with the current song."""
         if not self.current:
             return
-        """Send a discord.Message with a player and update self.np with that message."""
         await self.bot.change_presence(
             activity=discord.Activity(
                 type=discord.ActivityType.listening,
                 name=f"🎵 {self.current.title} 🎵",
             ),
         )
+        self.request_render()
+
+    def request_render(self) -> None:
+        """Schedule a refresh of the now playing message.
+
+        Requests received within RENDER_DELAY seconds are coalesced into a single render.
+        """
+        self._render_pending = True
+        if self._render_task is None or self._render_task.done():
+            self._render_task = background_task(self._render_loop(), self.bot.loop)
+
+    async def _render_loop(self) -> None:
+        while self._render_pending:
+            await asyncio.sleep(RENDER_DELAY)
+            self._render_pending = False
+            try:
+                await self.render()
+            except discord.HTTPException as err:
+                self.logger.warning("Failed to render the player of guild '%s': %s", self._guild.name, err)
+            except Exception:  # noqa: B902
+                self.logger.error("Exception in render of guild '%s': %s", self._guild.name, traceback.format_exc())
+
+    async def render(self) -> None:
+        """Edit the now playing message in place (or send it), unless its content did not change."""
+        if self._guild.voice_client is None:
+            # Disconnected, the player is being cleaned up
+            return
+        embed = self.player_embed()
+        if not embed:
+            return
+        components = self.player_components()
+        rendered = (embed.to_dict(), [row.to_dict() for row in components])
+        if isinstance(self.np, discord.Message):
+            if rendered == self._rendered:
+                return
+            try:
+                await self.np.edit(embed=embed, components=components)
+            except discord.NotFound:
+                self.np = None
+        if not isinstance(self.np, discord.Message):
+            self.np = await self._channel.send(embed=embed, components=components)
+        self._rendered = rendered
+
+    async def clear_now_playing(self) -> None:
+        """Delete the now playing message."""
+        if self._render_task:
+            self._render_task.cancel()
         if isinstance(self.np, discord.Message):
             with suppress(discord.HTTPException, discord.NotFound):
                 await self.np.delete()
-        embed = self.player_embed()
-        components = self.player_components()
-        self.np = await self._channel.send(embed=embed, components=components)
+        self.np = None
+        self._rendered = None
 
     async def stream(self, source: dict) -> Optional[YTDLSource]:
-        """Stream the music."""
+        """Stream the music, or return None if its stream can not be resolved, to skip it."""
         self.logger.debug("source state in queue: %s", source)
         try:
-            return await YTDLSource.regather_stream(source, self.bot.loop)
+            return await YTDLSource.regather_stream(source, self.bot.loop, volume=self.volume)
+        except CircuitOpenError as err:
+            self.logger.warning("Skip '%s': %s", source.get("url"), err)
+            await self._channel.send(f"Skipped `{source.get('title')}`, {err}")
         except Exception as err:
             self.logger.error("Exception in player_loop: %s", traceback.format_exc())
-            await self._channel.send(f"There was an error processing your song.\n" f"```css\n[{err}]\n```")
+            await self._channel.send(
+                f"There was an error processing your song, skipped `{source.get('title')}`.\n```css\n[{err}]\n```"
+            )
+
+    async def prefetch(self) -> None:
+        """Resolve the stream urls of the next songs while the current one plays.
+
+        Urls close to their expiration are dropped from the cache, so they get resolved again here.
+        """
+        failed: set = set()
+        while True:
+            for source in itertools.islice(self.queue, self.prefetch_size):
+                url = source.get("url", "")
+                if not url or url in failed or ytdl_cache.has_stream(url):
+                    continue
+                self.logger.debug("Prefetch stream of '%s'", source.get("title"))
+                try:
+                    await extract_info(url, self.bot.loop)
+                except Exception as err:  # noqa: B902
+                    failed.add(url)
+                    self.logger.warning("Failed to prefetch '%s': %s", url, err)
+            await asyncio.sleep(PREFETCH_INTERVAL)
+
+    def position(self) -> float:
+        """Return the playback position of the current song, in seconds."""
+        if not self.current_song:
+            return 0
+        return self.current_song.get("start", 0) + (self.playing.played_sec if self.playing else 0)
+
+    def state(self) -> dict:
+        """Return the state of the player, to resume it after a restart."""
+        voice_client = self._guild.voice_client
+        return {
+            "voice_channel_id": voice_client.channel.id if voice_client else None,
+            "text_channel_id": self._channel.id,
+            "volume": self.volume,
+            "current": {**_dump_song(self.current_song), "start": self.position()} if self.current_song else None,
+            "queue": [_dump_song(song) for song in self.queue],
+            "np_message_id": self.np.id if isinstance(self.np, discord.Message) else None,
+        }
+
+    def save_state(self) -> None:
+        """Schedule a save of the player state."""
+        if player_states:
+            player_states.save(self._guild.id, self.state)
+
+    async def _save_position(self) -> None:
+        while True:
+            await asyncio.sleep(STATE_SAVE_INTERVAL)
+            self.save_state()
+
+    def resolve(self, songs: list) -> None:
+        """Resolve in background the full metadata of songs queued from a playlist."""
+        task = background_task(self._resolve(songs), self.bot.loop)
+        self._resolvers.add(task)
+        task.add_done_callback(self._resolvers.discard)
+
+    async def _resolve(self, songs: list) -> None:
+        slots = asyncio.Semaphore(self.bot.settings.ytdl_playlist_concurrency)
+
+        async def _resolve_song(song: dict) -> None:
+            async with slots:
+                if song not in self.queue:
+                    # Already played or removed from the queue
+                    return
+                try:
+                    data = await extract_info(song["url"], self.bot.loop)
+                except Exception as err:  # noqa: B902
+                    self.logger.warning("Failed to resolve '%s': %s", song["url"], err)
+                    return
+            self.queue.update(song, to_song(data, song["requester"]))
+            self.request_render()
+
+        await asyncio.gather(*(_resolve_song(song) for song in songs))
 
     async def player_loop(self) -> None:
         """Main player loop."""
@@ -147,21 +315,33 @@ class MusicPlayer(commands.Cog):
             self.next.clear()
             try:
                 # Wait for the next song. If we timeout cancel the player and disconnect...
-                async with timeout(300):
-                    source = await self.queue.get()  # Block when no item in self.ueue
+                async with timeout(self.idle_timeout):
+                    source = await self.queue.get()  # Block when no item in self.queue
                     self.logger.info("Player loop wait for source: %s", source)
             except asyncio.TimeoutError:
-                if not isinstance(self.current, YTDLSource):
-                    self.logger.info("Player destroyed because no music in player queue for more than 300s")
-                    self.destroy(self._guild)
-                    return
+                self.logger.info(
+                    "Player of guild '%s' destroyed because no music in player queue for more than %ss",
+                    self._guild.name,
+                    self.idle_timeout,
+                )
+                self.destroy(self._guild)
+                return
+            self.current_song = source
             self.current = await self.stream(source)
             self.logger.info("Player loop before wait: %s", f"{self.current=}")
             if not self.current:
+                self.current_song = None
                 continue
-            self.current.volume = self.volume
-            self._guild.voice_client.play(
-                self.current,
+            voice_client = self._guild.voice_client
+            if voice_client is None:
+                self.logger.warning("Player of guild '%s' destroyed, disconnected from voice", self._guild.name)
+                self.current.cleanup()
+                self.current = None
+                self.destroy(self._guild)
+                return
+            playing = self.playing = InstrumentedSource(self.current, self._guild.id)
+            voice_client.play(
+                playing,
                 after=lambda _: self.bot.loop.call_soon_threadsafe(self.next.set),
             )
             await self.now_playing()
@@ -170,16 +350,32 @@ class MusicPlayer(commands.Cog):
                 self.current.title,
                 self.current.duration_sec,
             )
-            await self.next.wait()
+            self.save_state()
+            prefetch = self.bot.loop.create_task(self.prefetch())
+            save_position = self.bot.loop.create_task(self._save_position())
+            try:
+                await self.next.wait()
+            finally:
+                prefetch.cancel()
+                save_position.cancel()
+            self.logger.info(
+                "Player loop played %s frames (%s bytes), %s late frames and %s underruns",
+                playing.frames,
+                playing.bytes,
+                playing.late_frames,
+                playing.underruns,
+            )
             # Make sure the FFmpeg process is cleaned up.
             if self.current:
                 self.current.cleanup()
                 self.current = None
-            await self.bot.change_presence(status=discord.Status.idle)
-            if isinstance(self.np, discord.Message):
-                with suppress(discord.HTTPException, discord.NotFound):
-                    # We are no longer playing this song...
-                    await self.np.delete()
+            self.current_song = None
+            self.playing = None
+            self.save_state()
+            if self.queue.empty():
+                # Nothing to play next, the now playing message is edited in place otherwise
+                await self.bot.change_presence(status=discord.Status.idle)
+                await self.clear_now_playing()
 
     def pause(self) -> None:
         """Pause the music player."""
@@ -203,15 +399,33 @@ class MusicPlayer(commands.Cog):
         self.destroy(self._guild)
 
     def get_queue(self) -> list:
-        """Return the list of next musics from the Asyncio Queue."""
-        queue = getattr(self.queue, "_queue", None)
-        if self.queue.empty() or not queue:
-            return []
-        return list(itertools.islice(queue, 0, 9))
+        """Return the next musics displayed in the player."""
+        return self.queue.page(0, PLAYER_QUEUE_SIZE)
 
     def destroy(self, guild: discord.Guild) -> asyncio.Task:
         """Disconnect and cleanup the player."""
-        return self.bot.loop.create_task(self._cog.cleanup(guild))
+        return background_task(self._cog.cleanup(guild), self.bot.loop)
+
+    async def teardown(self, keep_message: bool = False) -> None:
+        """Stop the player loop and remove the now playing message, unless `keep_message` to reuse it."""
+        for task in self._resolvers:
+            task.cancel()
+        if self._task is not asyncio.current_task() and not self._task.done():
+            self._task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._task
+        voice_client = self._guild.voice_client
+        if self.playing and voice_client:
+            # The audio player thread cleans up the source once stopped, while it may be reading a frame
+            voice_client.stop()
+        elif self.current:
+            self.current.cleanup()
+        self.current = None
+        self.playing = None
+        if not keep_message:
+            await self.clear_now_playing()
+        elif self._render_task:
+            self._render_task.cancel()
 
 
 class Music(Base):
@@ -220,34 +434,108 @@ class Music(Base):
     def __init__(self, bot: commands.Bot):  # noqa:D107
         super().__init__()
         self.bot: commands.Bot = bot
-        self.player: Optional[MusicPlayer] = None
+        self.players: dict[int, MusicPlayer] = {}
+        self._restored: bool = False
 
     def get_player(self, ctx: commands.Context) -> MusicPlayer:
         """Retrieve the guild player, or generate one."""
-        if not self.player:
-            self.player = MusicPlayer(ctx, self.logger)
-        return self.player
-
-    async def cleanup(self, guild: discord.Guild):
-        """Cleanup bot, disconnect it and properly remove player."""
-        self.logger.info("Cleanup Music Player")
-        await self.bot.change_presence(status=discord.Status.idle)
-        if isinstance(self.player, MusicPlayer):
-            del self.player
-            self.player = None
+        player = self.players.get(ctx.guild.id)
+        if not player:
+            player = MusicPlayer(ctx.bot, ctx.guild, ctx.channel, self, self.logger)
+            self.players[ctx.guild.id] = player
+        return player
+
+    @commands.Cog.listener()
+    async def on_ready(self) -> None:
+        """Resume the players saved before the last restart."""
+        if not player_states or self._restored:
+            return
+        self._restored = True
+        states = await self.bot.loop.run_in_executor(None, player_states.load_all)
+        for guild_id, state in states.items():
+            guild = self.bot.get_guild(guild_id)
+            if guild is None:
+                # Not in the shards of this bot
+                continue
+            try:
+                await self.restore(guild, state)
+            except Exception as err:  # noqa: B902
+                self.logger.error("Failed to restore Music Player of guild '%s': %s", guild.name, err)
+                player_states.delete(guild_id)
+
+    async def restore(self, guild: discord.Guild, state: dict) -> None:
+        """Rejoin the voice channel of a saved player and resume its queue, the current song at its position."""
+        voice_channel = guild.get_channel(state.get("voice_channel_id") or 0)
+        channel = guild.get_channel(state.get("text_channel_id") or 0)
+        songs = ([state["current"]] if state.get("current") else []) + state.get("queue", [])
+        if not isinstance(voice_channel, discord.VoiceChannel) or channel is None or not songs:
+            player_states.delete(guild.id)
+            return
+        if guild.voice_client is None:
+            await voice_channel.connect()
+        player = MusicPlayer(self.bot, guild, channel, self, self.logger)
+        player.volume = state.get("volume", 1)
+        if state.get("np_message_id"):
+            # Edited in place once the first song plays
+            with suppress(discord.HTTPException, discord.NotFound):
+                player.np = await channel.fetch_message(state["np_message_id"])
+        members = {}
+        for requester in {song.get("requester") for song in songs if isinstance(song.get("requester"), int)}:
+            members[requester] = await self.bot.get_or_fetch_member(guild, requester)
+        for song in songs:
+            player.queue.append(_load_song(song, members))
+        self.players[guild.id] = player
+        self.logger.info("Music Player of guild '%s' restored with %s songs", guild.name, len(songs))
+
+    async def cleanup(self, guild: discord.Guild, forget: bool = True):
+        """Cleanup bot, disconnect it and properly remove player.
+
+        Args:
+            guild (discord.Guild): guild of the player.
+            forget (bool): forget the player state, otherwise save it to resume the player after a restart.
+        """
+        self.logger.info("Cleanup Music Player of guild '%s'", guild.name)
+        player = self.players.pop(guild.id, None)
+        if isinstance(player, MusicPlayer):
+            if player_states and forget:
+                player_states.delete(guild.id)
+            elif player_states:
+                state = player.state()
+                player_states.save(guild.id, lambda: state)
+            await player.teardown(keep_message=not forget and bool(player_states))
+        if not self.players:
+            await self.bot.change_presence(status=discord.Status.idle)
         if isinstance(guild.voice_client, discord.VoiceProtocol):
             await guild.voice_client.disconnect()
 
+    async def cleanup_all(self):
+        """Cleanup every guild player concurrently, saving their state."""
+        guilds = [player._guild for player in self.players.values()]
+        results = await asyncio.gather(
+            *(self.cleanup(guild, forget=False) for guild in guilds),
+            return_exceptions=True,
+        )
+        for guild, result in zip(guilds, results):
+            if isinstance(result, Exception):
+                self.logger.error("Failed to cleanup Music Player of guild '%s': %s", guild.name, result)
+        if player_states:
+            await player_states.flush()
+
     def is_invoked_in_music_chan(ctx: commands.Context) -> bool:  # noqa: N805
         """Check if command has been invoked in the right chan."""
-        if ctx.message.channel.name != ctx.bot.settings.music_chan:
+        if ctx.guild is None:
+            raise commands.NoPrivateMessage()
+        try:
+            music_chan = ctx.bot.names.get_channel(ctx.guild, ctx.bot.settings.music_chan)
+        except AmbiguousNameError as error:
+            raise commands.UserInputError(str(error)) from error
+        if music_chan is None or ctx.channel.id != music_chan.id:
             raise commands.UserInputError(f"You have to run command in the {ctx.bot.settings.music_chan} channel")
         return True
 
-    def gen_yt_select_menu(self, search: str) -> Optional[discord.SelectMenu]:
+    async def gen_yt_select_menu(self, search: str) -> Optional[discord.SelectMenu]:
         """Generate a discord.SelectMenu using Youtube search results from youtubesearchpython."""
-        videos_search = VideosSearch(search, limit=10).result()
-        videos_search = videos_search.get("result", [])
+        videos_search = await yt_search.search(search, self.bot.loop)
         if not videos_search:
             return None
         results = [
@@ -280,7 +568,7 @@ class Music(Base):
     async def get_search(self, ctx: commands.Context, search: str) -> str:
         """Get YT url from a user input (Select component)."""
         self.logger.info("Search query: %s", search)
-        select_songs = self.gen_yt_select_menu(search)
+        select_songs = await self.gen_yt_select_menu(search)
         if not select_songs:
             with suppress(discord.HTTPException, discord.NotFound):
                 await ctx.message.delete()
@@ -308,7 +596,7 @@ class Music(Base):
         help="Search a music from Youtube and play it, or use direct url instead of search !",
     )
     @commands.check(is_invoked_in_music_chan)
-    @commands.has_role(MUSIC_ROLE)
+    @has_role(MUSIC_ROLE)
     @commands.guild_only()
     async def play_music(self, ctx: commands.Context, search: str, *args) -> None:
         """
@@ -321,72 +609,148 @@ class Music(Base):
         _args = [arg for arg in args]  # noqa: C416
         if _args:
             search = f"{search.strip()} {' '.join(_args)}"
-        if not YT_URL_RE.match(search):
+        if not YT_URL_RE.match(search) and not YT_PLAYLIST_RE.match(search):
             search = await self.get_search(ctx, search)
         with suppress(discord.HTTPException, discord.NotFound):
             await ctx.message.delete()
         if not search:
             return
         player = self.get_player(ctx)
-        source = await YTDLSource.create_source(ctx, url=search, loop=self.bot.loop)
-        await player.queue.put(source)
+        if YT_PLAYLIST_RE.match(search):
+            songs = await YTDLSource.create_playlist_sources(
+                ctx,
+                url=search,
+                loop=self.bot.loop,
+                max_size=self.bot.settings.ytdl_playlist_max_size,
+            )
+            for song in songs:
+                player.queue.append(song)
+            player.resolve(songs)
+        else:
+            source = await YTDLSource.create_source(ctx, url=search, loop=self.bot.loop)
+            player.queue.append(source)
         # Update Player Discord Component with new song
-        if isinstance(player.np, discord.Message):
-            with suppress(discord.HTTPException, discord.NotFound):
-                await player.np.delete()
-            await player.now_playing()
+        if player.current:
+            player.request_render()
         with suppress(asyncio.TimeoutError):
             await self.bot.wait_for("player_play_button", timeout=1)
             await self.bot.wait_for("player_pause_button", timeout=1)
             await self.bot.wait_for("player_stop_button", timeout=1)
             await self.bot.wait_for("player_next_button", timeout=1)
 
+    @commands.command(name="queue", aliases=["q"], help="Show a page of the music queue")
+    @commands.check(is_invoked_in_music_chan)
+    @commands.guild_only()
+    async def show_queue(self, ctx: commands.Context, page: int = 1) -> discord.Message:
+        """Show a page of the queue."""
+        player = self.players.get(ctx.guild.id)
+        if not player or player.queue.empty():
+            return await ctx.send("The music queue is empty.")
+        pages = player.queue.pages(QUEUE_PAGE_SIZE)
+        page = min(max(page, 1), pages)
+        embed = discord.Embed(
+            title=f"Music queue - {len(player.queue)} songs - {timedelta(seconds=player.queue.duration_sec)}",
+            color=discord.Color.blue(),
+        )
+        first = (page - 1) * QUEUE_PAGE_SIZE
+        for i, music in enumerate(player.queue.page(page - 1, QUEUE_PAGE_SIZE), start=first + 1):
+            embed.add_field(name=f"{i}. {music['title']} - {music['duration']}", value=music["url"], inline=False)
+        embed.set_footer(text=f"Page {page}/{pages}")
+        return await ctx.send(embed=embed)
+
+    @commands.command(name="remove", help="Remove the song at the given position of the queue")
+    @commands.check(is_invoked_in_music_chan)
+    @has_role(MUSIC_ROLE)
+    @commands.guild_only()
+    async def remove_song(self, ctx: commands.Context, position: int) -> discord.Message:
+        """Remove a song from the queue."""
+        player = self.players.get(ctx.guild.id)
+        if not player or not 1 <= position <= len(player.queue):
+            raise commands.BadArgument(f"No song at position {position} of the queue")
+        music = player.queue.remove(position - 1)
+        player.request_render()
+        return await ctx.send(f"`{music['title']}` removed from the queue.")
+
+    @commands.command(name="move", help="Move a song of the queue to another position")
+    @commands.check(is_invoked_in_music_chan)
+    @has_role(MUSIC_ROLE)
+    @commands.guild_only()
+    async def move_song(self, ctx: commands.Context, position: int, to_position: int) -> discord.Message:
+        """Move a song of the queue."""
+        player = self.players.get(ctx.guild.id)
+        if not player or not 1 <= position <= len(player.queue) or not 1 <= to_position <= len(player.queue):
+            raise commands.BadArgument(f"Positions must be between 1 and {len(player.queue) if player else 0}")
+        player.queue.move(position - 1, to_position - 1)
+        player.request_render()
+        return await ctx.send(f"`{player.queue[to_position - 1]['title']}` moved to position {to_position}.")
+
+    @commands.command(name="shuffle", help="Shuffle the music queue")
+    @commands.check(is_invoked_in_music_chan)
+    @has_role(MUSIC_ROLE)
+    @commands.guild_only()
+    async def shuffle_queue(self, ctx: commands.Context) -> discord.Message:
+        """Shuffle the queue."""
+        player = self.players.get(ctx.guild.id)
+        if not player or player.queue.empty():
+            return await ctx.send("The music queue is empty.")
+        player.queue.shuffle()
+        player.request_render()
+        return await ctx.send("Music queue shuffled.")
+
+    @show_queue.error
+    @remove_song.error
+    @move_song.error
+    @shuffle_queue.error
+    async def queue_error(self, ctx: commands.Context, error: Exception) -> discord.Message:
+        """Errors related to queue commands."""
+        self.logger.error("Exception in %s: %s", ctx.invoked_with, traceback.format_exc())
+        if isinstance(error, commands.NoPrivateMessage):
+            with suppress(discord.HTTPException):
+                return await ctx.send("This command can not be used in Private Messages.")
+        if isinstance(error, commands.CommandInvokeError):
+            error = error.original
+        if isinstance(error, (commands.BadArgument, commands.MissingRequiredArgument)):
+            return await ctx.send(f"ERROR: Bad argument -> {error}")
+        return await ctx.send(f"ERROR: {error}")
+
     @commands.Cog.on_click(custom_id="player_play_button")
     async def player_play(self, i: discord.Interaction, button) -> None:
         """Action when Play button is triggered."""
         await i.defer()
-        if not self.player:
-            return
-        self.player.resume()
-        embed = self.player.player_embed()
-        if not embed:
+        player = self.players.get(i.guild_id)
+        if not player:
             return
-        components = self.player.player_components()
-        await i.edit(embed=embed, components=components)
+        player.resume()
+        player.request_render()
 
     @commands.Cog.on_click(custom_id="player_pause_button")
     async def player_pause(self, i: discord.Interaction, button) -> None:
         """Action when Pause button is triggered."""
         await i.defer()
-        if not self.player:
+        player = self.players.get(i.guild_id)
+        if not player:
             return
-        self.player.pause()
-        embed = self.player.player_embed()
-        if not embed:
-            return
-        components = self.player.player_components()
-        await i.edit(embed=embed, components=components)
+        player.pause()
+        player.request_render()
 
     @commands.Cog.on_click(custom_id="player_stop_button")
     async def player_stop(self, i: discord.Interaction, button) -> None:
         """Action when Stop button is triggered."""
         await i.defer()
-        if not self.player:
+        player = self.players.get(i.guild_id)
+        if not player:
             return
-        self.player.stop()
+        player.stop()
 
     @commands.Cog.on_click(custom_id="player_next_button")
     async def player_next(self, i: discord.Interaction, button) -> None:
         """Action when Next button is triggered."""
         await i.defer()
-        if not self.player:
-            return
-        self.player.next_song()
-        embed = self.player.player_embed()
-        if not embed:
+        player = self.players.get(i.guild_id)
+        if not player:
             return
-        components = self.player.player_components()
-        await i.edit(embed=embed, components=components)
+        player.next_song()
+        player.request_render()
 
     @play_music.error
     async def play_music_error(self, ctx: commands.Context, error: Exception) -> discord.Message:
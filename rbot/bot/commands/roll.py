@@ -1,6 +1,5 @@
 # Built-in modules
 import asyncio
-import random
 import traceback
 from contextlib import suppress
 
@@ -10,41 +9,54 @@ from discord.ext import commands
 
 # Internal modules
 from rbot.bot.commands.base import Base
+from rbot.utils.dice import DiceError, DiceRoll
+from rbot.utils.rate_limit import RateLimiter
+from rbot.utils.settings import get_settings
 
 EMOJI_NUMBERS = ["1️⃣", "2️⃣", "3️⃣", "4️⃣", "5️⃣", "6️⃣"]
+# Above this number of kept dice, only the total is displayed
+MAX_DISPLAYED_DICE = 20
 
 
 class Roll(Base):
     """Rbot Roll command, you can get a dice roll using text chat."""
 
-    @commands.command(name="roll", help="Make a roll of x dice(s)")
-    async def roll(self, ctx: commands.Context, number_of_dice: int = 1) -> discord.Message:
+    def __init__(self):  # noqa:D107
+        super().__init__()
+        self.animate: bool = get_settings().roll_animation
+        # Animations are skipped when more than 5 rolls have been animated in the last 5 seconds
+        self.animations = RateLimiter(rate=5, per=5)
+
+    @commands.command(name="roll", help="Make a roll of x dice(s), or use a dice notation, eg: 4d6+2 or 100d20kh3")
+    async def roll(self, ctx: commands.Context, notation: str = "1") -> discord.Message:
         """Roll command."""
         with suppress(discord.HTTPException, discord.NotFound):
             await ctx.message.delete()
-        dice_raw = [random.choice(range(1, 7)) for _ in range(number_of_dice)]  # nosec
-        sum_dices = f"(total {sum(dice_raw)})"
-        dice = [EMOJI_NUMBERS[dice - 1] for dice in dice_raw]
-        message = await ctx.send(f"{ctx.author.name} rolls {number_of_dice} dice{'' if number_of_dice == 1 else 's'}.")
-        await asyncio.sleep(1)
-        await message.edit(
-            content=f"{ctx.author.name} rolls {number_of_dice} dice{'' if number_of_dice == 1 else 's'}..",
-        )
-        await asyncio.sleep(1)
-        await message.edit(
-            content=f"{ctx.author.name} rolls {number_of_dice} dice{'' if number_of_dice == 1 else 's'}...",
-        )
+        try:
+            dice_roll = DiceRoll.parse(notation)
+        except DiceError as err:
+            raise commands.BadArgument(str(err)) from err
+        total, dice = dice_roll.roll()
+        result = f"{ctx.author.name}'s dice roll ({dice_roll}): "
+        if dice is not None and len(dice) <= MAX_DISPLAYED_DICE:
+            faces = (EMOJI_NUMBERS[die - 1] for die in dice) if dice_roll.sides == 6 else (f"`{die}`" for die in dice)
+            result += f"{''.join(faces)} {'' if len(dice) == 1 and not dice_roll.modifier else f'(total {total})'}"
+        else:
+            result += f"total {total}"
+        if not self.animate or not self.animations.try_acquire():
+            return await ctx.send(result)
+        message = await ctx.send(f"{ctx.author.name} rolls {dice_roll}...")
         await asyncio.sleep(1)
-        await message.edit(
-            content=f"{ctx.author.name}'s dice roll: {''.join(dice)} {'' if number_of_dice == 1 else sum_dices}",
-        )
+        return await message.edit(content=result)
 
     @roll.error
     async def roll_error(self, ctx: commands.Context, error: Exception) -> discord.Message:
         """Errors related to command."""
         self.logger.error("Exception in roll: %s", traceback.format_exc())
+        if isinstance(error, commands.CommandInvokeError):
+            error = error.original
         if isinstance(error, commands.MissingRequiredArgument):
             return await ctx.send("ERROR: It misses the number of dices to roll, eg: !roll 2")
         if isinstance(error, commands.BadArgument):
-            return await ctx.send("ERROR: Bad argument, eg: !roll number_of_dice")
+            return await ctx.send(f"ERROR: Bad argument, eg: !roll 2 or !roll 4d6+2 ({error})")
         return await ctx.send(f"ERROR: {error}")
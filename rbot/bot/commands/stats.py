@@ -0,0 +1,71 @@
+# Built-in modules
+import traceback
+
+# External modules
+import discord
+from discord.ext import commands
+
+# Internal modules
+from rbot.bot.commands.base import Base
+from rbot.utils.metrics import REGISTRY
+from rbot.utils.profiling import command_profiler
+
+
+def _total(snapshot: dict, name: str) -> float:
+    return sum(value for (sample, _), value in snapshot.items() if sample == name)
+
+
+class Stats(Base):
+    """Rbot Stats command, show the playback, extraction and command metrics."""
+
+    def __init__(self, bot: commands.Bot):  # noqa:D107
+        super().__init__()
+        self.bot: commands.Bot = bot
+
+    @commands.command(name="stats", help="Show playback, extraction and command metrics")
+    async def stats(self, ctx: commands.Context) -> discord.Message:
+        """Stats command."""
+        snapshot = REGISTRY.snapshot()
+        frames = _total(snapshot, "rbot_audio_frame_read_seconds_count")
+        read_sec = _total(snapshot, "rbot_audio_frame_read_seconds_sum")
+        ffmpeg_starts = _total(snapshot, "rbot_ffmpeg_start_seconds_count")
+        ffmpeg_start_sec = _total(snapshot, "rbot_ffmpeg_start_seconds_sum")
+        exits = ", ".join(
+            f"{dict(labels)['code']}: {int(value)}"
+            for (sample, labels), value in sorted(snapshot.items())
+            if sample == "rbot_ffmpeg_exits_total"
+        )
+        music = self.bot.get_cog("Music")
+        embed = discord.Embed(title="Rbot stats", color=discord.Color.blue())
+        embed.add_field(name="Players", value=f"{len(music.players) if music else 0}")
+        embed.add_field(name="Tracks played", value=f"{int(_total(snapshot, 'rbot_tracks_total'))}")
+        embed.add_field(name="Audio streamed", value=f"{_total(snapshot, 'rbot_audio_bytes_total') / 1024**2:.1f} MiB")
+        avg_read_ms = read_sec / frames * 1000 if frames else 0
+        embed.add_field(name="Frames", value=f"{int(frames)} (avg read {avg_read_ms:.2f}ms)")
+        embed.add_field(name="Late frames", value=f"{int(_total(snapshot, 'rbot_audio_late_frames_total'))}")
+        embed.add_field(name="Underruns", value=f"{int(_total(snapshot, 'rbot_audio_underruns_total'))}")
+        embed.add_field(
+            name="FFmpeg",
+            value=f"avg start {ffmpeg_start_sec / ffmpeg_starts if ffmpeg_starts else 0:.2f}s, exits {exits or '-'}",
+        )
+        embed.add_field(
+            name="Extraction",
+            value=f"avg {_total(snapshot, 'rbot_extractor_latency_avg'):.2f}s, "
+            f"wait {_total(snapshot, 'rbot_extractor_queue_wait_avg'):.2f}s, "
+            f"cache hits {int(_total(snapshot, 'rbot_ytdl_cache_hits'))}/"
+            f"{int(_total(snapshot, 'rbot_ytdl_cache_hits') + _total(snapshot, 'rbot_ytdl_cache_misses'))}",
+        )
+        latencies = "\n".join(
+            f"{command}: " + ", ".join(f"{name} {value * 1000:.0f}ms" for name, value in percentiles.items())
+            for command, percentiles in sorted(
+                (command, command_profiler.percentiles(command)) for command in command_profiler.durations
+            )
+        )
+        embed.add_field(name="Commands", value=latencies or "-", inline=False)
+        return await ctx.send(embed=embed)
+
+    @stats.error
+    async def stats_error(self, ctx: commands.Context, error: Exception) -> discord.Message:
+        """Errors related to command."""
+        self.logger.error("Exception in stats: %s", traceback.format_exc())
+        return await ctx.send(f"ERROR: {error}")
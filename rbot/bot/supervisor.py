@@ -0,0 +1,193 @@
+# Built-in modules
+import asyncio
+import logging
+import multiprocessing
+import queue
+import signal
+import time
+from logging.handlers import QueueHandler, QueueListener
+from typing import Iterator
+
+# External modules
+import discord
+
+# Internal modules
+from rbot.bot.bot import ShardedRbot
+from rbot.utils.metrics import REGISTRY, start_http_server
+from rbot.utils.settings import get_settings
+
+LOGGER = logging.getLogger("rich")
+# Interval (in seconds) between two metrics snapshots sent by a worker
+METRICS_PUSH_INTERVAL = 10
+# Delay (in seconds) before restarting a crashed worker, doubled on each crash up to MAX_RESTART_DELAY
+RESTART_DELAY = 1
+MAX_RESTART_DELAY = 60
+# Workers running for this long (in seconds) are healthy, their restart delay is reset
+HEALTHY_UPTIME = 300
+# Exit code of workers which must not be restarted, eg: on authentication failure
+EXIT_FATAL = 78
+WORKER_RESTARTS = REGISTRY.counter("rbot_worker_restarts_total", "Restarts of crashed workers", ("worker",))
+
+
+def worker_shards(worker: int, workers: int, shard_count: int) -> list:
+    """Return the ids of the shards run by `worker`."""
+    return list(range(worker, shard_count, workers))
+
+
+async def push_metrics(metrics_queue: multiprocessing.Queue, worker: int) -> None:
+    """Send the metrics of the worker to the supervisor, every METRICS_PUSH_INTERVAL seconds."""
+    while True:
+        await asyncio.sleep(METRICS_PUSH_INTERVAL)
+        metrics_queue.put((worker, REGISTRY.snapshot()))
+
+
+def run_worker(
+    worker: int,
+    shard_ids: list,
+    shard_count: int,
+    log_queue: multiprocessing.Queue,
+    metrics_queue: multiprocessing.Queue,
+) -> None:
+    """Run a bot with the shards `shard_ids`, sending its logs and metrics to the supervisor."""
+    settings = get_settings()
+    logging.basicConfig(
+        level=logging.DEBUG if settings.debug else logging.INFO,
+        format="%(message)s",
+        handlers=[QueueHandler(log_queue)],
+        force=True,
+    )
+    asyncio.set_event_loop(asyncio.new_event_loop())
+    LOGGER.info(f"Worker {worker} starting with shards {shard_ids} (of {shard_count})")
+    try:
+        bot = ShardedRbot(shard_ids=shard_ids, shard_count=shard_count, serve_metrics=False)
+        bot.setup()
+        bot.loop.create_task(push_metrics(metrics_queue, worker))
+        bot.run(settings.discord_token)
+    except (discord.errors.LoginFailure, discord.errors.PrivilegedIntentsRequired) as _error:
+        LOGGER.error(f"Worker {worker} failed to run bot: {_error}")
+        raise SystemExit(EXIT_FATAL) from _error
+
+
+class Supervisor:
+    """Run the shards of the bot in `workers` processes, restarting crashed ones.
+
+    Workers send their logs and metrics snapshots to the supervisor through queues: logs are emitted by the handlers
+    of the supervisor, and metrics are served on its metrics port, labelled by worker.
+    """
+
+    def __init__(self, workers: int, shard_count: int):
+        if not 1 <= workers <= shard_count:
+            raise ValueError(f"The number of workers must be between 1 and the number of shards ({shard_count})")
+        self.workers = workers
+        self.shard_count = shard_count
+        # Workers are spawned, as forking a process with a running event loop shares its selector and signal handlers
+        self.context = multiprocessing.get_context("spawn")
+        self.log_queue = self.context.Queue()
+        self.metrics_queue = self.context.Queue()
+        self.processes: dict = {}
+        self.started_at: dict[int, float] = {}
+        self.restart_at: dict[int, float] = {}
+        self.restart_delay: dict[int, float] = {}
+        self.snapshots: dict[int, dict] = {}
+        self._stopping = False
+
+    @classmethod
+    def from_settings(cls) -> "Supervisor":
+        """Build the supervisor from the application settings."""
+        settings = get_settings()
+        return cls(workers=settings.shard_workers, shard_count=settings.shard_count)
+
+    def start_worker(self, worker: int) -> None:
+        """Start the process of `worker`."""
+        process = self.context.Process(
+            target=run_worker,
+            args=(
+                worker,
+                worker_shards(worker, self.workers, self.shard_count),
+                self.shard_count,
+                self.log_queue,
+                self.metrics_queue,
+            ),
+            name=f"rbot-worker-{worker}",
+        )
+        process.start()
+        self.processes[worker] = process
+        self.started_at[worker] = time.monotonic()
+
+    def check_workers(self) -> None:
+        """Restart crashed workers, waiting longer after each crash of the same worker."""
+        now = time.monotonic()
+        for worker, process in list(self.processes.items()):
+            if process.is_alive():
+                if now - self.started_at[worker] >= HEALTHY_UPTIME:
+                    self.restart_delay.pop(worker, None)
+                continue
+            if worker in self.restart_at:
+                if now >= self.restart_at[worker]:
+                    del self.restart_at[worker]
+                    self.start_worker(worker)
+                continue
+            if process.exitcode in (0, EXIT_FATAL):
+                LOGGER.warning(f"Worker {worker} stopped (exit code {process.exitcode})")
+                del self.processes[worker]
+                continue
+            delay = self.restart_delay.get(worker, RESTART_DELAY)
+            LOGGER.error(f"Worker {worker} crashed (exit code {process.exitcode}), restart in {delay}s")
+            WORKER_RESTARTS.inc(worker=worker)
+            self.restart_at[worker] = now + delay
+            self.restart_delay[worker] = min(delay * 2, MAX_RESTART_DELAY)
+
+    def collect_metrics(self) -> None:
+        """Keep the last metrics snapshot sent by each worker."""
+        while True:
+            try:
+                worker, snapshot = self.metrics_queue.get_nowait()
+            except queue.Empty:
+                return
+            self.snapshots[worker] = snapshot
+
+    def samples(self) -> Iterator[tuple[str, dict, float]]:
+        """Yield the samples of the workers metrics, labelled by worker."""
+        for worker, snapshot in self.snapshots.items():
+            for (name, labels), value in snapshot.items():
+                yield name, {**dict(labels), "worker": str(worker)}, value
+
+    def stop(self) -> None:
+        """Stop the workers and the supervisor."""
+        self._stopping = True
+
+    async def run(self) -> None:
+        """Start the workers and supervise them until they stop or the supervisor is stopped."""
+        settings = get_settings()
+        listener = QueueListener(self.log_queue, *logging.getLogger().handlers, respect_handler_level=True)
+        listener.start()
+        REGISTRY.add_collector(lambda: list(self.samples()))
+        metrics_server = None
+        if settings.metrics_port:
+            metrics_server = await start_http_server(settings.metrics_host, settings.metrics_port)
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(signum, self.stop)
+        for worker in range(self.workers):
+            self.start_worker(worker)
+        try:
+            while not self._stopping and self.processes:
+                self.collect_metrics()
+                self.check_workers()
+                await asyncio.sleep(1)
+        finally:
+            LOGGER.warning("Stopping workers..")
+            for process in self.processes.values():
+                process.terminate()
+            for process in self.processes.values():
+                await loop.run_in_executor(None, process.join, 10)
+                if process.is_alive():
+                    process.kill()
+            if metrics_server:
+                metrics_server.close()
+            listener.stop()
+
+
+def start_shards() -> None:
+    """Start the shards of the bot in several processes, with settings from env (or .config)."""
+    asyncio.run(Supervisor.from_settings().run())
@@ -3,25 +3,35 @@
 # Built-in modules
 import logging
 
-# External modules
-from rich.logging import RichHandler
-
 # Internal modules
 from rbot.bot.bot import start_bot
+from rbot.bot.supervisor import start_shards
+from rbot.utils.log import setup_logging
 from rbot.utils.settings import get_settings
 
 
-def _init_logger(lvl: int = logging.INFO, fmt: str = "%(message)s", date_fmt: str = "[%Y-%m-%d %H:%M:%S]") -> None:
-    logging.basicConfig(level=lvl, format=fmt, datefmt=date_fmt, handlers=[RichHandler(rich_tracebacks=True)])
-
-
 def main() -> None:
     settings = get_settings()
-    _init_logger(lvl=logging.DEBUG) if settings.debug else _init_logger(lvl=logging.INFO)
+    listener = setup_logging(
+        level=logging.DEBUG if settings.debug else logging.INFO,
+        fmt=settings.log_format,
+        queued=settings.log_queue,
+        rate=settings.log_rate_limit,
+        per=settings.log_rate_limit_per,
+    )
     logger = logging.getLogger("rich")
-    logger.info("Starting application..")
-    logger.debug("%s", settings)
-    start_bot()
+    try:
+        logger.info("Starting application..")
+        logger.debug("%s", settings)
+        if settings.shard_count:
+            logger.info(f"Running {settings.shard_count} shards in {settings.shard_workers} workers")
+            start_shards()
+        else:
+            start_bot()
+    finally:
+        if listener:
+            # Write the records still queued
+            listener.stop()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,113 @@
+# Built-in modules
+import math
+import random
+import re
+from typing import Optional
+
+DICE_RE = re.compile(r"^(?P<count>\d*)d(?P<sides>\d+)(?:(?P<keep>k[hl])(?P<kept>\d+))?(?P<modifier>[+-]\d+)?$", re.I)
+MAX_DICE = 1_000_000
+MAX_SIDES = 1000
+# Up to this number of dice, each die is rolled, above the total is sampled from the face counts distribution
+EXACT_LIMIT = 1000
+RNG = random.Random()  # nosec
+
+
+class DiceError(ValueError):
+    """Invalid dice notation."""
+
+
+class DiceRoll:
+    """Parsed dice notation, eg: `4d6+2`, `100d20kh3` or `3` (3d6)."""
+
+    def __init__(self, count: int, sides: int, keep: Optional[str] = None, kept: int = 0, modifier: int = 0):
+        if not 1 <= count <= MAX_DICE:
+            raise DiceError(f"The number of dice must be between 1 and {MAX_DICE}")
+        if not 2 <= sides <= MAX_SIDES:
+            raise DiceError(f"The number of sides must be between 2 and {MAX_SIDES}")
+        if keep and not 1 <= kept <= count:
+            raise DiceError(f"The number of kept dice must be between 1 and {count}")
+        self.count = count
+        self.sides = sides
+        self.keep = keep
+        self.kept = kept
+        self.modifier = modifier
+
+    @classmethod
+    def parse(cls, notation: str) -> "DiceRoll":
+        """Parse a dice notation, a bare number being a number of six-sided dice."""
+        notation = notation.replace(" ", "")
+        if notation.isdigit():
+            return cls(count=int(notation), sides=6)
+        match = DICE_RE.match(notation)
+        if not match:
+            raise DiceError(f"Invalid dice notation '{notation}', eg: 4d6+2 or 100d20kh3")
+        return cls(
+            count=int(match["count"] or 1),
+            sides=int(match["sides"]),
+            keep=match["keep"].lower() if match["keep"] else None,
+            kept=int(match["kept"] or 0),
+            modifier=int(match["modifier"] or 0),
+        )
+
+    def __str__(self) -> str:
+        keep = f"{self.keep}{self.kept}" if self.keep else ""
+        modifier = f"{self.modifier:+d}" if self.modifier else ""
+        return f"{self.count}d{self.sides}{keep}{modifier}"
+
+    def roll(self, rng: Optional[random.Random] = None) -> tuple[int, Optional[list]]:
+        """Roll the dice.
+
+        Returns:
+            The total, and the value of each kept die when they have been rolled one by one (None otherwise).
+        """
+        rng = rng or RNG
+        if self.count <= EXACT_LIMIT:
+            dice = [rng.randint(1, self.sides) for _ in range(self.count)]  # nosec
+            if self.keep:
+                dice = sorted(dice, reverse=self.keep == "kh")[: self.kept]
+            return sum(dice) + self.modifier, dice
+        counts = face_counts(self.count, self.sides, rng)
+        if self.keep:
+            counts = _keep(counts, self.kept, highest=self.keep == "kh")
+        return sum(face * count for face, count in enumerate(counts, start=1)) + self.modifier, None
+
+
+def _binomial(n: int, p: float, rng: random.Random) -> int:
+    """Sample a binomial distribution (p <= 0.5), using a normal approximation when `n * p` is large."""
+    if n * p < 30:
+        # Jump from a success to the next one with geometric waiting times, in O(n * p)
+        successes, position, log_q = 0, 0, math.log(1 - p)
+        while True:
+            position += int(math.log(1 - rng.random()) / log_q) + 1  # nosec
+            if position > n:
+                return successes
+            successes += 1
+    sample = round(rng.gauss(n * p, math.sqrt(n * p * (1 - p))))  # nosec
+    return min(n, max(0, sample))
+
+
+def face_counts(count: int, sides: int, rng: random.Random) -> list:
+    """Sample how many of `count` dice land on each face, without rolling each die.
+
+    Returns:
+        The number of dice per face, the first item being the number of 1.
+    """
+    counts = [0] * sides
+    remaining = count
+    for face in range(sides, 1, -1):
+        # Among the dice not landed on a higher face, each one has a 1/face chance to land on this face
+        counts[face - 1] = _binomial(remaining, 1 / face, rng)
+        remaining -= counts[face - 1]
+    counts[0] = remaining
+    return counts
+
+
+def _keep(counts: list, kept: int, highest: bool) -> list:
+    faces = range(len(counts) - 1, -1, -1) if highest else range(len(counts))
+    result = [0] * len(counts)
+    for face in faces:
+        result[face] = min(counts[face], kept)
+        kept -= result[face]
+        if not kept:
+            break
+    return result
@@ -0,0 +1,223 @@
+# Built-in modules
+import asyncio
+import json
+import os
+import zlib
+from datetime import datetime, timezone
+from typing import Iterator, Optional
+
+DATE_FMT = "%Y-%m-%dT%H:%M:%S"
+
+
+def _append_lines(path: str, lines: list) -> None:
+    with open(path, "a", encoding="utf-8") as _file:
+        _file.writelines(lines)
+
+
+def _write_text(path: str, text: str) -> None:
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as _file:
+        _file.write(text)
+    os.replace(tmp_path, path)
+
+
+def _read_text(path: str) -> Optional[str]:
+    try:
+        with open(path, encoding="utf-8") as _file:
+            return _file.read()
+    except FileNotFoundError:
+        return None
+
+
+class NDJSONExporter:
+    """Export messages as NDJSON, one line per message.
+
+    Records are buffered and appended by batches from an executor, so the event loop never waits on the disk.
+    """
+
+    extension = "ndjson"
+
+    def __init__(self, path: str, loop: asyncio.AbstractEventLoop, batch_size: int = 500):
+        self.path = path
+        self.count = 0
+        self._loop = loop
+        self._batch_size = batch_size
+        self._lines: list = []
+
+    async def write(self, record: dict) -> None:
+        """Add a message to the export."""
+        self._lines.append(json.dumps(record, ensure_ascii=False) + "\n")
+        self.count += 1
+        if len(self._lines) >= self._batch_size:
+            await self.flush()
+
+    async def flush(self) -> None:
+        """Write buffered messages to the export file."""
+        if not self._lines:
+            return
+        lines, self._lines = self._lines, []
+        await self._loop.run_in_executor(None, _append_lines, self.path, lines)
+
+    async def close(self) -> None:
+        """Flush the remaining messages."""
+        await self.flush()
+
+
+def _append_bytes(path: str, data: bytes) -> int:
+    """Append `data` to `path` and return the offset where it has been written."""
+    with open(path, "ab") as _file:
+        offset = _file.tell()
+        _file.write(data)
+    return offset
+
+
+def _to_epoch(created_at: str) -> int:
+    return int(datetime.strptime(created_at, DATE_FMT).replace(tzinfo=timezone.utc).timestamp())
+
+
+def _from_epoch(timestamp: int) -> str:
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc).strftime(DATE_FMT)
+
+
+class ArchiveExporter:
+    """Export messages as a compressed and column-oriented archive.
+
+    The archive is a sequence of zlib compressed batches, each one holding the columns of its messages: ids, author
+    ids, timestamps (epoch) and a content blob with the offsets of each message. Author names are stored once, in the
+    index written next to the archive (`<path>.idx`), with the position, id range, time range and authors of every
+    batch. `read_archive` relies on it to only decompress the batches matching a query.
+    """
+
+    extension = "rarc"
+
+    def __init__(self, path: str, loop: asyncio.AbstractEventLoop, batch_size: int = 1000):
+        self.path = path
+        self.count = 0
+        self._loop = loop
+        self._batch_size = batch_size
+        self._records: list = []
+        self._authors: dict[str, int] = {}
+        self._batches: list = []
+
+    async def write(self, record: dict) -> None:
+        """Add a message to the export."""
+        self._records.append(record)
+        self.count += 1
+        if len(self._records) >= self._batch_size:
+            await self.flush()
+
+    async def flush(self) -> None:
+        """Compress and write buffered messages as a new batch."""
+        if not self._records:
+            return
+        records, self._records = self._records, []
+        author_ids = [self._authors.setdefault(record["author_name"], len(self._authors)) for record in records]
+        timestamps = [_to_epoch(record["created_at"]) for record in records]
+        data = await self._loop.run_in_executor(None, ArchiveExporter._encode_batch, records, author_ids, timestamps)
+        offset = await self._loop.run_in_executor(None, _append_bytes, self.path, data)
+        self._batches.append(
+            {
+                "offset": offset,
+                "length": len(data),
+                "count": len(records),
+                "min_id": min(record["id"] for record in records),
+                "max_id": max(record["id"] for record in records),
+                "min_ts": min(timestamps),
+                "max_ts": max(timestamps),
+                "authors": sorted(set(author_ids)),
+            },
+        )
+
+    async def close(self) -> None:
+        """Flush the remaining messages and write the index."""
+        await self.flush()
+        if not self._batches:
+            return
+        index = {"version": 1, "authors": list(self._authors), "batches": self._batches}
+        await self._loop.run_in_executor(None, _write_text, f"{self.path}.idx", json.dumps(index))
+
+    @staticmethod
+    def _encode_batch(records: list, author_ids: list, timestamps: list) -> bytes:
+        contents = [record["content"] for record in records]
+        offsets, position = [], 0
+        for content in contents:
+            position += len(content)
+            offsets.append(position)
+        columns = {
+            "ids": [record["id"] for record in records],
+            "authors": author_ids,
+            "timestamps": timestamps,
+            "content_offsets": offsets,
+            "content": "".join(contents),
+        }
+        return zlib.compress(json.dumps(columns, ensure_ascii=False).encode("utf-8"))
+
+
+def read_archive(
+    path: str,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    authors: Optional[list] = None,
+) -> Iterator[dict]:
+    """Read messages of an archive written by `ArchiveExporter`.
+
+    Args:
+        path (str): path of the archive.
+        start (datetime): only return messages created at or after this date.
+        end (datetime): only return messages created at or before this date.
+        authors (list): only return messages of these author names.
+    """
+    with open(f"{path}.idx", encoding="utf-8") as _file:
+        index = json.load(_file)
+    names = index["authors"]
+    start_ts = start.timestamp() if start else float("-inf")
+    end_ts = end.timestamp() if end else float("inf")
+    wanted = {i for i, name in enumerate(names) if name in authors} if authors is not None else None
+    with open(path, "rb") as _file:
+        for batch in index["batches"]:
+            if batch["max_ts"] < start_ts or batch["min_ts"] > end_ts:
+                continue
+            if wanted is not None and wanted.isdisjoint(batch["authors"]):
+                continue
+            _file.seek(batch["offset"])
+            columns = json.loads(zlib.decompress(_file.read(batch["length"])))
+            position = 0
+            for i, message_id in enumerate(columns["ids"]):
+                content = columns["content"][position : columns["content_offsets"][i]]  # noqa: E203
+                position = columns["content_offsets"][i]
+                timestamp, author = columns["timestamps"][i], columns["authors"][i]
+                if not start_ts <= timestamp <= end_ts or (wanted is not None and author not in wanted):
+                    continue
+                yield {
+                    "id": message_id,
+                    "content": content,
+                    "created_at": _from_epoch(timestamp),
+                    "author_name": names[author],
+                }
+
+
+EXPORTERS = {"ndjson": NDJSONExporter, "archive": ArchiveExporter}
+
+
+def get_exporter(fmt: str) -> type:
+    """Return the exporter class of a history format."""
+    if fmt not in EXPORTERS:
+        raise ValueError(f"Unknown history format: {fmt}, use one of {', '.join(EXPORTERS)}")
+    return EXPORTERS[fmt]
+
+
+class ExportCursor:
+    """Id of the last exported message of a channel, used to resume the next export."""
+
+    def __init__(self, path: str, loop: asyncio.AbstractEventLoop):
+        self.path = path
+        self._loop = loop
+
+    async def load(self) -> Optional[int]:
+        """Return the id of the last exported message, if any."""
+        text = await self._loop.run_in_executor(None, _read_text, self.path)
+        return int(text) if text and text.strip().isdigit() else None
+
+    async def save(self, message_id: int) -> None:
+        """Store the id of the last exported message."""
+        await self._loop.run_in_executor(None, _write_text, self.path, str(message_id))
@@ -0,0 +1,126 @@
+# Built-in modules
+import copy
+import json
+import logging
+import queue
+import sys
+import threading
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+
+# External modules
+from rich.logging import RichHandler
+from rich.text import Text
+
+# Internal modules
+from rbot.utils.rate_limit import RateLimiter
+
+LOG_FORMATS = ("rich", "json")
+DATE_FMT = "[%Y-%m-%d %H:%M:%S]"
+
+
+class JsonFormatter(logging.Formatter):
+    """Format records as JSON lines, for log collectors."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        message = record.getMessage()
+        if getattr(record, "markup", False):
+            message = Text.from_markup(message).plain
+        line = {
+            "time": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": message,
+            "module": record.module,
+            "line": record.lineno,
+        }
+        if record.exc_info:
+            line["exception"] = self.formatException(record.exc_info)
+        return json.dumps(line, ensure_ascii=False)
+
+
+class RateLimitFilter(logging.Filter):
+    """Let `rate` records of each logger and call site pass every `per` seconds, errors always passing.
+
+    All the modules log through the same logger, so records are limited by call site too: a message repeated by the
+    player loop can not drown the others. The next record of a call site passing tells how many were dropped.
+    """
+
+    def __init__(self, rate: int, per: float):
+        super().__init__()
+        self.rate = rate
+        self.per = per
+        self.dropped: dict[tuple, int] = {}
+        self._limiters: dict[tuple, RateLimiter] = {}
+        # Records are logged from the event loop and from executor threads
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.ERROR:
+            return True
+        key = (record.name, record.pathname, record.lineno)
+        with self._lock:
+            limiter = self._limiters.get(key)
+            if limiter is None:
+                limiter = self._limiters[key] = RateLimiter(self.rate, self.per)
+            if not limiter.try_acquire():
+                self.dropped[key] = self.dropped.get(key, 0) + 1
+                return False
+            dropped = self.dropped.pop(key, 0)
+        if dropped:
+            record.msg = f"{record.getMessage()} ({dropped} similar messages dropped)"
+            record.args = None
+        return True
+
+
+class LocalQueueHandler(QueueHandler):
+    """Queue handler of a queue read by a thread of the same process.
+
+    Records are not formatted before being queued, only their arguments are merged: formatting is done by the
+    listener thread, and the exception info is kept for Rich tracebacks.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+def output_handler(fmt: str = "rich") -> logging.Handler:
+    """Return the handler writing records, in JSON lines to stderr or to the terminal with Rich."""
+    if fmt not in LOG_FORMATS:
+        raise ValueError(f"Unknown log format: {fmt}, use one of {', '.join(LOG_FORMATS)}")
+    if fmt == "json":
+        handler = logging.StreamHandler(sys.stderr)
+        handler.setFormatter(JsonFormatter())
+        return handler
+    handler = RichHandler(rich_tracebacks=True)
+    handler.setFormatter(logging.Formatter("%(message)s", datefmt=DATE_FMT))
+    return handler
+
+
+def setup_logging(
+    level: int = logging.INFO,
+    fmt: str = "rich",
+    queued: bool = True,
+    rate: int = 0,
+    per: float = 10,
+) -> Optional[QueueListener]:
+    """Configure the root logger, returning the listener to stop at exit in queued mode.
+
+    In queued mode, logging only puts records in a queue: a listener thread formats and writes them, off the event
+    loop. With a `rate`, records are limited per logger and call site (see RateLimitFilter).
+    """
+    handler = output_handler(fmt)
+    listener = None
+    if queued:
+        listener = QueueListener(queue.SimpleQueue(), handler, respect_handler_level=True)
+        handler = LocalQueueHandler(listener.queue)
+    if rate:
+        handler.addFilter(RateLimitFilter(rate, per))
+    logging.basicConfig(level=level, handlers=[handler], force=True)
+    if listener:
+        listener.start()
+    return listener
@@ -0,0 +1,64 @@
+# Built-in modules
+from collections import OrderedDict
+from typing import Optional
+
+# External modules
+import discord
+
+# Policies of the member cache: members cached from the gateway, and if missing ones are fetched on demand
+MEMBER_CACHE_POLICIES = ("none", "voice", "fetch", "all")
+
+
+def member_cache_flags(policy: str, intents: discord.Intents) -> discord.MemberCacheFlags:
+    """Return the member cache flags of a policy.
+
+    `none` and `fetch` keep no member from the gateway, `voice` only the members joining a voice channel while the
+    bot is connected (members already connected at startup are not cached), and `all` every member the intents allow
+    (requiring the members intent to chunk guilds at startup).
+    """
+    if policy not in MEMBER_CACHE_POLICIES:
+        raise ValueError(f"Unknown member cache policy: {policy}, use one of {', '.join(MEMBER_CACHE_POLICIES)}")
+    if policy == "all":
+        return discord.MemberCacheFlags.from_intents(intents)
+    if policy == "voice":
+        return discord.MemberCacheFlags(online=False, voice=True, joined=False)
+    return discord.MemberCacheFlags.none()
+
+
+class MemberCache:
+    """Members fetched on demand from the REST API, the `maxsize` last used ones being kept.
+
+    Fetching a single member does not require the members intent. Commands do not need it either: the author of a
+    message comes with its roles, which is enough for `commands.has_role` checks.
+    """
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._members: OrderedDict = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._members)
+
+    def add(self, member: discord.Member) -> None:
+        """Keep a member, evicting the least recently used one above `maxsize`."""
+        key = (member.guild.id, member.id)
+        self._members[key] = member
+        self._members.move_to_end(key)
+        while len(self._members) > self.maxsize:
+            self._members.popitem(last=False)
+
+    async def get(self, guild: discord.Guild, member_id: int) -> Optional[discord.Member]:
+        """Return a member of `guild` from the gateway cache, this cache, or the REST API."""
+        member = guild.get_member(member_id) or self._members.get((guild.id, member_id))
+        if member is not None:
+            self.hits += 1
+        else:
+            self.misses += 1
+            try:
+                member = await guild.fetch_member(member_id)
+            except discord.NotFound:
+                return None
+        self.add(member)
+        return member
@@ -0,0 +1,186 @@
+# Built-in modules
+import asyncio
+import bisect
+import threading
+from typing import Callable, Iterator, Optional
+
+# Latency buckets (in seconds), from 100µs to 10s
+LATENCY_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.02, 0.04, 0.06, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+class Metric:
+    """Base class of metrics, holding one value per set of label values.
+
+    Metrics are updated from the event loop and from the audio player threads, so updates are guarded by a lock.
+    """
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labels: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self._values: dict = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(str(labels.get(label, "")) for label in self.labels)
+
+    def samples(self) -> Iterator[tuple[str, dict, float]]:
+        """Yield the samples of the metric, as (name, labels, value)."""
+        with self._lock:
+            values = list(self._values.items())
+        for key, value in values:
+            yield self.name, dict(zip(self.labels, key)), value
+
+
+class Counter(Metric):
+    """Monotonically increasing value."""
+
+    kind = "counter"
+
+    def inc(self, value: float = 1, **labels) -> None:
+        """Increment the counter."""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + value
+
+
+class Gauge(Metric):
+    """Value going up and down."""
+
+    kind = "gauge"
+
+    def set(self, value: float, **labels) -> None:  # noqa: A003
+        """Set the gauge value."""
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class Histogram(Metric):
+    """Distribution of observed values in cumulative buckets."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labels: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = buckets
+
+    def observe(self, value: float, **labels) -> None:
+        """Add a value to the distribution."""
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * (len(self.buckets) + 1), 0.0))
+            counts[index] += 1
+            self._values[key] = (counts, total + value)
+
+    def samples(self) -> Iterator[tuple[str, dict, float]]:
+        """Yield the cumulative buckets, sum and count of each distribution."""
+        with self._lock:
+            values = [(key, (list(counts), total)) for key, (counts, total) in self._values.items()]
+        for key, (counts, total) in values:
+            labels = dict(zip(self.labels, key))
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += count
+                yield f"{self.name}_bucket", {**labels, "le": str(bound)}, cumulative
+            yield f"{self.name}_sum", labels, total
+            yield f"{self.name}_count", labels, cumulative
+
+
+class Registry:
+    """Set of metrics, rendered in the Prometheus text format.
+
+    Collectors are callables returning extra samples, as (name, labels, value), computed at render time.
+    """
+
+    def __init__(self):
+        self._metrics: dict[str, Metric] = {}
+        self._collectors: list = []
+
+    def register(self, metric: Metric) -> Metric:
+        """Add a metric to the registry, returning the already registered one if any."""
+        return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name: str, documentation: str, labels: tuple = ()) -> Counter:
+        """Register a counter."""
+        return self.register(Counter(name, documentation, labels))  # type: ignore
+
+    def gauge(self, name: str, documentation: str, labels: tuple = ()) -> Gauge:
+        """Register a gauge."""
+        return self.register(Gauge(name, documentation, labels))  # type: ignore
+
+    def histogram(self, name: str, documentation: str, labels: tuple = (), buckets=LATENCY_BUCKETS) -> Histogram:
+        """Register a histogram."""
+        return self.register(Histogram(name, documentation, labels, buckets))  # type: ignore
+
+    def add_collector(self, collector: Callable[[], list]) -> None:
+        """Register a callable returning samples at render time."""
+        self._collectors.append(collector)
+
+    def get(self, name: str) -> Optional[Metric]:
+        """Return a registered metric."""
+        return self._metrics.get(name)
+
+    def snapshot(self) -> dict:
+        """Return the current value of every sample, keyed by name and labels."""
+        snapshot: dict = {}
+        for name, labels, value in self._samples():
+            snapshot[(name, tuple(sorted(labels.items())))] = value
+        return snapshot
+
+    def render(self) -> str:
+        """Render every metric in the Prometheus text format."""
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(_format_sample(*sample) for sample in metric.samples())
+        for collector in self._collectors:
+            lines.extend(_format_sample(*sample) for sample in collector())
+        return "\n".join(lines) + "\n"
+
+    def _samples(self) -> Iterator[tuple[str, dict, float]]:
+        for metric in self._metrics.values():
+            yield from metric.samples()
+        for collector in self._collectors:
+            yield from collector()
+
+
+def _format_sample(name: str, labels: dict, value: float) -> str:
+    if not labels:
+        return f"{name} {value}"
+    pairs = ",".join(f'{label}="{_escape(str(label_value))}"' for label, label_value in labels.items())
+    return f"{name}{{{pairs}}} {value}"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+REGISTRY = Registry()
+
+
+async def start_http_server(host: str, port: int, registry: Registry = REGISTRY) -> asyncio.AbstractServer:
+    """Serve the metrics of `registry` in the Prometheus text format, on any path."""
+
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            # Read the request line and headers, the request itself does not matter
+            while (await reader.readline()).strip():
+                pass
+            body = registry.render().encode("utf-8")
+            writer.write(
+                b"HTTP/1.1 200 OK\r\n"
+                b"Content-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+                + f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode("ascii")
+                + body,
+            )
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    return await asyncio.start_server(handle, host, port)
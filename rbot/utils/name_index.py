@@ -0,0 +1,95 @@
+# Built-in modules
+import logging
+from collections import defaultdict
+from typing import Optional, Union
+
+# External modules
+import discord
+
+LOGGER = logging.getLogger("rich")
+
+
+class AmbiguousNameError(LookupError):
+    """Several channels or roles of a guild have the looked up name."""
+
+    def __init__(self, kind: str, name: str, ids: set):
+        super().__init__(f"Several {kind}s are named '{name}' ({', '.join(map(str, sorted(ids)))}), rename them")
+        self.kind = kind
+        self.name = name
+        self.ids = ids
+
+
+class NameIndex:
+    """Index of the channels and roles of guilds by name, kept up to date from gateway events.
+
+    Channels are indexed by type and name, as a text and a voice channel often share a name. Names used by several
+    channels (or roles) are kept with all their ids: looking them up raises AmbiguousNameError instead of picking one.
+    """
+
+    def __init__(self):
+        # Ids by (guild id, kind, name), kind being the channel type or "role"
+        self._ids: dict[tuple, set] = defaultdict(set)
+        # Key of each indexed id, to remove it on renames and deletions
+        self._keys: dict[int, tuple] = {}
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def add_guild(self, guild: discord.Guild) -> None:
+        """Index the channels and roles of a guild."""
+        self.remove_guild(guild.id)
+        for channel in guild.channels:
+            self.add(channel)
+        for role in guild.roles:
+            self.add(role)
+
+    def remove_guild(self, guild_id: int) -> None:
+        """Remove the channels and roles of a guild from the index."""
+        for key in [key for key in self._ids if key[0] == guild_id]:
+            for item_id in self._ids.pop(key):
+                self._keys.pop(item_id, None)
+
+    def add(self, item: Union[discord.abc.GuildChannel, discord.Role]) -> None:
+        """Index a channel or a role, replacing its previous name if any."""
+        self.remove(item)
+        key = (item.guild.id, _kind(item), item.name)
+        self._ids[key].add(item.id)
+        self._keys[item.id] = key
+        if len(self._ids[key]) > 1:
+            LOGGER.warning(str(AmbiguousNameError(key[1], key[2], self._ids[key])))
+
+    def remove(self, item: Union[discord.abc.GuildChannel, discord.Role]) -> None:
+        """Remove a channel or a role from the index."""
+        key = self._keys.pop(item.id, None)
+        if key is None:
+            return
+        self._ids[key].discard(item.id)
+        if not self._ids[key]:
+            del self._ids[key]
+
+    def get_id(self, guild_id: int, name: str, kind: str = "text") -> Optional[int]:
+        """Return the id of the channel of type `kind` (or role if `kind` is "role") named `name`.
+
+        Raises:
+            AmbiguousNameError: several channels (or roles) have this name.
+        """
+        ids = self._ids.get((guild_id, kind, name))
+        if not ids:
+            return None
+        if len(ids) > 1:
+            raise AmbiguousNameError(kind if kind == "role" else f"{kind} channel", name, ids)
+        return next(iter(ids))
+
+    def get_channel(self, guild: discord.Guild, name: str, kind: str = "text") -> Optional[discord.abc.GuildChannel]:
+        """Return the channel of `guild` of type `kind` named `name`, see `get_id`."""
+        channel_id = self.get_id(guild.id, name, kind)
+        return guild.get_channel(channel_id) if channel_id else None
+
+    def get_role(self, guild: discord.Guild, name: str) -> Optional[discord.Role]:
+        """Return the role of `guild` named `name`, see `get_id`."""
+        role_id = self.get_id(guild.id, name, "role")
+        return guild.get_role(role_id) if role_id else None
+
+
+def _kind(item: Union[discord.abc.GuildChannel, discord.Role]) -> str:
+    return "role" if isinstance(item, discord.Role) else str(item.type)
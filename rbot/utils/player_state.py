@@ -0,0 +1,109 @@
+# Built-in modules
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+import time
+from typing import Callable, Optional
+
+# Internal modules
+from rbot.utils.settings import get_settings
+
+LOGGER = logging.getLogger("rich")
+# Delay (in seconds) during which changes of the players are written at once
+FLUSH_DELAY = 1
+
+
+class PlayerStateStore:
+    """Persistent state of the music players, by guild, backed by SQLite.
+
+    Saving a state only marks the player as dirty: its state is built and written along the other dirty ones once
+    FLUSH_DELAY seconds have passed, in a single transaction run in the default executor, off the event loop.
+    """
+
+    def __init__(self, path: str, flush_delay: float = FLUSH_DELAY):
+        self.flush_delay = flush_delay
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS players (guild_id INTEGER PRIMARY KEY, state TEXT NOT NULL, saved_at REAL)",
+        )
+        # State builders of the dirty players, None for players to forget
+        self._pending: dict[int, Optional[Callable[[], dict]]] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+
+    @classmethod
+    def from_settings(cls) -> Optional["PlayerStateStore"]:
+        """Build the store from the application settings, None if it is disabled."""
+        settings = get_settings()
+        if not settings.player_state_path:
+            return None
+        return cls(settings.player_state_path)
+
+    def load_all(self) -> dict[int, dict]:
+        """Return the saved state of every player, by guild id."""
+        with self._lock:
+            rows = self._db.execute("SELECT guild_id, state FROM players").fetchall()
+        return {guild_id: json.loads(state) for guild_id, state in rows}
+
+    def save(self, guild_id: int, state: Callable[[], dict]) -> None:
+        """Schedule the write of the state returned by `state`, called at flush time."""
+        self._pending[guild_id] = state
+        self._schedule()
+
+    def delete(self, guild_id: int) -> None:
+        """Schedule the removal of the state of a player."""
+        self._pending[guild_id] = None
+        self._schedule()
+
+    async def flush(self) -> None:
+        """Write the pending changes now.
+
+        A state which can not be built is skipped. When the write fails, the changes are pending again, unless newer
+        ones were made meanwhile, and written at the next flush.
+        """
+        pending, self._pending = self._pending, {}
+        if not pending:
+            return
+        states = {}
+        for guild_id, state in pending.items():
+            try:
+                states[guild_id] = state() if state else None
+            except Exception:  # noqa: B902
+                LOGGER.exception("Failed to build the state of the Music Player of guild %s", guild_id)
+        try:
+            await asyncio.get_running_loop().run_in_executor(None, self._write, states)
+        except Exception as err:  # noqa: B902
+            LOGGER.error("Failed to save the state of %s Music Players, retry later: %s", len(states), err)
+            for guild_id in states:
+                self._pending.setdefault(guild_id, pending[guild_id])
+            self._schedule()
+
+    def _schedule(self) -> None:
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.get_running_loop().create_task(self._delayed_flush())
+
+    async def _delayed_flush(self) -> None:
+        await asyncio.sleep(self.flush_delay)
+        # Changes made during the flush, or failing to be written, schedule another one
+        self._flush_task = None
+        await self.flush()
+
+    def _write(self, states: dict) -> None:
+        now = time.time()
+        with self._lock:
+            self._db.execute("BEGIN")
+            try:
+                for guild_id, state in states.items():
+                    if state is None:
+                        self._db.execute("DELETE FROM players WHERE guild_id = ?", (guild_id,))
+                    else:
+                        self._db.execute(
+                            "INSERT OR REPLACE INTO players (guild_id, state, saved_at) VALUES (?, ?, ?)",
+                            (guild_id, json.dumps(state), now),
+                        )
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
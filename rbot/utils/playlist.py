@@ -0,0 +1,109 @@
+# Built-in modules
+import asyncio
+import itertools
+import random
+from collections import deque
+from typing import Callable, Iterator, Optional
+
+
+class Playlist:
+    """Unbounded queue of songs, with indexed operations and a running total duration.
+
+    Songs are dicts as returned by `YTDLSource.create_source`. Like an asyncio.Queue, `get` waits for a song to be
+    added when the playlist is empty. `on_change` is called after each change of the songs.
+    """
+
+    def __init__(self):
+        self._songs: deque = deque()
+        self._duration_sec: int = 0
+        self._added = asyncio.Event()
+        self.on_change: Optional[Callable[[], None]] = None
+
+    def __len__(self) -> int:
+        return len(self._songs)
+
+    def __iter__(self) -> Iterator[dict]:
+        return iter(self._songs)
+
+    def __getitem__(self, index: int) -> dict:
+        return self._songs[index]
+
+    def __contains__(self, song: dict) -> bool:
+        return any(item is song for item in self._songs)
+
+    @property
+    def duration_sec(self) -> int:
+        """Total duration of the songs in the playlist."""
+        return self._duration_sec
+
+    def empty(self) -> bool:
+        """Check if the playlist is empty."""
+        return not self._songs
+
+    def append(self, song: dict) -> None:
+        """Add a song at the end of the playlist."""
+        self._songs.append(song)
+        self._duration_sec += song.get("duration_sec", 0)
+        self._added.set()
+        self._changed()
+
+    def popleft(self) -> dict:
+        """Remove and return the first song, raise IndexError if the playlist is empty."""
+        song = self._songs.popleft()
+        self._duration_sec -= song.get("duration_sec", 0)
+        self._changed()
+        return song
+
+    async def get(self) -> dict:
+        """Remove and return the first song, waiting for one to be added if the playlist is empty."""
+        while not self._songs:
+            self._added.clear()
+            await self._added.wait()
+        return self.popleft()
+
+    def update(self, song: dict, fields: dict) -> None:
+        """Update the fields of `song`, keeping the total duration right if it is in the playlist."""
+        if song in self:
+            self._duration_sec += fields.get("duration_sec", song.get("duration_sec", 0)) - song.get("duration_sec", 0)
+        song.update(fields)
+        self._changed()
+
+    def remove(self, index: int) -> dict:
+        """Remove and return the song at `index`."""
+        song = self._songs[index]
+        del self._songs[index]
+        self._duration_sec -= song.get("duration_sec", 0)
+        self._changed()
+        return song
+
+    def move(self, index: int, to_index: int) -> None:
+        """Move the song at `index` to `to_index`."""
+        song = self._songs[index]
+        del self._songs[index]
+        self._songs.insert(to_index, song)
+        self._changed()
+
+    def shuffle(self) -> None:
+        """Shuffle the songs of the playlist."""
+        songs = list(self._songs)
+        random.shuffle(songs)  # nosec
+        self._songs = deque(songs)
+        self._changed()
+
+    def clear(self) -> None:
+        """Remove all the songs."""
+        self._songs.clear()
+        self._duration_sec = 0
+        self._changed()
+
+    def _changed(self) -> None:
+        if self.on_change:
+            self.on_change()
+
+    def page(self, page: int = 0, size: int = 10) -> list:
+        """Return the songs of the page `page` (starting at 0)."""
+        return list(itertools.islice(self._songs, page * size, (page + 1) * size))
+
+    def pages(self, size: int = 10) -> int:
+        """Return the number of pages of `size` songs."""
+        return max(1, -(-len(self._songs) // size))
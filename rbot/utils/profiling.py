@@ -0,0 +1,162 @@
+# Built-in modules
+import asyncio
+import contextvars
+import cProfile
+import functools
+import logging
+import os
+import random
+import time
+from collections import deque
+from contextvars import ContextVar
+from typing import Coroutine, Optional
+
+# Internal modules
+from rbot.utils.metrics import REGISTRY
+from rbot.utils.settings import get_settings
+
+COMMAND_SECONDS = REGISTRY.histogram("rbot_command_seconds", "Duration of commands, end to end", ("command", "phase"))
+COMMAND_REST_CALLS = REGISTRY.counter("rbot_command_rest_calls_total", "REST calls made by commands", ("command",))
+COMMAND_RATE_LIMIT_WAITS = REGISTRY.counter(
+    "rbot_command_rate_limit_waits_total",
+    "REST calls of commands which waited for a rate limit",
+    ("command",),
+)
+PHASES = ("checks", "conversion", "body", "rest")
+
+
+class CommandProfile:
+    """Timings of a command invocation, split by phase."""
+
+    def __init__(self, command: str):
+        self.command = command
+        self.started_at = time.perf_counter()
+        self.checked_at: Optional[float] = None
+        self.converted_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.rest_sec = 0.0
+        self.rest_calls = 0
+        self.rate_limit_waits = 0
+        self.profiler: Optional[cProfile.Profile] = None
+
+    @property
+    def phases(self) -> dict:
+        """Return the duration (in seconds) of each phase, and the total one."""
+        checked_at = self.checked_at or self.started_at
+        converted_at = self.converted_at or checked_at
+        finished_at = self.finished_at or time.perf_counter()
+        return {
+            "checks": checked_at - self.started_at,
+            "conversion": converted_at - checked_at,
+            "body": finished_at - converted_at,
+            "rest": self.rest_sec,
+            "total": finished_at - self.started_at,
+        }
+
+
+# Profile of the command run by the current task, inherited by the tasks it creates (unless `background_task`)
+CURRENT_PROFILE: ContextVar[Optional[CommandProfile]] = ContextVar("current_profile", default=None)
+
+
+def background_task(coro: Coroutine, loop: Optional[asyncio.AbstractEventLoop] = None) -> asyncio.Task:
+    """Start a task outliving the running command, its REST calls not being attributed to the command."""
+    context = contextvars.copy_context()
+    context.run(CURRENT_PROFILE.set, None)
+    return context.run((loop or asyncio.get_running_loop()).create_task, coro)
+
+
+class CommandProfiler:
+    """Collect command profiles, keeping rolling percentiles of their durations per command.
+
+    When `threshold` is set, a `sample_rate` share of the commands run under cProfile, and the stats of those slower
+    than `threshold` seconds are dumped in `directory`. cProfile traces the whole event loop thread, so only one
+    command is sampled at a time.
+    """
+
+    def __init__(self, window: int = 500, threshold: float = 0, sample_rate: float = 0.1, directory: str = "."):
+        self.window = window
+        self.threshold = threshold
+        self.sample_rate = sample_rate
+        self.directory = directory
+        self.durations: dict[str, deque] = {}
+        self._sampling = False
+
+    @classmethod
+    def from_settings(cls) -> "CommandProfiler":
+        """Build the profiler from the application settings."""
+        settings = get_settings()
+        return cls(
+            threshold=settings.command_profile_threshold,
+            sample_rate=settings.command_profile_sample_rate,
+            directory=settings.command_profile_dir,
+        )
+
+    def start(self, command: str) -> CommandProfile:
+        """Start the profile of a command, from the current task."""
+        profile = CommandProfile(command)
+        CURRENT_PROFILE.set(profile)
+        return profile
+
+    def start_body(self, profile: CommandProfile) -> None:
+        """Mark the end of checks and conversion, starting cProfile on sampled commands."""
+        if profile.converted_at is not None:
+            # Already started by the before invoke hook of the command
+            return
+        profile.converted_at = time.perf_counter()
+        if self.threshold and not self._sampling and random.random() < self.sample_rate:  # nosec
+            self._sampling = True
+            profile.profiler = cProfile.Profile()
+            profile.profiler.enable()
+
+    def finish(self, profile: CommandProfile, logger: logging.Logger) -> None:
+        """End the profile and record it."""
+        profile.finished_at = time.perf_counter()
+        phases = profile.phases
+        if profile.profiler:
+            profile.profiler.disable()
+            self._sampling = False
+            if phases["total"] >= self.threshold:
+                path = os.path.join(self.directory, f"{profile.command}-{int(time.time() * 1000)}.prof")
+                profile.profiler.dump_stats(path)
+                logger.warning("Command '%s' took %.3fs, profile dumped in %s", profile.command, phases["total"], path)
+        for phase in (*PHASES, "total"):
+            COMMAND_SECONDS.observe(phases[phase], command=profile.command, phase=phase)
+        COMMAND_REST_CALLS.inc(profile.rest_calls, command=profile.command)
+        COMMAND_RATE_LIMIT_WAITS.inc(profile.rate_limit_waits, command=profile.command)
+        self.durations.setdefault(profile.command, deque(maxlen=self.window)).append(phases["total"])
+
+    def percentiles(self, command: str) -> dict:
+        """Return the p50, p95 and p99 durations of the last runs of a command."""
+        durations = sorted(self.durations.get(command, ()))
+        if not durations:
+            return {}
+        return {f"p{p}": durations[min(len(durations) - 1, len(durations) * p // 100)] for p in (50, 95, 99)}
+
+
+command_profiler = CommandProfiler.from_settings()
+
+
+def instrument_http(http) -> None:
+    """Wrap `request` of a discord HTTPClient to attribute REST calls to the running command.
+
+    A call is counted as a rate limit wait when the lock of its route bucket is already held: the bucket is exhausted
+    or another request of the same bucket is running.
+    """
+    request = http.request
+
+    @functools.wraps(request)
+    async def profiled_request(route, **kwargs):
+        profile = CURRENT_PROFILE.get()
+        if profile is None or profile.finished_at is not None:
+            return await request(route, **kwargs)
+        lock = http._locks.get(route.bucket)
+        if (lock is not None and lock.locked()) or not http._global_over.is_set():
+            profile.rate_limit_waits += 1
+        started_at = time.perf_counter()
+        try:
+            return await request(route, **kwargs)
+        finally:
+            profile.rest_calls += 1
+            profile.rest_sec += time.perf_counter() - started_at
+
+    http.request = profiled_request
@@ -0,0 +1,33 @@
+# Built-in modules
+import asyncio
+import time
+
+
+class RateLimiter:
+    """Token bucket allowing `rate` calls every `per` seconds."""
+
+    def __init__(self, rate: int, per: float):
+        self.rate = rate
+        self.per = per
+        self._tokens = float(rate)
+        self._updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.rate, self._tokens + (now - self._updated_at) * self.rate / self.per)
+        self._updated_at = now
+
+    def try_acquire(self) -> bool:
+        """Take a token if one is available, without waiting."""
+        self._refill()
+        if self._tokens < 1:
+            return False
+        self._tokens -= 1
+        return True
+
+    async def acquire(self) -> None:
+        """Wait for a token to be available and take it."""
+        async with self._lock:
+            while not self.try_acquire():
+                await asyncio.sleep((1 - self._tokens) * self.per / self.rate)
@@ -0,0 +1,203 @@
+# Built-in modules
+import asyncio
+import random
+import re
+import time
+from typing import Awaitable, Callable
+from urllib.parse import urlparse
+
+# Internal modules
+from rbot.utils.metrics import REGISTRY
+
+CIRCUIT_STATES = {"closed": 0, "half_open": 1, "open": 2}
+CIRCUIT_STATE = REGISTRY.gauge(
+    "rbot_circuit_state",
+    "State of the circuit breaker of a source: 0 closed, 1 half open, 2 open",
+    ("source",),
+)
+RETRIES = REGISTRY.counter("rbot_source_retries_total", "Calls retried after a transient error", ("source",))
+FAILURES = REGISTRY.counter("rbot_source_failures_total", "Failed calls by kind of error", ("source", "kind"))
+# Errors of a source which retrying can not fix: missing, private or blocked videos, unsupported urls..
+PERMANENT_ERROR_RE = re.compile(
+    r"unavailable|private video|not available|unsupported url|copyright|sign in to confirm|has been removed|"
+    r"does not exist|no video formats|is not a valid url",
+    re.IGNORECASE,
+)
+HTTP_ERROR_RE = re.compile(r"HTTP Error (\d{3})")
+
+
+class CircuitOpenError(Exception):
+    """Calls to a source are failing fast, as its last calls failed."""
+
+    def __init__(self, source: str, retry_in: float):
+        super().__init__(f"{source} is unreachable, retry in {retry_in:.0f}s")
+        self.source = source
+        self.retry_in = retry_in
+
+
+def is_transient(error: BaseException) -> bool:
+    """Tell if an error may not happen again when retrying.
+
+    youtube_dl errors wrap the error of the extractor: HTTP 429 and 5xx statuses, timeouts and connection errors are
+    transient, other HTTP statuses, expected extractor errors (missing video..) and bugs are permanent.
+    """
+    if isinstance(error, CircuitOpenError):
+        return False
+    cause = (getattr(error, "exc_info", None) or (None, None))[1] or error.__cause__
+    for err in (cause, error):
+        status = getattr(err, "code", None)
+        if isinstance(status, int) and 100 <= status < 600:
+            return status == 429 or status >= 500
+    if getattr(cause, "expected", False) or getattr(error, "expected", False):
+        return False
+    if isinstance(error, (asyncio.TimeoutError, OSError)):
+        return True
+    if isinstance(error, (KeyError, TypeError, ValueError, AttributeError)):
+        return False
+    message = str(error)
+    match = HTTP_ERROR_RE.search(message)
+    if match:
+        status = int(match.group(1))
+        return status == 429 or status >= 500
+    return not PERMANENT_ERROR_RE.search(message)
+
+
+def source_of(url: str) -> str:
+    """Return the source of a url for circuit breakers: its host, without `www.`, `m.` or `music.`.
+
+    Searches (queries which are not urls) are done by youtube_dl on Youtube.
+    """
+    host = (urlparse(url).hostname or "").lower()
+    host = re.sub(r"^(www|m|music)\.", "", host)
+    return {"youtu.be": "youtube.com", "": "youtube.com"}.get(host, host)
+
+
+class CircuitBreaker:
+    """Fail fast calls to a source after `threshold` consecutive transient failures.
+
+    Once open, calls fail with CircuitOpenError for `reset_timeout` seconds. Then the circuit is half open: one call
+    is let through, closing the circuit if it succeeds or opening it again if it fails.
+    """
+
+    def __init__(self, source: str, threshold: int = 5, reset_timeout: float = 60):
+        self.source = source
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = 0.0
+        self.state = "closed"
+        self._probing = False
+        CIRCUIT_STATE.set(CIRCUIT_STATES["closed"], source=source)
+
+    def _set_state(self, state: str) -> None:
+        self.state = state
+        CIRCUIT_STATE.set(CIRCUIT_STATES[state], source=self.source)
+
+    def before_call(self) -> None:
+        """Raise CircuitOpenError if the call must fail fast."""
+        if self.state == "open":
+            retry_in = self.opened_at + self.reset_timeout - time.monotonic()
+            if retry_in > 0:
+                raise CircuitOpenError(self.source, retry_in)
+            self._set_state("half_open")
+        if self.state == "half_open":
+            if self._probing:
+                raise CircuitOpenError(self.source, self.reset_timeout)
+            self._probing = True
+
+    def success(self) -> None:
+        """Record a call reaching the source, even if the call failed with a permanent error."""
+        self._probing = False
+        self.failures = 0
+        if self.state != "closed":
+            self._set_state("closed")
+
+    def failure(self) -> None:
+        """Record a transient failure."""
+        self._probing = False
+        self.failures += 1
+        if self.state == "half_open" or self.failures >= self.threshold:
+            self.opened_at = time.monotonic()
+            self._set_state("open")
+
+    def cancel(self) -> None:
+        """Record a cancelled call, letting another one probe the source."""
+        self._probing = False
+
+
+class Resilience:
+    """Retry transient failures of calls to sources, with one circuit breaker per source.
+
+    Calls are retried at most `attempts` times in total, waiting an exponential backoff with full jitter (between 0
+    and `base_delay * 2 ** retry`, up to `max_delay` seconds). No retry starts after `budget` seconds.
+    """
+
+    def __init__(
+        self,
+        attempts: int = 3,
+        base_delay: float = 1,
+        max_delay: float = 10,
+        budget: float = 30,
+        threshold: int = 5,
+        reset_timeout: float = 60,
+    ):
+        self.attempts = attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.budget = budget
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.breakers: dict[str, CircuitBreaker] = {}
+
+    def breaker(self, source: str) -> CircuitBreaker:
+        """Return the circuit breaker of a source."""
+        breaker = self.breakers.get(source)
+        if breaker is None:
+            breaker = self.breakers[source] = CircuitBreaker(source, self.threshold, self.reset_timeout)
+        return breaker
+
+    def delay(self, retry: int) -> float:
+        """Return the time to wait before the retry number `retry` (from 0), in seconds."""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2**retry))  # nosec
+
+    async def call(self, source: str, func: Callable[[], Awaitable]):
+        """Return the result of `func()`, a call to `source`, retrying it on transient errors.
+
+        Raises:
+            CircuitOpenError: the circuit of the source is open.
+            Exception: the last error of `func`.
+        """
+        breaker = self.breaker(source)
+        started_at = time.monotonic()
+        attempt = 0
+        while True:
+            try:
+                breaker.before_call()
+            except CircuitOpenError:
+                FAILURES.inc(source=source, kind="circuit_open")
+                raise
+            try:
+                result = await func()
+            except asyncio.CancelledError:
+                breaker.cancel()
+                raise
+            except Exception as error:  # noqa: B902
+                if not is_transient(error):
+                    breaker.success()
+                    FAILURES.inc(source=source, kind="permanent")
+                    raise
+                breaker.failure()
+                delay = self.delay(attempt)
+                attempt += 1
+                if attempt >= self.attempts or time.monotonic() - started_at + delay > self.budget:
+                    FAILURES.inc(source=source, kind="transient")
+                    raise
+                RETRIES.inc(source=source)
+                await asyncio.sleep(delay)
+            else:
+                breaker.success()
+                return result
+
+    def stats(self) -> dict:
+        """Return the state of the circuit of each source."""
+        return {source: breaker.state for source, breaker in self.breakers.items()}
@@ -10,12 +10,62 @@ class Settings(BaseSettings):
 
     name: str = "Rbot"
     debug: bool = False
+    log_format: str = "rich"
+    log_queue: bool = True
+    log_rate_limit: int = 20
+    log_rate_limit_per: float = 10
     discord_token: str = ""
     discord_server: str = ""
     status_chan: str = "bot-status"
     music_chan: str = "music"
     music_role: str = "dj"
     command_prefix: str = "!"
+    shard_count: int = 0
+    shard_workers: int = 1
+    intents_members: bool = False
+    intents_presences: bool = False
+    member_cache: str = "voice"
+    member_cache_size: int = 1024
+    roll_enabled: bool = True
+    clear_enabled: bool = True
+    music_enabled: bool = True
+    history_enabled: bool = True
+    stats_enabled: bool = True
+    metrics_host: str = "127.0.0.1"
+    metrics_port: int = 0
+    command_profile_threshold: float = 0
+    command_profile_sample_rate: float = 0.1
+    command_profile_dir: str = "."
+    loop_lag_threshold: float = 0.25
+    loop_lag_interval: float = 0.1
+    loop_lag_report_interval: int = 3600
+    music_idle_timeout: int = 300
+    music_prefetch_size: int = 1
+    player_state_path: str = ""
+    ytdl_cache_path: str = ""
+    ytdl_cache_size: int = 512
+    ytdl_metadata_ttl: int = 7 * 24 * 3600
+    ytdl_stream_ttl: int = 1800
+    ytdl_executor: str = "thread"
+    ytdl_workers: int = 4
+    ytdl_max_pending: int = 16
+    ytdl_playlist_max_size: int = 200
+    ytdl_playlist_concurrency: int = 4
+    ytdl_retry_attempts: int = 3
+    ytdl_retry_base_delay: float = 1
+    ytdl_retry_max_delay: float = 10
+    ytdl_retry_budget: float = 30
+    ytdl_breaker_threshold: int = 5
+    ytdl_breaker_reset_timeout: float = 60
+    music_playback: str = "pcm"
+    audio_cache_dir: str = ""
+    audio_cache_max_bytes: int = 2 * 1024**3
+    audio_cache_max_duration: int = 1200
+    yt_search_cache_size: int = 256
+    yt_search_ttl: int = 600
+    history_dir: str = "./history"
+    history_format: str = "ndjson"
+    roll_animation: bool = True
 
     class Config:
         """Configuration of Settings."""
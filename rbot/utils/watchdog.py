@@ -0,0 +1,138 @@
+# Built-in modules
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from typing import Awaitable, Callable, Optional
+
+# Internal modules
+from rbot.utils.metrics import REGISTRY
+from rbot.utils.rate_limit import RateLimiter
+
+LOOP_LAG_SECONDS = REGISTRY.histogram("rbot_loop_lag_seconds", "Lag of the event loop")
+LOOP_STALLS = REGISTRY.counter("rbot_loop_stalls_total", "Event loop stalls longer than the watchdog threshold")
+# Number of frames kept from the stack of a blocking call
+STACK_LIMIT = 15
+# Discord messages are limited to 2000 characters
+MAX_REPORTED_STACK = 1500
+
+
+class LoopWatchdog:
+    """Measure the lag of the event loop, capturing the stack of the calls blocking it.
+
+    A task wakes up every `interval` seconds and records how late it is. Meanwhile, a thread checks the last wake up:
+    when the loop has not run for `threshold` seconds, it captures the stack of the loop thread, which is the one of
+    the blocking call. Stalls are reported once the loop runs again (at most one per minute), and lag statistics every
+    `report_interval` seconds, through the log and the `report` coroutine function.
+    """
+
+    def __init__(
+        self,
+        interval: float = 0.1,
+        threshold: float = 0.25,
+        report_interval: float = 3600,
+        report: Optional[Callable[[str], Awaitable]] = None,
+        logger: Optional[logging.Logger] = None,
+    ):
+        self.interval = interval
+        self.threshold = threshold
+        self.report_interval = report_interval
+        self.report = report
+        self.logger = logger or logging.getLogger("rich")
+        self.lags: deque = deque(maxlen=max(1, int(report_interval / interval)))
+        self.stalls = 0
+        self.max_lag = 0.0
+        self.stall_reports = RateLimiter(rate=1, per=60)
+        self._beat = time.monotonic()
+        self._stack: Optional[str] = None
+        self._loop_thread: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._reports: set = set()
+        self._stopped = threading.Event()
+
+    def start(self) -> None:
+        """Start the watchdog, from the event loop to monitor."""
+        self._loop_thread = threading.get_ident()
+        self._beat = time.monotonic()
+        self._stopped.clear()
+        self._task = asyncio.get_running_loop().create_task(self._monitor())
+        threading.Thread(target=self._watch, name="loop-watchdog", daemon=True).start()
+
+    def stop(self) -> None:
+        """Stop the watchdog."""
+        self._stopped.set()
+        if self._task:
+            self._task.cancel()
+
+    def stats(self) -> dict:
+        """Return the lag statistics (in seconds) since the last report."""
+        lags = sorted(self.lags)
+        if not lags:
+            return {"p50": 0.0, "p99": 0.0, "max": self.max_lag, "stalls": self.stalls}
+        return {
+            "p50": lags[len(lags) // 2],
+            "p99": lags[min(len(lags) - 1, len(lags) * 99 // 100)],
+            "max": self.max_lag,
+            "stalls": self.stalls,
+        }
+
+    async def _monitor(self) -> None:
+        reported_at = time.monotonic()
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            self._beat = now
+            lag = max(0.0, now - expected)
+            self.lags.append(lag)
+            self.max_lag = max(self.max_lag, lag)
+            LOOP_LAG_SECONDS.observe(lag)
+            if lag >= self.threshold:
+                self._on_stall(lag)
+            if now - reported_at >= self.report_interval:
+                reported_at = now
+                self._report_stats()
+
+    def _on_stall(self, lag: float) -> None:
+        stack, self._stack = self._stack, None
+        self.stalls += 1
+        LOOP_STALLS.inc()
+        self.logger.warning("Event loop blocked for %.3fs, in:\n%s", lag, stack or "(stack not captured)")
+        if self.report and stack and self.stall_reports.try_acquire():
+            self._send(f"⚠️ Event loop blocked for {lag:.3f}s, in:\n```\n{stack[-MAX_REPORTED_STACK:]}\n```")
+
+    def _report_stats(self) -> None:
+        stats = self.stats()
+        message = (
+            f"Event loop lag: p50 {stats['p50'] * 1000:.1f}ms, p99 {stats['p99'] * 1000:.1f}ms, "
+            f"max {stats['max'] * 1000:.1f}ms, {stats['stalls']} stalls over {self.threshold}s"
+        )
+        self.logger.info(message)
+        self.stalls = 0
+        self.max_lag = 0.0
+        self.lags.clear()
+        if self.report:
+            self._send(message)
+
+    def _send(self, message: str) -> None:
+        # Reports are sent from their own task, not to delay the next measure
+        task = asyncio.get_running_loop().create_task(self._report(message))
+        self._reports.add(task)
+        task.add_done_callback(self._reports.discard)
+
+    async def _report(self, message: str) -> None:
+        try:
+            await self.report(message)
+        except Exception as err:  # noqa: B902
+            self.logger.error("Failed to report event loop lag: %s", err)
+
+    def _watch(self) -> None:
+        while not self._stopped.wait(self.threshold / 2):
+            # The loop is expected to run every `interval` seconds, it is blocked when late by more than `threshold`
+            if self._stack is None and time.monotonic() - self._beat > self.interval + self.threshold:
+                frame = sys._current_frames().get(self._loop_thread)
+                if frame is not None:
+                    self._stack = "".join(traceback.format_stack(frame, limit=STACK_LIMIT))
@@ -1,21 +1,34 @@
 # Built-in modules
 import asyncio
 import io
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import suppress
 from datetime import datetime, timedelta
 from functools import partial
-from typing import Union
+from typing import Optional, Union
+from urllib.parse import parse_qs, urlparse
 
 # External modules
 import discord
 import pytz
-import youtube_dl
 from discord.ext import commands
-from tenacity import retry, retry_if_exception_type
 
+# Internal modules
+from rbot.utils.metrics import REGISTRY
+from rbot.utils.resilience import Resilience, source_of
+from rbot.utils.settings import get_settings
+
+LOGGER = logging.getLogger("rich")
 TZ = pytz.timezone("Europe/Paris")
 
-# Suppress noise about console usage from errors
-youtube_dl.utils.bug_reports_message = lambda: ""
 ytdl_format_options = {
     "format": "bestaudio/best",
     "outtmpl": "%(extractor)s-%(id)s-%(title)s.%(ext)s",
@@ -34,14 +47,524 @@ ffmpeg_options = {
     "executable": "/usr/bin/ffmpeg",
     "options": "-vn",
 }
-ytdl = youtube_dl.YoutubeDL(ytdl_format_options)
+# Flat extraction of playlists, only listing their entries
+ytdl_playlist_options = {
+    **ytdl_format_options,
+    "noplaylist": False,
+    "extract_flat": "in_playlist",
+}
+# YoutubeDL instances of each worker, as YoutubeDL is not thread-safe
+_worker = threading.local()
+# Keys of a youtube_dl info dict which do not change over time
+METADATA_KEYS = ("id", "extractor", "title", "webpage_url", "duration", "thumbnail")
+# Safety margin (in seconds) kept before the expiration of a stream url
+STREAM_EXPIRE_MARGIN = 60
+VIDEO_ID_UNSAFE_RE = re.compile(r"[^\w-]")
+# Duration of an audio frame sent to Discord, in seconds
+FRAME_DURATION = 0.02
+FRAME_READ_SECONDS = REGISTRY.histogram("rbot_audio_frame_read_seconds", "Latency of audio frame reads", ("guild",))
+LATE_FRAMES = REGISTRY.counter(
+    "rbot_audio_late_frames_total",
+    "Audio frames read slower than a frame duration",
+    ("guild",),
+)
+UNDERRUNS = REGISTRY.counter(
+    "rbot_audio_underruns_total",
+    "Audio frames read slower than 3 frame durations, heard as a stutter",
+    ("guild",),
+)
+BYTES_STREAMED = REGISTRY.counter("rbot_audio_bytes_total", "Bytes of audio frames sent to Discord", ("guild",))
+TRACKS_PLAYED = REGISTRY.counter("rbot_tracks_total", "Tracks played", ("guild",))
+FFMPEG_START_SECONDS = REGISTRY.histogram(
+    "rbot_ffmpeg_start_seconds",
+    "Time between the creation of the FFmpeg source and its first audio frame",
+)
+FFMPEG_EXITS = REGISTRY.counter("rbot_ffmpeg_exits_total", "FFmpeg processes exit codes", ("code",))
 
 
-class YTDLSource(discord.PCMVolumeTransformer):
-    """Create a discord.PCMVolumeTransformer using youtube_dl."""
+class TTLCache:
+    """In-memory cache with a time to live per entry and a LRU eviction."""
 
-    def __init__(self, source: Union[str, io.BufferedIOBase], data: dict, requester: str):
-        super().__init__(source)
+    def __init__(self, maxsize: int = 512, ttl: float = 3600):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data: OrderedDict = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: str) -> bool:
+        entry = self._data.get(key)
+        return entry is not None and entry[0] > time.time()
+
+    def get(self, key: str) -> Optional[dict]:
+        """Return the value of `key`, or None if missing or expired."""
+        entry = self._data.get(key)
+        if entry is None or entry[0] <= time.time():
+            self._data.pop(key, None)
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def set(self, key: str, value: dict, ttl: Optional[float] = None) -> None:
+        """Store `value` for `ttl` seconds (default to the cache ttl)."""
+        self._data[key] = (time.time() + (self.ttl if ttl is None else ttl), value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def stats(self) -> dict:
+        """Return the cache counters."""
+        return {"size": len(self), "maxsize": self.maxsize, "hits": self.hits, "misses": self.misses}
+
+
+class SQLiteCache(TTLCache):
+    """On-disk cache with the same interface than TTLCache, backed by SQLite.
+
+    Its queries block: YTDLCache runs them in the default executor, off the event loop.
+    """
+
+    def __init__(self, path: str, maxsize: int = 512, ttl: float = 3600):
+        super().__init__(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS cache "
+            "(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL, accessed_at REAL NOT NULL)",
+        )
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            row = self._db.execute("SELECT expires_at FROM cache WHERE key = ?", (key,)).fetchone()
+        return row is not None and row[0] > time.time()
+
+    def get(self, key: str) -> Optional[dict]:
+        """Return the value of `key`, or None if missing or expired."""
+        now = time.time()
+        with self._lock:
+            row = self._db.execute("SELECT value, expires_at FROM cache WHERE key = ?", (key,)).fetchone()
+            if row is None or row[1] <= now:
+                self._db.execute("DELETE FROM cache WHERE key = ?", (key,))
+                self.misses += 1
+                return None
+            self._db.execute("UPDATE cache SET accessed_at = ? WHERE key = ?", (now, key))
+            self.hits += 1
+        return json.loads(row[0])
+
+    def set(self, key: str, value: dict, ttl: Optional[float] = None) -> None:
+        """Store `value` for `ttl` seconds (default to the cache ttl)."""
+        now = time.time()
+        expires_at = now + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), expires_at, now),
+            )
+            self._db.execute(
+                "DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.maxsize,),
+            )
+
+
+class YTDLCache:
+    """Cache of youtube_dl `extract_info` results.
+
+    Static metadata (title, duration, thumbnail..) are kept for a long time, while stream urls, which expire, are
+    kept for a short time only.
+    """
+
+    def __init__(self, metadata: TTLCache, streams: TTLCache):
+        self.metadata = metadata
+        self.streams = streams
+
+    @classmethod
+    def from_settings(cls) -> "YTDLCache":
+        """Build the cache from the application settings."""
+        settings = get_settings()
+        if settings.ytdl_cache_path:
+            metadata = SQLiteCache(
+                settings.ytdl_cache_path,
+                maxsize=settings.ytdl_cache_size,
+                ttl=settings.ytdl_metadata_ttl,
+            )
+        else:
+            metadata = TTLCache(maxsize=settings.ytdl_cache_size, ttl=settings.ytdl_metadata_ttl)
+        return cls(metadata=metadata, streams=TTLCache(maxsize=settings.ytdl_cache_size, ttl=settings.ytdl_stream_ttl))
+
+    def get_metadata(self, url: str) -> Optional[dict]:
+        """Return the static metadata of `url`."""
+        return self.metadata.get(url)
+
+    def get_stream(self, url: str) -> Optional[dict]:
+        """Return the metadata of `url` with a still valid stream url."""
+        return self.streams.get(url)
+
+    def has_stream(self, url: str) -> bool:
+        """Check if a valid stream url of `url` is cached, without touching counters."""
+        return url in self.streams
+
+    def put(self, url: str, data: dict) -> None:
+        """Store an `extract_info` result under `url` and its webpage url."""
+        keys, metadata = self._put_stream(url, data)
+        self._put_metadata(keys, metadata)
+
+    async def load_metadata(self, url: str, loop: asyncio.AbstractEventLoop) -> Optional[dict]:
+        """Return the static metadata of `url`, read off the event loop when they are stored on disk."""
+        return await self._call(loop, self.metadata.get, url)
+
+    async def store(self, url: str, data: dict, loop: asyncio.AbstractEventLoop) -> None:
+        """Store an `extract_info` result like `put`, writing its metadata off the event loop when stored on disk."""
+        keys, metadata = self._put_stream(url, data)
+        await self._call(loop, self._put_metadata, keys, metadata)
+
+    async def _call(self, loop: asyncio.AbstractEventLoop, func, *args):
+        if isinstance(self.metadata, SQLiteCache):
+            return await loop.run_in_executor(None, func, *args)
+        return func(*args)
+
+    def _put_stream(self, url: str, data: dict) -> tuple[set, dict]:
+        metadata = {key: data[key] for key in METADATA_KEYS if key in data}
+        # The codec of the stream tells if it can be sent to Discord without transcoding
+        stream = {**metadata, "url": data.get("url", ""), "acodec": data.get("acodec")}
+        ttl = self.streams.ttl
+        expire = parse_qs(urlparse(stream["url"]).query).get("expire")
+        if expire and expire[0].isdigit():
+            ttl = min(ttl, int(expire[0]) - time.time() - STREAM_EXPIRE_MARGIN)
+        keys = {url, data.get("webpage_url") or url}
+        if ttl > 0:
+            for key in keys:
+                self.streams.set(key, stream, ttl=ttl)
+        return keys, metadata
+
+    def _put_metadata(self, keys: set, metadata: dict) -> None:
+        for key in keys:
+            self.metadata.set(key, metadata)
+
+    def stats(self) -> dict:
+        """Return hit/miss counters of both caches."""
+        return {"metadata": self.metadata.stats(), "streams": self.streams.stats()}
+
+
+def _youtube_dl():
+    """Import youtube_dl on first use, loading its extractors takes a while."""
+    import youtube_dl
+
+    # Suppress noise about console usage from errors
+    youtube_dl.utils.bug_reports_message = lambda: ""
+    return youtube_dl
+
+
+def _worker_extract_info(url: str, submitted_at: float, flat: bool = False) -> tuple[dict, float, float]:
+    """Run `extract_info` with the YoutubeDL instance of the current worker.
+
+    Returns:
+        The info dict, the time spent waiting for a worker and the extraction latency (in seconds).
+    """
+    started_at = time.time()
+    if not hasattr(_worker, "instances"):
+        _worker.instances = {}
+    ytdl = _worker.instances.get(flat)
+    if ytdl is None:
+        ytdl = _worker.instances[flat] = _youtube_dl().YoutubeDL(ytdl_playlist_options if flat else ytdl_format_options)
+    data = ytdl.extract_info(url=url, download=False)
+    return data, started_at - submitted_at, time.time() - started_at
+
+
+class ExtractorPool:
+    """Dedicated and bounded executor running youtube_dl extractions.
+
+    At most `workers + max_pending` extractions are submitted to the executor, callers above this limit wait for a
+    free slot (back-pressure) instead of piling up in the executor queue.
+    """
+
+    def __init__(self, kind: str = "thread", workers: int = 4, max_pending: int = 16, samples: int = 256):
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Unknown extractor pool kind: {kind}")
+        self.kind = kind
+        self.workers = workers
+        self.max_pending = max_pending
+        self.failures = 0
+        self.queue_wait: deque = deque(maxlen=samples)
+        self.latency: deque = deque(maxlen=samples)
+        self._executor: Optional[Executor] = None
+        self._slots = asyncio.Semaphore(workers + max_pending)
+        self._in_flight = 0
+
+    @classmethod
+    def from_settings(cls) -> "ExtractorPool":
+        """Build the pool from the application settings."""
+        settings = get_settings()
+        return cls(kind=settings.ytdl_executor, workers=settings.ytdl_workers, max_pending=settings.ytdl_max_pending)
+
+    @property
+    def executor(self) -> Executor:
+        """Executor of the pool, started on first use."""
+        if self._executor is None:
+            if self.kind == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="ytdl")
+        return self._executor
+
+    async def extract_info(self, url: str, loop: asyncio.AbstractEventLoop, flat: bool = False) -> dict:
+        """Run `extract_info` of `url` in the pool, `flat` only lists the entries of a playlist."""
+        submitted_at = time.time()
+        async with self._slots:
+            self._in_flight += 1
+            try:
+                data, queue_wait, latency = await loop.run_in_executor(
+                    self.executor,
+                    _worker_extract_info,
+                    url,
+                    submitted_at,
+                    flat,
+                )
+            except Exception:
+                self.failures += 1
+                raise
+            finally:
+                self._in_flight -= 1
+        self.queue_wait.append(queue_wait)
+        self.latency.append(latency)
+        return data
+
+    def stats(self) -> dict:
+        """Return the pool usage and timings (in seconds) of the last extractions."""
+        return {
+            "kind": self.kind,
+            "workers": self.workers,
+            "in_flight": self._in_flight,
+            "failures": self.failures,
+            "queue_wait_avg": sum(self.queue_wait) / len(self.queue_wait) if self.queue_wait else 0.0,
+            "queue_wait_max": max(self.queue_wait, default=0.0),
+            "latency_avg": sum(self.latency) / len(self.latency) if self.latency else 0.0,
+            "latency_max": max(self.latency, default=0.0),
+        }
+
+    def shutdown(self) -> None:
+        """Stop the executor, without waiting for running extractions."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+def _search_videos(query: str, limit: int) -> list:
+    # Imported on first use, as youtubesearchpython loads httpx
+    from youtubesearchpython import VideosSearch
+
+    return VideosSearch(query, limit=limit).result().get("result", [])
+
+
+class YTSearch:
+    """Youtube search run off the event loop.
+
+    Results are cached by normalized query, and identical searches in flight share the same request.
+    """
+
+    def __init__(self, cache: TTLCache, limit: int = 10):
+        self.cache = cache
+        self.limit = limit
+        self._in_flight: dict[str, asyncio.Future] = {}
+
+    @staticmethod
+    def normalize(query: str) -> str:
+        """Return the cache key of a search query."""
+        return " ".join(query.casefold().split())
+
+    async def search(self, query: str, loop: asyncio.AbstractEventLoop) -> list:
+        """Return the videos found for `query`."""
+        key = self.normalize(query)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached["result"]
+        future = self._in_flight.get(key)
+        if future is None:
+            future = loop.run_in_executor(None, _search_videos, key, self.limit)
+            self._in_flight[key] = future
+            future.add_done_callback(partial(self._on_done, key))
+        # Shield the shared request, a waiter being cancelled must not cancel it for the others
+        return await asyncio.shield(future)
+
+    def _on_done(self, key: str, future: asyncio.Future) -> None:
+        self._in_flight.pop(key, None)
+        if not future.cancelled() and future.exception() is None:
+            self.cache.set(key, {"result": future.result()})
+
+
+class AudioCache:
+    """On-disk cache of audio tracks, already encoded in Opus, keyed by video id.
+
+    Tracks are downloaded in background by FFmpeg while they are streamed for the first time, and written
+    atomically: a track is only visible in the cache once fully downloaded. The least recently played tracks are
+    evicted when the cache exceeds `max_bytes`.
+    """
+
+    extension = "opus"
+
+    def __init__(self, directory: str, max_bytes: int, executable: str = "ffmpeg"):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.executable = executable
+        self.hits = 0
+        self.misses = 0
+        self._downloads: dict[str, asyncio.Task] = {}
+        os.makedirs(directory, exist_ok=True)
+
+    @classmethod
+    def from_settings(cls) -> Optional["AudioCache"]:
+        """Build the cache from the application settings, None if it is disabled."""
+        settings = get_settings()
+        if not settings.audio_cache_dir:
+            return None
+        return cls(settings.audio_cache_dir, settings.audio_cache_max_bytes, executable=ffmpeg_options["executable"])
+
+    def path(self, video_id: str) -> str:
+        """Return the path of a track in the cache."""
+        return os.path.join(self.directory, f"{VIDEO_ID_UNSAFE_RE.sub('_', video_id)}.{self.extension}")
+
+    def get(self, video_id: str) -> Optional[str]:
+        """Return the path of a cached track, marking it as recently used."""
+        path = self.path(video_id)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return path
+
+    def schedule(self, video_id: str, url: str) -> None:
+        """Download a track in background, unless it is already being downloaded."""
+        if video_id in self._downloads:
+            return
+        task = asyncio.create_task(self.download(video_id, url))
+        self._downloads[video_id] = task
+        task.add_done_callback(lambda _: self._downloads.pop(video_id, None))
+
+    async def download(self, video_id: str, url: str) -> None:
+        """Download and encode a track in Opus, then move it in the cache."""
+        path = self.path(video_id)
+        tmp_path = f"{path}.part"
+        process = await asyncio.create_subprocess_exec(
+            self.executable,
+            *("-nostdin", "-loglevel", "error", "-y", "-i", url, "-vn", "-c:a", "libopus", "-b:a", "128k"),
+            *("-f", "ogg", tmp_path),
+            stdout=asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        try:
+            _, stderr = await process.communicate()
+        except asyncio.CancelledError:
+            with suppress(ProcessLookupError):
+                process.kill()
+            # The partial track is removed once FFmpeg stopped writing it
+            await process.wait()
+            raise
+        finally:
+            if process.returncode != 0:
+                with suppress(FileNotFoundError):
+                    os.remove(tmp_path)
+        if process.returncode != 0:
+            LOGGER.warning("Failed to cache track '%s': %s", video_id, stderr.decode(errors="replace").strip())
+            return
+        os.replace(tmp_path, path)
+        await asyncio.get_running_loop().run_in_executor(None, self.evict)
+
+    def evict(self) -> None:
+        """Remove the least recently used tracks until the cache fits in `max_bytes`."""
+        with os.scandir(self.directory) as entries:
+            files = [(entry.stat().st_mtime, entry.stat().st_size, entry.path) for entry in entries if entry.is_file()]
+        files = [file for file in files if file[2].endswith(f".{self.extension}")]
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.max_bytes:
+                break
+            with suppress(FileNotFoundError):
+                os.remove(path)
+            total -= size
+
+    def stats(self) -> dict:
+        """Return the cache counters."""
+        return {"hits": self.hits, "misses": self.misses, "downloads": len(self._downloads)}
+
+
+ytdl_cache = YTDLCache.from_settings()
+audio_cache = AudioCache.from_settings()
+extractor_pool = ExtractorPool.from_settings()
+# Extractions of each source are retried and fail fast during its outages
+extraction = Resilience(
+    attempts=get_settings().ytdl_retry_attempts,
+    base_delay=get_settings().ytdl_retry_base_delay,
+    max_delay=get_settings().ytdl_retry_max_delay,
+    budget=get_settings().ytdl_retry_budget,
+    threshold=get_settings().ytdl_breaker_threshold,
+    reset_timeout=get_settings().ytdl_breaker_reset_timeout,
+)
+yt_search = YTSearch(TTLCache(maxsize=get_settings().yt_search_cache_size, ttl=get_settings().yt_search_ttl))
+
+
+def _collect_stats() -> list:
+    samples = []
+    for cache, stats in ytdl_cache.stats().items():
+        samples.extend((f"rbot_ytdl_cache_{key}", {"cache": cache}, value) for key, value in stats.items())
+    if audio_cache:
+        samples.extend((f"rbot_audio_cache_{key}", {}, value) for key, value in audio_cache.stats().items())
+    samples.extend(
+        (f"rbot_extractor_{key}", {}, value) for key, value in extractor_pool.stats().items() if key != "kind"
+    )
+    return samples
+
+
+REGISTRY.add_collector(_collect_stats)
+
+
+async def extract_info(url: str, loop: asyncio.AbstractEventLoop) -> dict:
+    """Run `extract_info` in the extractor pool and store its result in the cache.
+
+    Transient errors are retried, see `Resilience`.
+    """
+    data = await extraction.call(source_of(url), lambda: extractor_pool.extract_info(url, loop))
+    if "entries" in data:
+        # take first item from a playlist
+        data = data["entries"][0]
+    await ytdl_cache.store(url, data, loop)
+    return data
+
+
+async def extract_playlist(url: str, loop: asyncio.AbstractEventLoop) -> tuple[str, list]:
+    """List the entries of a playlist, without extracting each one of them.
+
+    Returns:
+        The playlist title and its entries.
+    """
+    data = await extraction.call(source_of(url), lambda: extractor_pool.extract_info(url, loop, flat=True))
+    return data.get("title", "no_title"), [entry for entry in data.get("entries") or [] if entry]
+
+
+def to_song(data: dict, requester: discord.abc.User) -> dict:
+    """Convert a youtube_dl info dict to a song of the player queue."""
+    return {
+        "url": data.get("webpage_url", "no_url"),
+        "requester": requester,
+        "title": data.get("title", "no_title"),
+        "duration": str(timedelta(seconds=data.get("duration") or 0)),
+        "duration_sec": int(data.get("duration") or 0),
+        "thumbnail": data.get("thumbnail", "no_thumbnail"),
+    }
+
+
+class TrackMetadata:
+    """Metadata of a track played by the bot."""
+
+    def _set_metadata(self, data: dict, requester: str) -> None:
         self.webpage_url: str = data.get("webpage_url", "")
         self.requester: str = requester
         self.title: str = data.get("title", "")
@@ -58,50 +581,208 @@ class YTDLSource(discord.PCMVolumeTransformer):
         """
         return self.__getattribute__(item)
 
+
+class YTDLSource(TrackMetadata, discord.PCMVolumeTransformer):
+    """Create a discord.PCMVolumeTransformer using youtube_dl."""
+
+    def __init__(self, source: Union[str, io.BufferedIOBase], data: dict, requester: str):
+        super().__init__(source)
+        self._set_metadata(data, requester)
+
     @classmethod
     async def create_source(cls, ctx: commands.Context, url: str, loop: asyncio.AbstractEventLoop) -> dict:
         """Add `search` url to queue."""
         loop = loop or asyncio.get_event_loop()
-        to_run = partial(ytdl.extract_info, url=url, download=False)
-        data = await loop.run_in_executor(None, to_run)
-        if "entries" in data:
-            # take first item from a playlist
-            data = data["entries"][0]
-        title = data.get("title", "no_title")
-        _url = data.get("webpage_url", "no_url")
-        duration = str(timedelta(seconds=data.get("duration", 0)))
-        duration_sec: int = int(data.get("duration", 0))
-        thumbnail = data.get("thumbnail", "no_thumbnail")
+        data = await ytdl_cache.load_metadata(url, loop) or await extract_info(url, loop)
+        song = to_song(data, ctx.author)
         embed = discord.Embed(
             title=f"Music added by {ctx.author}",
-            description=f"[{title}]({_url}) - {duration}",
+            description=f"[{song['title']}]({song['url']}) - {song['duration']}",
             color=discord.Color.blue(),
         )
-        embed.set_thumbnail(url=thumbnail)
+        embed.set_thumbnail(url=song["thumbnail"])
         embed.timestamp = datetime.now(tz=TZ)
         await ctx.send(embed=embed)
-        return {
-            "url": _url,
-            "requester": ctx.author,
-            "title": title,
-            "duration": duration,
-            "duration_sec": duration_sec,
-            "thumbnail": thumbnail,
-        }
+        return song
+
+    @classmethod
+    async def create_playlist_sources(
+        cls,
+        ctx: commands.Context,
+        url: str,
+        loop: asyncio.AbstractEventLoop,
+        max_size: int = 200,
+    ) -> list:
+        """Return songs of a playlist, only with the information given by a flat extraction.
+
+        Their full metadata are meant to be resolved later on.
+        """
+        loop = loop or asyncio.get_event_loop()
+        title, entries = await extract_playlist(url, loop)
+        songs = []
+        for entry in entries[:max_size]:
+            song = to_song(entry, ctx.author)
+            if entry.get("ie_key", "Youtube") == "Youtube" and entry.get("id"):
+                song["url"] = f"https://www.youtube.com/watch?v={entry['id']}"
+            elif entry.get("url"):
+                song["url"] = entry["url"]
+            songs.append(song)
+        embed = discord.Embed(
+            title=f"Playlist added by {ctx.author}",
+            description=f"[{title}]({url}) - {len(songs)} songs",
+            color=discord.Color.blue(),
+        )
+        embed.timestamp = datetime.now(tz=TZ)
+        await ctx.send(embed=embed)
+        return songs
 
     @classmethod
-    @retry(retry=retry_if_exception_type(Exception))
-    async def regather_stream(cls, data: dict, loop: asyncio.AbstractEventLoop) -> "YTDLSource":
+    async def regather_stream(
+        cls,
+        data: dict,
+        loop: asyncio.AbstractEventLoop,
+        volume: float = 1.0,
+    ) -> Union["YTDLSource", "YTDLOpusSource"]:
         """Used for preparing a stream.
 
         Since Youtube Streaming links expire.
         """
         loop = loop or asyncio.get_event_loop()
         requester = data.get("requester", "no_requester")
-        to_run = partial(ytdl.extract_info, url=data.get("url", "no_url"), download=False)
-        data = await loop.run_in_executor(None, to_run)
-        return cls(
-            source=discord.FFmpegPCMAudio(data.get("url", "no_url")),
+        url = data.get("url", "no_url")
+        # Offset (in seconds) to start the track from, when resuming it
+        start = data.get("start", 0)
+        if audio_cache:
+            metadata = await ytdl_cache.load_metadata(url, loop)
+            path = audio_cache.get(metadata["id"]) if metadata and metadata.get("id") else None
+            if path:
+                return cls.create_audio(path, metadata, requester, volume=volume, codec="opus", start=start)
+        data = ytdl_cache.get_stream(url) or await extract_info(url, loop)
+        if audio_cache and data.get("id") and (data.get("duration") or 0) <= get_settings().audio_cache_max_duration:
+            audio_cache.schedule(data["id"], data.get("url", "no_url"))
+        return cls.create_audio(
+            data.get("url", "no_url"),
+            data,
+            requester,
+            volume=volume,
+            codec=data.get("acodec"),
+            start=start,
+        )
+
+    @classmethod
+    def create_audio(
+        cls,
+        location: str,
+        data: dict,
+        requester: str,
+        volume: float = 1.0,
+        codec: Optional[str] = None,
+        start: float = 0,
+    ) -> Union["YTDLSource", "YTDLOpusSource"]:
+        """Create the audio source of a track, using the playback mode from settings, starting `start` seconds in."""
+        if get_settings().music_playback == "opus":
+            return YTDLOpusSource(location, data=data, requester=requester, volume=volume, codec=codec, start=start)
+        source = cls(
+            source=discord.FFmpegPCMAudio(location, before_options=_seek_options(start)),
             data=data,
             requester=requester,
         )
+        source.volume = volume
+        return source
+
+
+class InstrumentedSource(discord.AudioSource):
+    """Wrap an audio source to measure its frame reads, from the audio player thread.
+
+    The first frame measures the FFmpeg start time, following ones the read latency: reads slower than a frame
+    duration are late, and reads slower than 3 frame durations are underruns. The FFmpeg exit code and the number of
+    bytes streamed are recorded on cleanup.
+    """
+
+    def __init__(self, source: discord.AudioSource, guild_id: int):
+        self.source = source
+        self.guild = str(guild_id)
+        self.bytes = 0
+        self.frames = 0
+        self.late_frames = 0
+        self.underruns = 0
+        self._created_at = time.perf_counter()
+        self._closed = False
+
+    @property
+    def played_sec(self) -> float:
+        """Duration of the audio read so far, in seconds."""
+        return self.frames * FRAME_DURATION
+
+    def is_opus(self) -> bool:
+        """Check if the wrapped source produces Opus packets."""
+        return self.source.is_opus()
+
+    def read(self) -> bytes:
+        """Read a frame from the wrapped source, measuring it."""
+        started_at = time.perf_counter()
+        data = self.source.read()
+        latency = time.perf_counter() - started_at
+        if not data:
+            return data
+        self.frames += 1
+        self.bytes += len(data)
+        if self.frames == 1:
+            FFMPEG_START_SECONDS.observe(time.perf_counter() - self._created_at)
+            return data
+        FRAME_READ_SECONDS.observe(latency, guild=self.guild)
+        if latency > FRAME_DURATION:
+            self.late_frames += 1
+            LATE_FRAMES.inc(guild=self.guild)
+        if latency > 3 * FRAME_DURATION:
+            self.underruns += 1
+            UNDERRUNS.inc(guild=self.guild)
+        return data
+
+    def cleanup(self) -> None:
+        """Cleanup the wrapped source, recording its FFmpeg exit code."""
+        if self._closed:
+            return
+        self._closed = True
+        process = _ffmpeg_process(self.source)
+        self.source.cleanup()
+        if process is not None and process.returncode is not None:
+            FFMPEG_EXITS.inc(code=process.returncode)
+        BYTES_STREAMED.inc(self.bytes, guild=self.guild)
+        TRACKS_PLAYED.inc(guild=self.guild)
+
+
+def _seek_options(start: float) -> Optional[str]:
+    # Seeking before the input is fast, FFmpeg only reads the stream from the offset
+    return f"-ss {start:.2f}" if start else None
+
+
+def _ffmpeg_process(source: discord.AudioSource):
+    while isinstance(source, discord.PCMVolumeTransformer):
+        source = source.original
+    return getattr(source, "_process", None)
+
+
+class YTDLOpusSource(TrackMetadata, discord.FFmpegOpusAudio):
+    """Create a discord.FFmpegOpusAudio using youtube_dl.
+
+    Opus packets are sent to Discord as they are: a track already encoded in Opus is not transcoded when its volume
+    is 1, otherwise FFmpeg applies the volume filter and encodes it. Nothing is done per frame in Python.
+    """
+
+    def __init__(
+        self,
+        location: str,
+        data: dict,
+        requester: str,
+        volume: float = 1.0,
+        codec: Optional[str] = None,
+        start: float = 0,
+    ):
+        options = ffmpeg_options["options"]
+        if volume != 1:
+            options = f"{options} -filter:a volume={volume}"
+            codec = None
+        super().__init__(location, codec=codec, before_options=_seek_options(start), options=options)
+        self.volume: float = volume
+        self._set_metadata(data, requester)
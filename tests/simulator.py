@@ -0,0 +1,357 @@
+"""Offline stand-ins of Discord and Youtube to run the music pipeline without network.
+
+The fakes implement what `Music` and `MusicPlayer` use of the bot, guilds, channels and voice clients. The voice
+client consumes audio frames from its own thread, like the discord.py audio player, at `speed` times real time.
+`offline()` replaces youtube_dl, the Youtube search and FFmpeg by fakes returning generated tracks. The fakes are shared
+by the tests and the load test benchmark.
+"""
+
+# Built-in modules
+import asyncio
+import hashlib
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+# External modules
+import discord
+
+# Internal modules
+from rbot.utils import yt_player
+from rbot.utils.settings import get_settings
+from rbot.utils.yt_player import FRAME_DURATION, TrackMetadata, YTDLSource
+
+# Size of a 20ms frame of 48kHz stereo 16-bit PCM
+FRAME_SIZE = 3840
+_ids = itertools.count(1)
+
+
+class FakeMessage(discord.Message):
+    """Message sent by the bot, counting its edits."""
+
+    def __init__(self, channel: "FakeTextChannel", **kwargs):
+        self.id = next(_ids)
+        self.channel = channel
+        self.content = kwargs
+        self.edits = 0
+        self.deleted = False
+
+    def __repr__(self) -> str:
+        return f"<FakeMessage id={self.id} edits={self.edits}>"
+
+    async def edit(self, **kwargs) -> "FakeMessage":
+        self.content = kwargs
+        self.edits += 1
+        return self
+
+    async def delete(self) -> None:
+        self.deleted = True
+
+
+class FakeTextChannel:
+    """Text channel keeping the messages sent to it."""
+
+    def __init__(self, guild: "FakeGuild", name: str):
+        self.id = next(_ids)
+        self.guild = guild
+        self.name = name
+        self.messages: list = []
+
+    async def send(self, content: Optional[str] = None, **kwargs) -> FakeMessage:
+        message = FakeMessage(self, content=content, **kwargs)
+        self.messages.append(message)
+        return message
+
+    async def fetch_message(self, message_id: int) -> FakeMessage:
+        for message in self.messages:
+            if message.id == message_id:
+                return message
+        raise discord.NotFound(FakeResponse(404), "Unknown Message")
+
+
+class FakeResponse:
+    """HTTP response of a failed request."""
+
+    def __init__(self, status: int):
+        self.status = status
+        self.reason = "Fake"
+
+
+class FakeVoiceChannel(discord.VoiceChannel):
+    """Voice channel."""
+
+    def __init__(self, guild: "FakeGuild", name: str = "General"):
+        self.id = next(_ids)
+        self.guild = guild
+        self.name = name
+
+    def __repr__(self) -> str:
+        return f"<FakeVoiceChannel id={self.id} name={self.name!r}>"
+
+    async def connect(self) -> "FakeVoiceClient":
+        self.guild.voice_client = FakeVoiceClient(self.guild.bot, self, self.guild.speed)
+        return self.guild.voice_client
+
+
+class FakeVoiceClient(discord.VoiceProtocol):
+    """Voice client reading the frames of the played source from a thread, `speed` times faster than real time.
+
+    It records the frames played and the gaps between the end of a track and the start of the next one.
+    """
+
+    def __init__(self, client, channel: FakeVoiceChannel, speed: float = 1):
+        super().__init__(client, channel)
+        self.speed = speed
+        self.frames = 0
+        self.tracks = 0
+        self.gaps: list = []
+        self._ended_at: Optional[float] = None
+        self._resumed = threading.Event()
+        self._resumed.set()
+        self._stopped = threading.Event()
+        self._ended = threading.Event()
+        self._ended.set()
+
+    def play(self, source: discord.AudioSource, after=None) -> None:
+        if self.is_playing():
+            raise discord.ClientException("Already playing audio.")
+        if self._ended_at is not None:
+            self.gaps.append(time.perf_counter() - self._ended_at)
+        self._stopped.clear()
+        self._ended.clear()
+        self._resumed.set()
+        threading.Thread(target=self._play, args=(source, after), daemon=True).start()
+
+    def _play(self, source: discord.AudioSource, after) -> None:
+        next_at = time.perf_counter()
+        try:
+            while not self._stopped.is_set():
+                self._resumed.wait()
+                if not source.read():
+                    break
+                self.frames += 1
+                next_at += FRAME_DURATION / self.speed
+                time.sleep(max(0.0, next_at - time.perf_counter()))
+        finally:
+            source.cleanup()
+            self.tracks += 1
+            self._ended_at = time.perf_counter()
+            # Like the discord.py audio player, the track is over before `after` is called
+            self._ended.set()
+            if after:
+                after(None)
+
+    def is_playing(self) -> bool:
+        return not self._ended.is_set()
+
+    def is_paused(self) -> bool:
+        return not self._resumed.is_set()
+
+    def is_connected(self) -> bool:
+        return True
+
+    def pause(self) -> None:
+        self._resumed.clear()
+
+    def resume(self) -> None:
+        self._resumed.set()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self._resumed.set()
+
+    async def disconnect(self, *, force: bool = False) -> None:
+        self.stop()
+        self.channel.guild.voice_client = None
+
+
+class FakeMember:
+    """Member of a guild."""
+
+    def __init__(self, guild: "FakeGuild", name: str):
+        self.id = next(_ids)
+        self.guild = guild
+        self.name = name
+        self.voice = None
+
+    def __str__(self) -> str:
+        return self.name
+
+
+class FakeGuild:
+    """Guild with a music channel and a voice channel."""
+
+    def __init__(self, bot: "FakeBot", name: str, speed: float = 1):
+        self.id = next(_ids)
+        self.bot = bot
+        self.name = name
+        self.speed = speed
+        self.voice_client: Optional[FakeVoiceClient] = None
+        self.music_chan = FakeTextChannel(self, get_settings().music_chan)
+        self.voice_channel = FakeVoiceChannel(self)
+        self.members: dict[int, FakeMember] = {}
+
+    @property
+    def text_channels(self) -> list:
+        return [self.music_chan]
+
+    def get_channel(self, channel_id: int):
+        return next((chan for chan in (self.music_chan, self.voice_channel) if chan.id == channel_id), None)
+
+    def get_member(self, member_id: int) -> Optional[FakeMember]:
+        return self.members.get(member_id)
+
+    def member(self, name: str) -> FakeMember:
+        """Add a member in the voice channel."""
+        member = FakeMember(self, name)
+        member.voice = type("VoiceState", (), {"channel": self.voice_channel})()
+        self.members[member.id] = member
+        return member
+
+
+class FakeBot:
+    """Bot connected to a fake gateway, every event is already received."""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self.settings = get_settings()
+        self.guilds: list = []
+        self.cogs: dict = {}
+
+    def add_cog(self, cog) -> None:
+        self.cogs[cog.qualified_name] = cog
+
+    def get_cog(self, name: str):
+        return self.cogs.get(name)
+
+    def get_guild(self, guild_id: int) -> Optional[FakeGuild]:
+        return next((guild for guild in self.guilds if guild.id == guild_id), None)
+
+    async def get_or_fetch_member(self, guild: FakeGuild, member_id: int) -> Optional[FakeMember]:
+        return guild.get_member(member_id)
+
+    async def wait_until_ready(self) -> None:
+        return None
+
+    def is_closed(self) -> bool:
+        return False
+
+    async def change_presence(self, **kwargs) -> None:
+        return None
+
+    async def wait_for(self, event: str, check=None, timeout: Optional[float] = None):
+        # Nobody clicks on buttons of the fake gateway
+        raise asyncio.TimeoutError()
+
+
+class FakeContext:
+    """Context of a command sent by `author` in the music channel."""
+
+    def __init__(self, bot: FakeBot, guild: FakeGuild, author: FakeMember, cog):
+        self.bot = bot
+        self.guild = guild
+        self.channel = guild.music_chan
+        self.author = author
+        self.cog = cog
+        self.message = FakeMessage(self.channel)
+
+    @property
+    def voice_client(self) -> Optional[FakeVoiceClient]:
+        return self.guild.voice_client
+
+    async def send(self, content: Optional[str] = None, **kwargs) -> FakeMessage:
+        return await self.channel.send(content, **kwargs)
+
+    async def reply(self, content: Optional[str] = None, **kwargs) -> FakeMessage:
+        return await self.channel.send(content, **kwargs)
+
+
+class FakeInteraction:
+    """Click on a button of the player."""
+
+    def __init__(self, guild: FakeGuild, author: FakeMember):
+        self.guild_id = guild.id
+        self.author = author
+
+    async def defer(self) -> None:
+        return None
+
+
+class FakeAudioSource(TrackMetadata, discord.AudioSource):
+    """Silent PCM track of the duration given by its metadata, from `start` seconds."""
+
+    def __init__(self, data: dict, requester, start: float = 0):
+        self._set_metadata(data, requester)
+        self.remaining = max(0, int((self.duration_sec - start) / FRAME_DURATION))
+
+    def read(self) -> bytes:
+        if self.remaining <= 0:
+            return b""
+        self.remaining -= 1
+        return bytes(FRAME_SIZE)
+
+    def is_opus(self) -> bool:
+        return False
+
+
+class FakeYoutubeDL:
+    """youtube_dl.YoutubeDL returning generated info dicts after `latency` seconds."""
+
+    latency = 0.05
+    durations = (2, 6)
+
+    def __init__(self, options: dict):
+        self.options = options
+
+    def extract_info(self, url: str, download: bool = False) -> dict:
+        time.sleep(self.latency)
+        return fake_info(url, self.durations)
+
+
+def fake_info(url: str, durations: tuple = (2, 6)) -> dict:
+    """Return the info dict of a generated track, its duration (in seconds) being derived from its url."""
+    video_id = hashlib.sha1(url.encode()).hexdigest()[:11]  # nosec
+    low, high = durations
+    return {
+        "id": video_id,
+        "extractor": "youtube",
+        "webpage_url": url,
+        "title": f"Track {video_id}",
+        "duration": low + int(video_id, 16) % (high - low + 1),
+        "thumbnail": f"https://i.ytimg.com/vi/{video_id}/hqdefault.jpg",
+        "url": f"https://example.invalid/{video_id}.webm",
+        "acodec": "opus",
+    }
+
+
+def _fake_search(query: str, limit: int) -> list:
+    return [
+        {"title": f"{query} {i}", "link": f"https://www.youtube.com/watch?v={query}-{i}", "duration": "0:04"}
+        for i in range(limit)
+    ]
+
+
+@contextmanager
+def offline(latency: float = 0.05, durations: tuple = (2, 6)) -> Iterator[None]:
+    """Replace youtube_dl, the Youtube search and FFmpeg by fakes, while in the context."""
+
+    def create_audio(cls, location, data, requester, volume=1.0, codec=None, start=0):
+        return FakeAudioSource(data, requester, start)
+
+    FakeYoutubeDL.latency = latency
+    FakeYoutubeDL.durations = durations
+    patches = {
+        (yt_player, "_youtube_dl"): lambda: type("youtube_dl", (), {"YoutubeDL": FakeYoutubeDL}),
+        (yt_player, "_search_videos"): _fake_search,
+        (YTDLSource, "create_audio"): classmethod(create_audio),
+    }
+    originals = {(target, name): target.__dict__[name] for target, name in patches}
+    for (target, name), value in patches.items():
+        setattr(target, name, value)
+    try:
+        yield
+    finally:
+        for (target, name), value in originals.items():
+            setattr(target, name, value)
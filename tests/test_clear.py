@@ -0,0 +1,122 @@
+import asyncio
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import discord
+import pytest
+from discord.ext import commands
+
+from rbot.bot.commands.clear import Clear, ClearJob, parse_filters
+
+
+def _msg(name: str, content: str, author_id: int = 1):
+    return SimpleNamespace(author=SimpleNamespace(name=name, display_name=name, id=author_id), content=content)
+
+
+def test_parse_filters():
+    check, before, after = parse_filters(("author=<@!42>", "regex=^foo", "before=1234", "after=2022-07-01"))
+    assert check(_msg("bob", "foo bar", author_id=42))
+    assert not check(_msg("bob", "bar foo", author_id=42))
+    assert not check(_msg("alice", "foo"))
+    assert isinstance(before, discord.Object) and before.id == 1234
+    assert after.year == 2022
+
+
+def test_parse_filters_without_filter():
+    check, before, after = parse_filters(())
+    assert check(_msg("bob", "anything"))
+    assert before is None and after is None
+
+
+@pytest.mark.parametrize("_filter", ["author", "regex=(", "before=yesterday", "color=red"])
+def test_parse_filters_bad_argument(_filter):
+    with pytest.raises(commands.BadArgument):
+        parse_filters((_filter,))
+
+
+class FailingChannel:
+    id = 1
+    name = "general"
+
+    def history(self, **kwargs):
+        raise discord.Forbidden(SimpleNamespace(status=403, reason="Forbidden"), "Missing Access")
+
+
+class DeletedMessage:
+    id = 2
+
+    def __init__(self):
+        self.edits = []
+
+    async def edit(self, **kwargs):
+        self.edits.append(kwargs["content"])
+        raise discord.NotFound(SimpleNamespace(status=404, reason="Not Found"), "Unknown Message")
+
+
+def test_failed_clear_job_is_reported_to_the_user():
+    cog = Clear()
+    progress = DeletedMessage()
+
+    async def run():
+        job = ClearJob(FailingChannel(), progress, cog.logger)
+        task = asyncio.create_task(job.run(10, lambda msg: True))
+        task.add_done_callback(lambda _task: cog._on_job_done(_task, job))
+        await asyncio.sleep(0.01)
+
+    asyncio.run(run())
+    assert len(progress.edits) == 1
+    assert progress.edits[0].startswith("ERROR: Clear failed after 0 messages deleted")
+
+
+class Message:
+    def __init__(self, message_id, created_at, missing=False):
+        self.id = message_id
+        self.created_at = created_at
+        self.missing = missing
+        self.deleted = False
+
+    async def delete(self):
+        if self.missing:
+            raise discord.NotFound(SimpleNamespace(status=404, reason="Not Found"), "Unknown Message")
+        self.deleted = True
+
+
+class Channel:
+    id = 1
+    name = "general"
+
+    def __init__(self, messages):
+        self.messages = messages
+
+    async def history(self, **kwargs):
+        for msg in self.messages:
+            yield msg
+
+    async def delete_messages(self, messages):
+        await asyncio.sleep(0.01)
+        raise discord.Forbidden(SimpleNamespace(status=403, reason="Forbidden"), "Missing Permissions")
+
+
+def test_clear_job_stops_deleting_when_a_strategy_fails():
+    now, old = datetime.utcnow(), datetime.utcnow() - timedelta(days=30)
+    messages = [Message(i, now) for i in range(3)] + [Message(10, old, missing=True)]
+    messages += [Message(i, old) for i in range(11, 21)]
+    job = ClearJob(Channel(messages), SimpleNamespace(id=0, edit=DeletedMessage().edit), None)
+
+    async def run():
+        with pytest.raises(discord.Forbidden):
+            await job.run(100, lambda msg: True)
+        deleted = job.deleted
+        await asyncio.sleep(1.5)
+        return deleted
+
+    deleted = asyncio.run(run())
+    # The missing message is not counted, and no message is deleted once the job failed
+    assert deleted == sum(msg.deleted for msg in messages) == 4
+    assert job.deleted == deleted
+
+
+def test_parse_filters_converts_dates_to_naive_utc():
+    _, before, after = parse_filters(("before=2022-07-01T12:00:00+02:00", "after=2022-07-01T08:00:00"))
+    assert before == datetime(2022, 7, 1, 10, 0)
+    assert after.tzinfo is None
@@ -0,0 +1,40 @@
+import random
+import time
+
+import pytest
+
+from rbot.utils.dice import MAX_DICE, DiceError, DiceRoll, face_counts
+
+
+@pytest.mark.parametrize(
+    ("notation", "expected"),
+    [("3", "3d6"), ("d20", "1d20"), ("4d6+2", "4d6+2"), ("100D20KH3", "100d20kh3"), ("2d8kl1-1", "2d8kl1-1")],
+)
+def test_parse(notation, expected):
+    assert str(DiceRoll.parse(notation)) == expected
+
+
+@pytest.mark.parametrize("notation", ["", "0", "d1", "4d6kh5", "abc", f"{MAX_DICE + 1}d6"])
+def test_parse_invalid(notation):
+    with pytest.raises(DiceError):
+        DiceRoll.parse(notation)
+
+
+def test_roll_keep_highest():
+    total, dice = DiceRoll.parse("10d6kh3+1").roll(random.Random(1))
+    assert len(dice) == 3
+    assert total == sum(dice) + 1
+    assert dice == sorted(dice, reverse=True)
+
+
+def test_large_roll_is_aggregated():
+    rng = random.Random(1)
+    counts = face_counts(MAX_DICE, 1000, rng)
+    assert sum(counts) == MAX_DICE
+    started = time.monotonic()
+    total, dice = DiceRoll.parse(f"{MAX_DICE}d20").roll(rng)
+    assert time.monotonic() - started < 0.5
+    assert dice is None
+    assert abs(total - MAX_DICE * 10.5) < MAX_DICE * 0.05
+    total, _ = DiceRoll.parse(f"{MAX_DICE}d20kh3").roll(rng)
+    assert total == 60
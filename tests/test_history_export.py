@@ -0,0 +1,67 @@
+import asyncio
+import json
+from datetime import datetime, timezone
+
+import pytest
+
+from rbot.utils.history_export import ArchiveExporter, ExportCursor, NDJSONExporter, get_exporter, read_archive
+
+
+def test_ndjson_exporter_writes_by_batches(tmp_path):
+    path = tmp_path / "chan.ndjson"
+
+    async def run():
+        exporter = NDJSONExporter(str(path), asyncio.get_running_loop(), batch_size=2)
+        for i in range(3):
+            await exporter.write({"id": i, "content": "é"})
+        flushed = path.read_text(encoding="utf-8").splitlines()
+        await exporter.close()
+        return exporter.count, flushed
+
+    count, flushed = asyncio.run(run())
+    assert count == 3
+    assert len(flushed) == 2
+    lines = path.read_text(encoding="utf-8").splitlines()
+    assert [json.loads(line) for line in lines] == [{"id": i, "content": "é"} for i in range(3)]
+
+
+def test_export_cursor(tmp_path):
+    async def run():
+        cursor = ExportCursor(str(tmp_path / "chan.cursor"), asyncio.get_running_loop())
+        before = await cursor.load()
+        await cursor.save(42)
+        return before, await cursor.load()
+
+    assert asyncio.run(run()) == (None, 42)
+
+
+def test_archive_exporter_range_reads(tmp_path):
+    path = str(tmp_path / "chan.rarc")
+    records = [
+        {
+            "id": i,
+            "content": f"msg {i} ✨",
+            "created_at": f"2022-07-{i + 1:02d}T12:00:00",
+            "author_name": f"user{i % 2}",
+        }
+        for i in range(6)
+    ]
+
+    async def run():
+        exporter = ArchiveExporter(path, asyncio.get_running_loop(), batch_size=2)
+        for record in records:
+            await exporter.write(record)
+        await exporter.close()
+
+    asyncio.run(run())
+    assert list(read_archive(path)) == records
+    start = datetime(2022, 7, 3, tzinfo=timezone.utc)
+    end = datetime(2022, 7, 5, tzinfo=timezone.utc)
+    assert [record["id"] for record in read_archive(path, start=start, end=end)] == [2, 3]
+    assert [record["id"] for record in read_archive(path, authors=["user1"])] == [1, 3, 5]
+
+
+def test_unknown_history_format_lists_the_valid_ones():
+    assert get_exporter("archive") is ArchiveExporter
+    with pytest.raises(ValueError, match="ndjson, archive"):
+        get_exporter("csv")
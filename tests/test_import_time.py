@@ -0,0 +1,33 @@
+import subprocess
+import sys
+
+from rbot.bot.bot import COGS
+
+# Budget of the bot and commands imports (in seconds), enforced to keep restarts fast
+IMPORT_BUDGET_SEC = 1.0
+# Dependencies only imported on first use
+LAZY_MODULES = ("youtube_dl", "youtubesearchpython")
+
+
+def import_times(*modules: str) -> dict:
+    """Return the cumulative import time (in seconds) of each imported module, using `python -X importtime`."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {', '.join(modules)}"],
+        capture_output=True,
+        check=True,
+        text=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        _, cumulative, name = line.removeprefix("import time:").split("|")
+        if cumulative.strip().isdigit():
+            times[name.strip()] = (int(cumulative) / 1_000_000, len(name) - len(name.lstrip()) == 1)
+    return times
+
+
+def test_import_time_within_budget():
+    times = import_times("rbot.bot.bot", *(module for module, _, _ in COGS.values()))
+    for module in LAZY_MODULES:
+        assert module not in times, f"{module} must be imported on first use"
+    total = sum(cumulative for cumulative, top_level in times.values() if top_level)
+    assert total < IMPORT_BUDGET_SEC, f"Imports took {total:.3f}s, over the {IMPORT_BUDGET_SEC}s budget"
@@ -0,0 +1,10 @@
+import asyncio
+
+from benchmarks import load_test
+
+
+def test_every_guild_plays_its_tracks_offline():
+    report = asyncio.run(load_test.run(guilds=3, tracks=2, speed=50, latency=0.01))
+    assert report["tracks"] == 6
+    assert report["audio_sec_per_sec"] > 0
+    assert report["loop_stalls"] == 0
@@ -0,0 +1,46 @@
+import json
+import logging
+
+from rbot.utils.log import JsonFormatter, LocalQueueHandler, RateLimitFilter, setup_logging
+
+
+def make_record(msg, *args, level=logging.INFO, lineno=1):
+    return logging.LogRecord("rich", level, "player.py", lineno, msg, args, None)
+
+
+def test_json_formatter_strips_markup():
+    record = make_record("[bold green]Connected to %s[/bold green]", "discord")
+    record.markup = True
+    line = json.loads(JsonFormatter().format(record))
+    assert line["message"] == "Connected to discord"
+    assert (line["level"], line["logger"], line["line"]) == ("INFO", "rich", 1)
+
+
+def test_rate_limit_filter_drops_repeated_records_of_a_call_site():
+    limit = RateLimitFilter(rate=2, per=60)
+    passed = [limit.filter(make_record("Playing %s", i)) for i in range(5)]
+    assert passed == [True, True, False, False, False]
+    # Other call sites and errors are not limited
+    assert limit.filter(make_record("Queued", lineno=2))
+    assert limit.filter(make_record("Failed", level=logging.ERROR))
+    limit._limiters[("rich", "player.py", 1)]._tokens = 1
+    record = make_record("Playing %s", 5)
+    assert limit.filter(record)
+    assert record.getMessage() == "Playing 5 (3 similar messages dropped)"
+
+
+def test_setup_logging_writes_records_from_the_listener_thread(capsys):
+    root = logging.getLogger()
+    handlers, level = root.handlers[:], root.level
+    try:
+        listener = setup_logging(fmt="json", queued=True, rate=1)
+        assert isinstance(root.handlers[0], LocalQueueHandler)
+        logger = logging.getLogger("rich")
+        for i in range(3):
+            logger.info("Track %s", i)
+        listener.stop()
+    finally:
+        root.handlers[:] = handlers
+        root.setLevel(level)
+    lines = [json.loads(line) for line in capsys.readouterr().err.splitlines()]
+    assert [line["message"] for line in lines] == ["Track 0"]
@@ -0,0 +1,45 @@
+import asyncio
+from types import SimpleNamespace
+
+import discord
+import pytest
+
+from rbot.utils.members import MemberCache, member_cache_flags
+
+
+class FakeGuild:
+    def __init__(self, guild_id):
+        self.id = guild_id
+        self.fetched = []
+
+    def get_member(self, member_id):
+        return None
+
+    async def fetch_member(self, member_id):
+        self.fetched.append(member_id)
+        return SimpleNamespace(id=member_id, guild=self)
+
+
+def test_member_cache_flags_of_policies():
+    intents = discord.Intents.default()
+    assert member_cache_flags("none", intents).value == 0
+    assert member_cache_flags("fetch", intents).value == 0
+    assert member_cache_flags("voice", intents).voice
+    assert not member_cache_flags("voice", intents).joined
+    with pytest.raises(ValueError):
+        member_cache_flags("everything", intents)
+
+
+def test_member_cache_fetches_and_evicts_least_recently_used():
+    cache = MemberCache(maxsize=2)
+    guild = FakeGuild(1)
+
+    async def run():
+        for member_id in (1, 2, 1, 3, 1, 2):
+            await cache.get(guild, member_id)
+
+    asyncio.run(run())
+    # 2 is evicted when 3 is fetched, as 1 was used more recently
+    assert guild.fetched == [1, 2, 3, 2]
+    assert len(cache) == 2
+    assert (cache.hits, cache.misses) == (2, 4)
@@ -0,0 +1,40 @@
+import asyncio
+
+from rbot.utils.metrics import Registry, start_http_server
+
+
+def test_registry_render():
+    registry = Registry()
+    registry.counter("requests_total", "Requests", ("code",)).inc(code=200)
+    registry.gauge("players", "Players").set(3)
+    histogram = registry.histogram("latency_seconds", "Latency", buckets=(0.1, 1))
+    histogram.observe(0.05)
+    histogram.observe(0.5)
+    registry.add_collector(lambda: [("cache_hits", {"cache": 'a"b'}, 7)])
+    text = registry.render()
+    assert 'requests_total{code="200"} 1' in text
+    assert "players 3" in text
+    assert 'latency_seconds_bucket{le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{le="+Inf"} 2' in text
+    assert "latency_seconds_count 2" in text
+    assert 'cache_hits{cache="a\\"b"} 7' in text
+    assert registry.snapshot()[("latency_seconds_sum", ())] == 0.55
+
+
+def test_http_server():
+    registry = Registry()
+    registry.counter("hits_total", "Hits").inc()
+
+    async def run():
+        server = await start_http_server("127.0.0.1", 0, registry)
+        port = server.sockets[0].getsockname()[1]
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(b"GET /metrics HTTP/1.1\r\nHost: localhost\r\n\r\n")
+        response = await reader.read()
+        writer.close()
+        server.close()
+        return response.decode()
+
+    response = asyncio.run(run())
+    assert response.startswith("HTTP/1.1 200 OK")
+    assert response.endswith("hits_total 1\n")
@@ -0,0 +1,170 @@
+import asyncio
+import logging
+
+from rbot.bot.commands import music
+from rbot.bot.commands.music import Music, MusicPlayer
+from rbot.utils.player_state import PlayerStateStore
+from rbot.utils.yt_player import InstrumentedSource, _seek_options, to_song
+from tests.simulator import FakeAudioSource, FakeBot, FakeContext, FakeGuild, fake_info, offline
+
+LOGGER = logging.getLogger("rich")
+
+
+def run_with_player(monkeypatch, scenario):
+    monkeypatch.setattr(music, "RENDER_DELAY", 0.01)
+
+    async def run():
+        bot = FakeBot(asyncio.get_running_loop())
+        cog = Music(bot=bot)
+        guild = FakeGuild(bot, "guild")
+        bot.guilds = [guild]
+        player = MusicPlayer(bot, guild, guild.music_chan, cog, LOGGER)
+        try:
+            await scenario(guild, player)
+        finally:
+            await player.teardown()
+
+    asyncio.run(run())
+
+
+def test_render_requests_are_debounced_and_edit_in_place(monkeypatch):
+    async def scenario(guild, player):
+        await guild.voice_channel.connect()
+        player.current = FakeAudioSource(fake_info("https://www.youtube.com/watch?v=a"), "member")
+        player.request_render()
+        player.request_render()
+        await asyncio.sleep(0.05)
+        assert len(guild.music_chan.messages) == 1
+        guild.voice_client.pause()
+        player.request_render()
+        player.request_render()
+        await asyncio.sleep(0.05)
+        # Unchanged content is not edited again
+        player.request_render()
+        await asyncio.sleep(0.05)
+        assert len(guild.music_chan.messages) == 1
+        assert player.np.edits == 1
+
+    run_with_player(monkeypatch, scenario)
+
+
+def test_render_after_disconnect_does_nothing(monkeypatch):
+    async def scenario(guild, player):
+        player.current = FakeAudioSource(fake_info("https://www.youtube.com/watch?v=a"), "member")
+        player.request_render()
+        await asyncio.sleep(0.05)
+        assert not guild.music_chan.messages
+        assert player._render_task.done()
+        assert player._render_task.exception() is None
+
+    run_with_player(monkeypatch, scenario)
+
+
+def test_saved_player_is_restored_at_its_position(monkeypatch, tmp_path):
+    store = PlayerStateStore(str(tmp_path / "players.db"), flush_delay=60)
+    monkeypatch.setattr(music, "player_states", store)
+
+    async def run():
+        bot = FakeBot(asyncio.get_running_loop())
+        guild = FakeGuild(bot, "guild")
+        bot.guilds = [guild]
+        member = guild.member("member")
+        await guild.voice_channel.connect()
+        cog = Music(bot=bot)
+        player = cog.players[guild.id] = MusicPlayer(bot, guild, guild.music_chan, cog, LOGGER)
+        # Songs stay queued without a player loop
+        player._task.cancel()
+        song = to_song(fake_info("https://www.youtube.com/watch?v=a"), member)
+        player.current_song = {**song, "start": 12.5}
+        player.queue.append(to_song(fake_info("https://www.youtube.com/watch?v=b"), member))
+        player.np = await guild.music_chan.send("now playing")
+        # Saved on shutdown, forgotten once the player is stopped
+        await cog.cleanup_all()
+        assert guild.voice_client is None
+        state = store.load_all()[guild.id]
+        assert state["current"]["start"] == 12.5
+        assert not player.np.deleted
+
+        restored = Music(bot=bot)
+        await restored.restore(guild, state)
+        player = restored.players[guild.id]
+        songs = list(player.queue)
+        assert [song["start"] for song in songs if "start" in song] == [12.5]
+        assert songs[0]["requester"] is member
+        assert player.np.id == state["np_message_id"]
+        assert guild.voice_client is not None
+        await restored.cleanup(guild)
+        await store.flush()
+        assert store.load_all() == {}
+
+    asyncio.run(run())
+    assert _seek_options(12.5) == "-ss 12.50"
+    assert _seek_options(0) is None
+
+
+def test_each_guild_has_its_player_destroyed_when_idle(monkeypatch):
+    async def run():
+        bot = FakeBot(asyncio.get_running_loop())
+        monkeypatch.setattr(bot.settings, "music_idle_timeout", 0.05)
+        cog = Music(bot=bot)
+        bot.guilds = [FakeGuild(bot, "first"), FakeGuild(bot, "second")]
+        players = []
+        for guild in bot.guilds:
+            await guild.voice_channel.connect()
+            ctx = FakeContext(bot, guild, guild.member("member"), cog)
+            players.append(cog.get_player(ctx))
+            assert cog.get_player(ctx) is players[-1]
+        assert players[0] is not players[1]
+        assert set(cog.players) == {guild.id for guild in bot.guilds}
+        await asyncio.sleep(0.2)
+        assert not cog.players
+        assert all(guild.voice_client is None for guild in bot.guilds)
+
+    asyncio.run(run())
+
+
+class TrackedSource(FakeAudioSource):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.cleanups = 0
+        self.read_after_cleanup = False
+
+    def read(self):
+        self.read_after_cleanup |= self.cleanups > 0
+        return super().read()
+
+    def cleanup(self):
+        self.cleanups += 1
+
+
+def test_teardown_stops_the_audio_player_before_its_source_is_cleaned_up(monkeypatch):
+    async def scenario(guild, player):
+        await guild.voice_channel.connect()
+        source = player.current = TrackedSource(fake_info("https://www.youtube.com/watch?v=a"), "member")
+        player.playing = InstrumentedSource(source, guild.id)
+        guild.voice_client.play(player.playing)
+        await asyncio.sleep(0.05)
+        await player.teardown()
+        await asyncio.sleep(0.05)
+        assert not guild.voice_client.is_playing()
+        assert source.cleanups == 1
+        assert not source.read_after_cleanup
+
+    run_with_player(monkeypatch, scenario)
+
+
+def test_player_without_voice_client_is_destroyed():
+    async def run():
+        bot = FakeBot(asyncio.get_running_loop())
+        cog = Music(bot=bot)
+        guild = FakeGuild(bot, "guild")
+        bot.guilds = [guild]
+        ctx = FakeContext(bot, guild, guild.member("member"), cog)
+        with offline(latency=0):
+            player = cog.get_player(ctx)
+            player.queue.append(to_song(fake_info("https://www.youtube.com/watch?v=a"), ctx.author))
+            await asyncio.sleep(0.1)
+        assert player._task.done()
+        assert guild.id not in cog.players
+
+    asyncio.run(run())
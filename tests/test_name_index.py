@@ -0,0 +1,64 @@
+from types import SimpleNamespace
+
+import discord
+import pytest
+
+from rbot.utils.name_index import AmbiguousNameError, NameIndex
+
+
+class FakeGuild:
+    def __init__(self, guild_id):
+        self.id = guild_id
+        self.channels = []
+        self.roles = []
+
+    def channel(self, channel_id, name, kind=discord.ChannelType.text):
+        channel = SimpleNamespace(id=channel_id, name=name, type=kind, guild=self)
+        self.channels.append(channel)
+        return channel
+
+    def role(self, role_id, name):
+        role = discord.Role(guild=self, state=None, data={"id": role_id, "name": name})
+        self.roles.append(role)
+        return role
+
+    def get_channel(self, channel_id):
+        return next((channel for channel in self.channels if channel.id == channel_id), None)
+
+    def get_role(self, role_id):
+        return next((role for role in self.roles if role.id == role_id), None)
+
+
+def test_name_index_follows_renames_and_deletions():
+    guild = FakeGuild(1)
+    music = guild.channel(10, "music")
+    voice = guild.channel(11, "music", discord.ChannelType.voice)
+    dj = guild.role(20, "DJ")
+    names = NameIndex()
+    names.add_guild(guild)
+    assert names.get_channel(guild, "music") is music
+    assert names.get_channel(guild, "music", "voice") is voice
+    assert names.get_role(guild, "DJ") is dj
+    music.name = "jukebox"
+    names.add(music)
+    assert names.get_channel(guild, "music") is None
+    assert names.get_channel(guild, "jukebox") is music
+    names.remove(dj)
+    assert names.get_role(guild, "DJ") is None
+    names.remove_guild(guild.id)
+    assert len(names) == 0
+
+
+def test_name_index_reports_ambiguous_names():
+    guild = FakeGuild(1)
+    guild.channel(10, "music")
+    other = guild.channel(12, "music")
+    names = NameIndex()
+    names.add_guild(guild)
+    with pytest.raises(AmbiguousNameError) as error:
+        names.get_channel(guild, "music")
+    assert error.value.ids == {10, 12}
+    # Other guilds are not affected
+    assert names.get_channel(FakeGuild(2), "music") is None
+    names.remove(other)
+    assert names.get_channel(guild, "music").id == 10
@@ -0,0 +1,64 @@
+import asyncio
+
+from rbot.utils.player_state import PlayerStateStore
+
+
+def test_saves_are_batched_and_survive_a_restart(tmp_path):
+    path = str(tmp_path / "players.db")
+    store = PlayerStateStore(path, flush_delay=0.01)
+    built = []
+
+    def state(guild_id):
+        def build():
+            built.append(guild_id)
+            return {"queue": [{"url": f"https://youtu.be/{guild_id}"}], "current": {"start": 12.5}}
+
+        return build
+
+    async def run():
+        for _ in range(10):
+            store.save(1, state(1))
+        store.save(2, state(2))
+        store.delete(2)
+        store.save(3, state(3))
+        await asyncio.sleep(0.05)
+
+    asyncio.run(run())
+    # Only the last save of each player is built and written
+    assert built == [1, 3]
+    states = PlayerStateStore(path).load_all()
+    assert set(states) == {1, 3}
+    assert states[1]["current"]["start"] == 12.5
+
+
+def test_flush_writes_pending_changes_now(tmp_path):
+    store = PlayerStateStore(str(tmp_path / "players.db"), flush_delay=60)
+
+    async def run():
+        store.save(1, lambda: {"queue": []})
+        await store.flush()
+
+    asyncio.run(run())
+    assert store.load_all() == {1: {"queue": []}}
+
+
+def test_failed_write_is_rolled_back_and_retried(tmp_path):
+    store = PlayerStateStore(str(tmp_path / "players.db"), flush_delay=0.01)
+
+    def broken():
+        raise ValueError("no state")
+
+    async def run():
+        store.save(1, lambda: {"queue": []})
+        # Not serializable: the write fails after the first player is written
+        store.save(2, lambda: {"queue": [object()]})
+        store.save(3, broken)
+        await store.flush()
+        assert store.load_all() == {}
+        # Players failing to be written are pending again, a state failing to be built is skipped
+        assert set(store._pending) == {1, 2}
+        store.save(2, lambda: {"queue": [{"url": "https://youtu.be/2"}]})
+        await asyncio.sleep(0.05)
+
+    asyncio.run(run())
+    assert set(store.load_all()) == {1, 2}
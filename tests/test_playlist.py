@@ -0,0 +1,69 @@
+import asyncio
+
+from rbot.utils.playlist import Playlist
+
+
+def _songs(n: int) -> list:
+    return [{"title": str(i), "duration_sec": 10 * (i + 1)} for i in range(n)]
+
+
+def test_playlist_operations_keep_total_duration():
+    playlist = Playlist()
+    for song in _songs(4):
+        playlist.append(song)
+    assert playlist.duration_sec == 100
+    assert playlist.remove(1)["title"] == "1"
+    playlist.move(2, 0)
+    assert [song["title"] for song in playlist] == ["3", "0", "2"]
+    assert playlist.popleft()["title"] == "3"
+    assert playlist.duration_sec == 40
+    playlist.shuffle()
+    assert sorted(song["title"] for song in playlist) == ["0", "2"]
+    playlist.clear()
+    assert playlist.empty() and playlist.duration_sec == 0
+
+
+def test_playlist_pages():
+    playlist = Playlist()
+    for song in _songs(25):
+        playlist.append(song)
+    assert playlist.pages(10) == 3
+    assert [song["title"] for song in playlist.page(2, 10)] == ["20", "21", "22", "23", "24"]
+    assert Playlist().pages(10) == 1
+
+
+def test_playlist_get_waits_for_a_song():
+    async def run():
+        playlist = Playlist()
+        getter = asyncio.create_task(playlist.get())
+        await asyncio.sleep(0)
+        assert not getter.done()
+        playlist.append({"title": "a", "duration_sec": 1})
+        return await asyncio.wait_for(getter, 1)
+
+    assert asyncio.run(run())["title"] == "a"
+
+
+def test_playlist_update_keeps_total_duration():
+    playlist = Playlist()
+    stub, played = {"title": "stub", "duration_sec": 0}, {"title": "played", "duration_sec": 0}
+    playlist.append(played)
+    playlist.append(stub)
+    playlist.popleft()
+    playlist.update(stub, {"title": "song", "duration_sec": 120})
+    playlist.update(played, {"duration_sec": 60})
+    assert stub in playlist and played not in playlist
+    assert playlist.duration_sec == 120
+    assert stub["title"] == "song"
+
+
+def test_playlist_notifies_changes():
+    playlist = Playlist()
+    changes = []
+    playlist.on_change = lambda: changes.append(len(playlist))
+    for song in _songs(3):
+        playlist.append(song)
+    playlist.move(0, 2)
+    playlist.remove(0)
+    playlist.popleft()
+    assert changes == [1, 2, 3, 3, 2, 1]
@@ -0,0 +1,98 @@
+import asyncio
+import logging
+from types import SimpleNamespace
+
+from discord.ext import commands
+
+from rbot.bot.commands.base import Base, _checks_done
+from rbot.bot.commands.clear import Clear
+from rbot.utils.profiling import CURRENT_PROFILE, CommandProfile, CommandProfiler, background_task, instrument_http
+
+LOGGER = logging.getLogger(__name__)
+
+
+def test_phases_split_the_total():
+    profile = CommandProfile("roll")
+    profile.started_at, profile.checked_at, profile.converted_at, profile.finished_at = 0, 1, 3, 6
+    assert profile.phases == {"checks": 1, "conversion": 2, "body": 3, "rest": 0.0, "total": 6}
+
+
+def test_percentiles_over_rolling_window():
+    profiler = CommandProfiler(window=100)
+    for duration in range(200):
+        profile = profiler.start("play")
+        profile.started_at -= duration
+        profiler.finish(profile, LOGGER)
+    assert {key: round(value) for key, value in profiler.percentiles("play").items()} == {
+        "p50": 150,
+        "p95": 195,
+        "p99": 199,
+    }
+    assert profiler.percentiles("roll") == {}
+
+
+def test_instrument_http_counts_calls_of_the_running_command():
+    async def request(route, **kwargs):
+        await asyncio.sleep(0)
+        return route
+
+    lock = asyncio.Lock()
+    global_over = asyncio.Event()
+    global_over.set()
+    http = SimpleNamespace(request=request, _locks={"bucket": lock}, _global_over=global_over)
+    instrument_http(http)
+    profiler = CommandProfiler()
+
+    async def run():
+        profile = profiler.start("clear")
+        await http.request(SimpleNamespace(bucket="other"))
+        async with lock:
+            await http.request(SimpleNamespace(bucket="bucket"))
+        profiler.finish(profile, LOGGER)
+        return profile
+
+    profile = asyncio.run(run())
+    assert profile.rest_calls == 2
+    assert profile.rate_limit_waits == 1
+    assert profiler.percentiles("clear")["p50"] == profile.phases["total"]
+
+
+def test_background_tasks_are_not_part_of_the_command():
+    profiler = CommandProfiler()
+
+    async def current():
+        return CURRENT_PROFILE.get()
+
+    async def run():
+        profile = profiler.start("play")
+        assert await asyncio.create_task(current()) is profile
+        assert await background_task(current()) is None
+
+    asyncio.run(run())
+
+
+def test_checks_of_commands_are_marked_once_per_cog_instance():
+    cogs = [cog_class() for cog_class in (Clear, Clear, Clear)]
+    for cog in cogs:
+        for command in cog.walk_commands():
+            assert [check.__name__ for check in command.checks].count("_checks_done") == 1
+            assert command.checks[-1] is _checks_done
+
+
+def test_command_before_invoke_hook_is_part_of_the_body():
+    class Voice(Base):
+        @commands.command()
+        async def join(self, ctx):
+            pass
+
+        @join.before_invoke
+        async def connect(self, ctx):
+            ctx.converted_at = ctx.profile.converted_at
+
+    cog = Voice()
+    # Set by Bot.add_cog
+    cog.join.cog = cog
+    ctx = SimpleNamespace(profile=CommandProfile("join"), bot=SimpleNamespace(_before_invoke=None))
+    asyncio.run(cog.join.call_before_hooks(ctx))
+    assert ctx.converted_at is not None
+    assert ctx.profile.converted_at == ctx.converted_at
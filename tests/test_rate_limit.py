@@ -0,0 +1,23 @@
+import asyncio
+import time
+
+from rbot.utils.rate_limit import RateLimiter
+
+
+def test_try_acquire_consumes_tokens():
+    limiter = RateLimiter(rate=2, per=60)
+    assert limiter.try_acquire()
+    assert limiter.try_acquire()
+    assert not limiter.try_acquire()
+
+
+def test_acquire_waits_for_refill():
+    limiter = RateLimiter(rate=1, per=0.1)
+
+    async def run():
+        started = time.monotonic()
+        for _ in range(3):
+            await limiter.acquire()
+        return time.monotonic() - started
+
+    assert asyncio.run(run()) >= 0.19
@@ -0,0 +1,69 @@
+import asyncio
+
+import pytest
+
+from rbot.utils.resilience import CircuitOpenError, Resilience, is_transient, source_of
+
+
+class DownloadError(Exception):
+    def __init__(self, msg, exc_info=None):
+        super().__init__(msg)
+        self.exc_info = exc_info
+
+
+class HTTPError(Exception):
+    def __init__(self, code):
+        super().__init__(f"HTTP Error {code}")
+        self.code = code
+
+
+def test_errors_are_classified():
+    assert is_transient(DownloadError("ERROR: Unable to download webpage", (None, HTTPError(503), None)))
+    assert is_transient(DownloadError("ERROR: HTTP Error 429: Too Many Requests"))
+    assert is_transient(ConnectionResetError())
+    assert not is_transient(DownloadError("ERROR: Video unavailable"))
+    assert not is_transient(DownloadError("ERROR: Unable to download webpage", (None, HTTPError(404), None)))
+    assert not is_transient(KeyError("url"))
+    assert source_of("https://youtu.be/id") == source_of("https://m.youtube.com/watch?v=id") == "youtube.com"
+
+
+def test_transient_errors_are_retried_within_attempts():
+    resilience = Resilience(attempts=3, base_delay=0)
+    calls = []
+
+    async def extract(errors):
+        calls.append(len(errors))
+        if errors:
+            raise errors.pop()
+        return "data"
+
+    def call(errors):
+        return asyncio.run(resilience.call("a", lambda: extract(errors)))
+
+    assert call([ConnectionError()] * 2) == "data"
+    with pytest.raises(ConnectionError):
+        call([ConnectionError()] * 3)
+    with pytest.raises(DownloadError):
+        call([DownloadError("Private video")] * 3)
+    assert calls == [2, 1, 0, 3, 2, 1, 3]
+
+
+def test_circuit_opens_after_failures_then_probes():
+    resilience = Resilience(attempts=1, threshold=2, reset_timeout=60)
+
+    async def fail():
+        raise TimeoutError()
+
+    async def succeed():
+        return "data"
+
+    for _ in range(2):
+        with pytest.raises(TimeoutError):
+            asyncio.run(resilience.call("a", fail))
+    with pytest.raises(CircuitOpenError):
+        asyncio.run(resilience.call("a", succeed))
+    # Other sources are not affected
+    assert asyncio.run(resilience.call("b", succeed)) == "data"
+    resilience.breakers["a"].opened_at -= 60
+    assert asyncio.run(resilience.call("a", succeed)) == "data"
+    assert resilience.stats() == {"a": "closed", "b": "closed"}
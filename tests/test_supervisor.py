@@ -0,0 +1,38 @@
+from rbot.bot import supervisor
+from rbot.bot.supervisor import EXIT_FATAL, Supervisor, worker_shards
+
+
+class FakeProcess:
+    def __init__(self, alive=True, exitcode=None):
+        self.alive = alive
+        self.exitcode = exitcode
+
+    def is_alive(self):
+        return self.alive
+
+
+def test_worker_shards_split_every_shard_once():
+    shards = [worker_shards(worker, 3, 8) for worker in range(3)]
+    assert shards == [[0, 3, 6], [1, 4, 7], [2, 5]]
+
+
+def test_crashed_worker_is_restarted_with_backoff(monkeypatch):
+    monkeypatch.setattr(supervisor.time, "monotonic", lambda: 100.0)
+    manager = Supervisor(workers=3, shard_count=3)
+    restarted = []
+    monkeypatch.setattr(manager, "start_worker", restarted.append)
+    manager.started_at = {0: 0.0, 1: 0.0, 2: 0.0}
+    manager.processes = {0: FakeProcess(), 1: FakeProcess(False, 1), 2: FakeProcess(False, EXIT_FATAL)}
+    manager.check_workers()
+    assert manager.restart_at == {1: 100.0 + supervisor.RESTART_DELAY}
+    assert manager.restart_delay == {1: supervisor.RESTART_DELAY * 2}
+    assert 2 not in manager.processes
+    monkeypatch.setattr(supervisor.time, "monotonic", lambda: 102.0)
+    manager.check_workers()
+    assert restarted == [1]
+
+
+def test_samples_are_labelled_by_worker():
+    manager = Supervisor(workers=2, shard_count=2)
+    manager.snapshots = {1: {("rbot_tracks_total", (("guild", "42"),)): 3}}
+    assert list(manager.samples()) == [("rbot_tracks_total", {"guild": "42", "worker": "1"}, 3)]
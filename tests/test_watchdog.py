@@ -0,0 +1,33 @@
+import asyncio
+import time
+
+from rbot.utils.watchdog import LoopWatchdog
+
+
+def block_the_loop():
+    time.sleep(0.3)
+
+
+def test_stall_is_reported_with_the_blocking_stack():
+    reports = []
+
+    async def report(message):
+        reports.append(message)
+
+    async def run():
+        watchdog = LoopWatchdog(interval=0.01, threshold=0.1, report_interval=0.2, report=report)
+        watchdog.start()
+        await asyncio.sleep(0.05)
+        block_the_loop()
+        await asyncio.sleep(0.25)
+        watchdog.stop()
+
+    asyncio.run(run())
+    assert "Event loop blocked" in reports[0]
+    assert "block_the_loop" in reports[0]
+    assert "1 stalls" in reports[1]
+
+
+def test_stats_without_lag_measure():
+    watchdog = LoopWatchdog()
+    assert watchdog.stats() == {"p50": 0.0, "p99": 0.0, "max": 0.0, "stalls": 0}
@@ -0,0 +1,225 @@
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+
+import discord
+
+from rbot.utils import yt_player
+from rbot.utils.yt_player import (
+    AudioCache,
+    ExtractorPool,
+    InstrumentedSource,
+    SQLiteCache,
+    TTLCache,
+    YTDLCache,
+    YTSearch,
+)
+
+
+def test_ttl_cache_lru_eviction():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", {"v": 1})
+    cache.set("b", {"v": 2})
+    assert cache.get("a") == {"v": 1}
+    cache.set("c", {"v": 3})
+    assert cache.get("b") is None
+    assert cache.get("a") == {"v": 1}
+    assert cache.stats() == {"size": 2, "maxsize": 2, "hits": 2, "misses": 1}
+
+
+def test_ttl_cache_expiration():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", {"v": 1}, ttl=-1)
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_sqlite_cache(tmp_path):
+    path = str(tmp_path / "cache.db")
+    cache = SQLiteCache(path, maxsize=2, ttl=60)
+    cache.set("a", {"v": 1})
+    cache.set("b", {"v": 2})
+    assert cache.get("a") == {"v": 1}
+    cache.set("c", {"v": 3})
+    assert len(cache) == 2
+    assert SQLiteCache(path, maxsize=2, ttl=60).get("b") is None
+
+
+def test_ytdl_cache_queries_sqlite_off_the_event_loop(tmp_path):
+    threads = []
+
+    class TrackedCache(SQLiteCache):
+        def get(self, key):
+            threads.append(threading.current_thread())
+            return super().get(key)
+
+        def set(self, key, value, ttl=None):
+            threads.append(threading.current_thread())
+            super().set(key, value, ttl=ttl)
+
+    cache = YTDLCache(metadata=TrackedCache(str(tmp_path / "cache.db"), ttl=3600), streams=TTLCache(ttl=3600))
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        await cache.store("song", {"title": "song", "url": "https://host/videoplayback"}, loop)
+        return await cache.load_metadata("song", loop)
+
+    assert asyncio.run(run()) == {"title": "song"}
+    assert cache.has_stream("song")
+    assert threads and threading.main_thread() not in threads
+
+
+def test_ytdl_cache_stream_ttl_follows_url_expiration():
+    cache = YTDLCache(metadata=TTLCache(ttl=3600), streams=TTLCache(ttl=3600))
+    data = {
+        "title": "song",
+        "webpage_url": "https://www.youtube.com/watch?v=id",
+        "url": f"https://host/videoplayback?expire={int(time.time()) + 30}",
+    }
+    cache.put("song", data)
+    assert cache.get_metadata("song") == {"title": "song", "webpage_url": data["webpage_url"]}
+    assert cache.get_metadata(data["webpage_url"]) is not None
+    assert not cache.has_stream("song")
+    assert cache.get_stream("song") is None
+
+
+def test_ytdl_cache_has_stream_does_not_count():
+    cache = YTDLCache(metadata=TTLCache(ttl=3600), streams=TTLCache(ttl=3600))
+    cache.put("song", {"title": "song", "url": "https://host/videoplayback"})
+    assert cache.has_stream("song")
+    assert cache.streams.stats()["hits"] == 0
+
+
+def test_extractor_pool_bounds_in_flight_extractions(monkeypatch):
+    class FakeYoutubeDL:
+        def __init__(self, options):
+            self.options = options
+
+        def extract_info(self, url, download):
+            time.sleep(0.05)
+            return {"title": url}
+
+    monkeypatch.setattr(yt_player, "_youtube_dl", lambda: SimpleNamespace(YoutubeDL=FakeYoutubeDL))
+    pool = ExtractorPool(workers=1, max_pending=1)
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        return await asyncio.gather(*(pool.extract_info(str(i), loop) for i in range(4)))
+
+    try:
+        results = asyncio.run(run())
+    finally:
+        pool.shutdown()
+    assert [data["title"] for data in results] == ["0", "1", "2", "3"]
+    stats = pool.stats()
+    assert stats["in_flight"] == 0
+    assert stats["queue_wait_max"] >= 0.1
+    assert stats["latency_avg"] >= 0.05
+
+
+def test_yt_search_coalesces_and_caches(monkeypatch):
+    calls = []
+
+    def fake_search(query, limit):
+        calls.append(query)
+        time.sleep(0.05)
+        return [{"title": query}]
+
+    monkeypatch.setattr(yt_player, "_search_videos", fake_search)
+    search = YTSearch(TTLCache(ttl=60))
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        first = await asyncio.gather(search.search("Daft  Punk", loop), search.search("daft punk ", loop))
+        return first, await search.search("DAFT PUNK", loop)
+
+    first, cached = asyncio.run(run())
+    assert calls == ["daft punk"]
+    assert first == [[{"title": "daft punk"}], [{"title": "daft punk"}]]
+    assert cached == [{"title": "daft punk"}]
+
+
+def test_audio_cache_download_and_eviction(tmp_path):
+    fake_ffmpeg = tmp_path / "ffmpeg"
+    fake_ffmpeg.write_text('#!/bin/sh\nfor last; do :; done\nprintf "0123456789" > "$last"\n')
+    fake_ffmpeg.chmod(0o755)
+    cache = AudioCache(str(tmp_path / "audio"), max_bytes=25, executable=str(fake_ffmpeg))
+    assert cache.get("a") is None
+
+    async def run():
+        for video_id in ("a", "b", "c"):
+            await cache.download(video_id, "https://host/videoplayback")
+            cache.get("a")
+
+    asyncio.run(run())
+    assert cache.get("a") == cache.path("a")
+    assert cache.get("b") is None
+    assert cache.get("c") == cache.path("c")
+    assert not list((tmp_path / "audio").glob("*.part"))
+
+
+def test_cancelled_download_waits_for_ffmpeg_before_removing_the_track(tmp_path, monkeypatch):
+    fake_ffmpeg = tmp_path / "ffmpeg"
+    fake_ffmpeg.write_text('#!/bin/sh\nfor last; do :; done\nprintf "0123" > "$last"\nexec sleep 10\n')
+    fake_ffmpeg.chmod(0o755)
+    cache = AudioCache(str(tmp_path / "audio"), max_bytes=25, executable=str(fake_ffmpeg))
+    processes = []
+    create_subprocess_exec = asyncio.create_subprocess_exec
+
+    async def spawn(*args, **kwargs):
+        processes.append(await create_subprocess_exec(*args, **kwargs))
+        return processes[-1]
+
+    monkeypatch.setattr(asyncio, "create_subprocess_exec", spawn)
+
+    async def run():
+        task = asyncio.create_task(cache.download("a", "https://host/videoplayback"))
+        while not list((tmp_path / "audio").glob("*.part")):
+            await asyncio.sleep(0.01)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        assert processes[0].returncode is not None
+
+    asyncio.run(run())
+    assert not list((tmp_path / "audio").iterdir())
+
+
+def test_instrumented_source_counts_frames():
+    class FakeSource(discord.AudioSource):
+        def __init__(self):
+            self.frames = [b"x" * 10, b"x" * 10, b"x" * 10]
+
+        def read(self):
+            if len(self.frames) == 1:
+                time.sleep(0.07)
+            return self.frames.pop() if self.frames else b""
+
+    source = InstrumentedSource(FakeSource(), guild_id=1)
+    while source.read():
+        pass
+    source.cleanup()
+    assert (source.frames, source.bytes, source.late_frames, source.underruns) == (3, 30, 1, 1)
+
+
+def test_cached_opus_stream_is_not_transcoded(monkeypatch):
+    spawned = []
+
+    def spawn_process(self, args, **kwargs):
+        spawned.append(args)
+        return SimpleNamespace(stdout=None, pid=0, returncode=0, kill=lambda: None, poll=lambda: 0)
+
+    cache = YTDLCache(metadata=TTLCache(ttl=3600), streams=TTLCache(ttl=3600))
+    cache.put("song", {"title": "song", "duration": 60, "url": "https://host/videoplayback", "acodec": "opus"})
+    monkeypatch.setattr(yt_player, "ytdl_cache", cache)
+    monkeypatch.setattr(yt_player, "audio_cache", None)
+    monkeypatch.setattr(yt_player.get_settings(), "music_playback", "opus")
+    monkeypatch.setattr(discord.FFmpegAudio, "_spawn_process", spawn_process)
+
+    async def run():
+        return await yt_player.YTDLSource.regather_stream({"url": "song"}, asyncio.get_running_loop())
+
+    source = asyncio.run(run())
+    assert isinstance(source, yt_player.YTDLOpusSource)
+    args = spawned[0]
+    assert args[args.index("-c:a") + 1] == "copy"